@@ -7,6 +7,8 @@ import subprocess
 import sys
 from checkers.checker import Checker, CheckResult
 from env import Env
+from utils import profiler, watchdog
+from utils.pipeline import SpooledList
 
 DEFAULT_XML_CONTENT = """<?xml version="1.0"?>
 <!-- 
@@ -28,11 +30,14 @@ DEFAULT_XML_CONTENT = """<?xml version="1.0"?>
 class AndroidCodeStyleChecker(Checker):
     name = "android-check-style"
     help = "java and kotlin code style check"
+    extensions = (".java",)
+    streams_files = True
 
     CHECK_STYLE_XML = "check_style.xml"
     TOOL_PATH = f"{Env.BUILD_TOOLS_PATH}/checkstyle/checkstyle.jar"
 
     def run_check_style(self, file):
+        file = self.content_store.path(file)
         cmd = f"java -jar {self.TOOL_PATH} -c {self.CHECK_STYLE_XML} {file}"
         print(cmd)
         try:
@@ -50,15 +55,6 @@ class AndroidCodeStyleChecker(Checker):
                 f.write(DEFAULT_XML_CONTENT)
         return True, None
 
-    def get_changed_lines_of_target_file(self, file, line_indexes):
-        result = []
-        for key in line_indexes.keys():
-            file_hash_code, changed_line = line_indexes[key]
-            file_name = self.get_file_name(file_hash_code)
-            if file == file_name:
-                result.append(changed_line)
-        return result
-
     def get_error_line_of_target_file(self, error_message):
         if error_message is None:
             return {"line": -1, "reason": None}
@@ -79,17 +75,16 @@ class AndroidCodeStyleChecker(Checker):
         errors = []
         for changed_java_file in changed_java_files:
             print(f"checking {changed_java_file}")
-            success, output = self.run_check_style(changed_java_file)
+            with watchdog.checking_file(changed_java_file), profiler.span(
+                changed_java_file, "file", checker=self.name
+            ):
+                success, output = self.run_check_style(changed_java_file)
             if not success:
-                changed_lines = self.get_changed_lines_of_target_file(
-                    changed_java_file, line_indexes
-                )
                 error_messages = output.splitlines()
                 for error_message in error_messages:
                     match_result = self.get_error_line_of_target_file(error_message)
-                    if (
-                        match_result["line"] != -1
-                        and match_result["line"] in changed_lines
+                    if match_result["line"] != -1 and line_indexes.is_changed(
+                        changed_java_file, match_result["line"]
                     ):
                         errors.append(match_result["reason"])
         if len(errors) != 0:
@@ -105,21 +100,29 @@ class AndroidCodeStyleChecker(Checker):
         if not success:
             print(msg)
             return CheckResult.FAILED
-        changed_java_files = [f for f in changed_files if f.endswith(".java")]
-        errors = []
+        # A generator and a spooled list, |changed_files| may be a stream of
+        # the whole repository.
+        changed_java_files = (f for f in changed_files if f.endswith(".java"))
+        errors = SpooledList()
         for changed_java_file in changed_java_files:
             print(f"checking {changed_java_file}")
             print(subprocess.check_output("pwd", shell=True))
-            success, output = self.run_check_style(changed_java_file)
+            with watchdog.checking_file(changed_java_file), profiler.span(
+                changed_java_file, "file", checker=self.name
+            ):
+                success, output = self.run_check_style(changed_java_file)
             if not success:
                 error_messages = output.splitlines()
                 for error_message in error_messages:
                     if "[ERROR]" in error_message:
                         errors.append(error_message)
-        if len(errors) != 0:
-            print("android-check-style failed:")
-            for error in errors:
-                print(error)
-            return CheckResult.FAILED
-        else:
-            return CheckResult.PASSED
+        try:
+            if len(errors) != 0:
+                print("android-check-style failed:")
+                for error in errors:
+                    print(error)
+                return CheckResult.FAILED
+            else:
+                return CheckResult.PASSED
+        finally:
+            errors.close()
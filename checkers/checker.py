@@ -1,12 +1,39 @@
 # Copyright 2024 The Lynx Authors. All rights reserved.
 # Licensed under the Apache License Version 2.0 that can be found in the
 # LICENSE file in the root directory of this source tree.
-import re
+import abc
+import collections
+import concurrent.futures
+import threading
+import time
+
+from utils import profiler, watchdog
+from utils.content_store import WorkingTreeStore
+from utils.diff_parser import LineIndexes, iter_hunks, parse_changed_ranges
+from utils.pipeline import SpooledList
 
 
 class CheckResult:
     PASSED = "\033[32mPASSED\033[0m"
     FAILED = "\033[31mFAILED\033[0m"
+    CANCELLED = "\033[33mCANCELLED\033[0m"
+
+
+def get_changed_lines(options, mr):
+    """Returns the -U0 diff of the changes selected by |options|.
+
+    The diff is a string, or its lines while git writes them, so that a
+    large diff is parsed without being kept whole.
+    """
+    if options.staged:
+        return mr.GetStagedLines(stream=True)
+    elif options.base:
+        # Computed once with the changed files, see GetBranchChanges.
+        return mr.GetBranchLines(options.base)
+    elif options.changed:
+        return mr.GetChangedLines(stream=True)
+    else:
+        return mr.GetLastCommitLines(stream=True)
 
 
 class SimpleCache:
@@ -25,9 +52,119 @@ class SimpleCache:
 class Checker:
     name = None
     help = None
+    # File extensions the checker looks at, None for every file. An empty
+    # tuple marks checkers that do not check files, e.g. the commit message.
+    extensions = None
+    # Glob patterns of the paths the checker looks at, relative to the root
+    # of the repository, None for every path. "*" also matches "/".
+    paths = None
+    # Bump when a change to the checker may change its results, so that
+    # results cached by older versions are not reused.
+    version = "1"
+    # Whether run() iterates over its files only once, without len() or
+    # indexing, so that `check --all` may stream them from git. Otherwise
+    # run() gets a list, as checkers written before streaming expect.
+    streams_files = False
 
     def __init__(self):
         self._file_name_cache = SimpleCache()
+        self._config_hash = None
+        # Set by the framework to reuse results of unchanged files.
+        self.result_cache = None
+        # Set by the framework to check e.g. the staged content of files.
+        self.content_store = WorkingTreeStore()
+        # Guards the counters below, FileChecker updates them from threads.
+        self._stats_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Seconds spent on each checked file, used to balance shards of later
+        # runs. Files whose results were cached are left out.
+        self.file_times = {}
+        # Set to {} to only add up [seconds, files] per file type instead,
+        # e.g. when a run streams through the whole repository.
+        self.type_times = None
+        # Number of findings per category, for metrics.
+        self.findings = {}
+
+    def add_findings(self, category, count=1):
+        if count:
+            self.findings[category] = self.findings.get(category, 0) + count
+
+    def _add_file_time(self, filename, seconds):
+        if self.type_times is None:
+            with self._stats_lock:
+                self.file_times[filename] = self.file_times.get(filename, 0) + seconds
+            return
+        from utils.checker_stats import file_type
+
+        with self._stats_lock:
+            totals = self.type_times.setdefault(file_type(filename), [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+    def config_key(self):
+        """Returns the config of this checker that affects all files."""
+        return None
+
+    def file_config_key(self, filename):
+        """Returns the config that only affects |filename|, e.g. CPPLINT.cfg."""
+        return None
+
+    def tool_version(self, filename):
+        """Returns the version of the external tool used to check |filename|."""
+        return ""
+
+    def config_hash(self):
+        if self._config_hash is None:
+            from utils.result_cache import hash_object
+
+            self._config_hash = hash_object(self.config_key())
+        return self._config_hash
+
+    def check_file_cached(self, filename, check):
+        """Returns the findings of |check| for |filename|.
+
+        The findings are taken from the result cache when neither the file
+        content nor the checker, its config or its tool have changed. Only
+        the files that are checked add to |file_times|, as the time of a
+        cache hit says nothing about the cost of the file.
+        """
+        with watchdog.checking_file(filename), profiler.span(
+            filename, "file", checker=self.name
+        ) as span_args:
+            return self._check_file_cached(filename, check, span_args)
+
+    def _cache_key(self, filename):
+        if self.result_cache is None:
+            return None
+        return self.result_cache.make_key(self, filename)
+
+    def _cache_lookup(self, filename, span_args):
+        """Returns (key, findings), findings are None unless cached."""
+        key = self._cache_key(filename)
+        if key is None:
+            return None, None
+        findings = self.result_cache.get(key)
+        with self._stats_lock:
+            if findings is not None:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        span_args["cache"] = "miss" if findings is None else "hit"
+        return key, findings
+
+    def _check_file_cached(self, filename, check, span_args):
+        key, findings = self._cache_lookup(filename, span_args)
+        if findings is not None:
+            return findings
+        start = time.perf_counter()
+        try:
+            findings = check(filename)
+        finally:
+            self._add_file_time(filename, time.perf_counter() - start)
+        if key is not None:
+            self.result_cache.put(key, findings)
+        return findings
 
     def check_changed_lines(self, options, lines, line_indexes, changed_files):
         pass
@@ -41,72 +178,234 @@ class Checker:
     def _check_changed_lines(
         self, options, changed_files, changed_lines, verbose=False
     ):
-        current_file = None
-        current_start_line = 0
-        current_lines = []
-        sections = []
-
-        def finish_section(file, start_line, lines):
-            if lines:
-                key = self._file_name_cache.set(file)
-                sections.append((key, start_line, lines))
-
-        for line in changed_lines:
-            if line.startswith("-"):
-                continue
-            elif line.startswith("+++"):
-                finish_section(current_file, current_start_line, current_lines)
-                current_lines = []
-                matches = re.match(r"\+\+\+ b/(.*)", line)
-                if not matches:
-                    continue
-                (current_file,) = matches.groups()
-            elif line.startswith("@@"):
-                finish_section(current_file, current_start_line, current_lines)
-                current_lines = []
-
-                matches = re.match(r"@@ -\d+(,\d+)? \+(\d+)(,\d+)? @@.*", line)
-                if not matches:
-                    continue
-                line_number = matches.groups()[1]
-                current_start_line = int(line_number)
-            elif line.startswith("+"):
-                current_lines.append(line[1:])
-
-        finish_section(current_file, current_start_line, current_lines)
-
-        # calculate offsets
-        line_indexes = {}
-        current_offset = -1
-        changed_lines = []
-        for section in sections:
-            # section => (file_name_index, base_line_number, lines)
+        # |changed_lines| are the lines of a -U0 diff. Only the added lines
+        # are given to the checker, with the index of where they are.
+        line_indexes = LineIndexes()
+        lines = []
+        for file, start_line, added in iter_hunks(changed_lines):
             if verbose:
-                print("check section %s:%s" % (section[0], section[1]))
-            for i in range(len(section[2])):
-                current_offset += 1
-                line_indexes[current_offset] = (section[0], section[1] + i)
-            changed_lines.extend(section[2])
+                print("check section %s:%s" % (file, start_line))
+            key = self._file_name_cache.set(file)
+            line_indexes.add_hunk(key, file, start_line, len(added))
+            lines.extend(added)
 
         if verbose:
-            for i, line in enumerate(changed_lines):
+            for i, line in enumerate(lines):
                 print("%d: %s" % (i, line))
                 file_name_index, line_no = line_indexes[i]
                 print(self._file_name_cache.get(file_name_index) + ":" + str(line_no))
 
-        return self.check_changed_lines(
-            options, changed_lines, line_indexes, changed_files
-        )
+        return self.check_changed_lines(options, lines, line_indexes, changed_files)
 
     def run(self, options, mr, changed_files):
         if options.all:
             return self.check_changed_files(options, mr, changed_files)
         else:
-            if options.changed:
-                changed_lines = mr.GetChangedLines().split("\n")
-            else:
-                changed_lines = mr.GetLastCommitLines().split("\n")
-
+            changed_lines = get_changed_lines(options, mr)
             return self._check_changed_lines(
                 options, changed_files, changed_lines, options.verbose
             )
+
+
+class FileChecker(Checker, abc.ABC):
+    """Base of checkers that check one file at a time.
+
+    Instead of run(), subclasses implement check_file(), which returns the
+    findings of a file, and optionally batch_check() for tools that take
+    many files per invocation. The framework picks the files, reads their
+    content, reuses cached findings, checks the other files on up to |jobs|
+    threads and reports the findings in the order of the files.
+
+    The framework only calls run(), which this class adapts to
+    check_file(), so checkers that implement run() themselves, including
+    those loaded from external_checker_path, work unchanged.
+    """
+
+    # Check this many files at the same time. Only raise it for checkers
+    # whose work is done by subprocesses or is otherwise thread-safe.
+    jobs = 1
+    # Files per batch_check() call.
+    batch_size = 50
+    # Only read this many bytes of each file, None for the whole file.
+    content_limit = None
+    # Category of the findings, for metrics. Defaults to the checker name.
+    finding_category = None
+    streams_files = True
+
+    def __init__(self):
+        super().__init__()
+        # {path: [(first, last)]} of the changed lines, None if unknown.
+        self._changed_ranges = None
+
+    def should_check(self, path):
+        """Returns whether to check |path|, which exists."""
+        return True
+
+    def wants_changed_ranges(self, options):
+        """Returns whether check_file() needs the changed lines."""
+        return False
+
+    @abc.abstractmethod
+    def check_file(self, path, content, changed_ranges):
+        """Returns the findings of |path| as a list of strings.
+
+        |content| is the content of the file as bytes, e.g. as staged.
+        |changed_ranges| are the changed lines as [(first, last)], counted
+        from 1, or None to check the whole file.
+        """
+
+    def batch_check(self, files):
+        """Returns {path: findings} of |files|, [(path, content, ranges)].
+
+        Override for tools that check many files faster than one by one.
+        """
+        return {
+            path: self.check_file(path, content, changed_ranges)
+            for path, content, changed_ranges in files
+        }
+
+    def report_file(self, path, findings):
+        """Prints the progress of |path| as soon as it is checked.
+
+        The findings themselves are printed by report() at the end.
+        """
+        if findings:
+            print("    %d error(s)" % len(findings))
+
+    def report(self, findings):
+        """Prints the findings of all files and returns the result."""
+        if not findings:
+            return CheckResult.PASSED
+        print("Please check the following errors:\n")
+        for finding in findings:
+            print("    %s" % finding)
+        return CheckResult.FAILED
+
+    def _cache_key(self, filename):
+        if self.result_cache is None:
+            return None
+        ranges = None
+        if self._changed_ranges is not None:
+            ranges = self._changed_ranges.get(filename)
+        return self.result_cache.make_key(self, filename, ranges)
+
+    def _read(self, path):
+        if self.content_limit is None:
+            return self.content_store.read(path)
+        return self.content_store.read_head(path, self.content_limit)
+
+    def _unit(self, path):
+        ranges = None
+        if self._changed_ranges is not None:
+            ranges = self._changed_ranges.get(path, [])
+        return path, self._read(path), ranges
+
+    def _check_one(self, path):
+        return self.check_file_cached(path, lambda p: self.check_file(*self._unit(p)))
+
+    def _check_batch(self, paths):
+        start = time.perf_counter()
+        with profiler.span(
+            "%d files" % len(paths), "batch", checker=self.name
+        ), watchdog.checking_file(paths[0]):
+            results = self.batch_check([self._unit(path) for path in paths])
+        seconds = (time.perf_counter() - start) / len(paths)
+        for path in paths:
+            self._add_file_time(path, seconds)
+        return results
+
+    def iter_results(self, paths):
+        """Yields (path, findings) of |paths| in order while checking them.
+
+        |paths| is consumed lazily: at most a few files per worker, or
+        batches per worker, are read or checked ahead of the one that is
+        yielded, so that any number of files can stream through.
+        """
+        task = watchdog.current_task()
+
+        def helping(func, *args):
+            with watchdog.helping(task):
+                return func(*args)
+
+        batched = type(self).batch_check is not FileChecker.batch_check
+        jobs = max(1, self.jobs)
+        max_pending = 2 * jobs * (self.batch_size if batched else 1)
+        # [path, findings, future, cache key] in the order of |paths|.
+        pending = collections.deque()
+        # The entries of the cache misses of the next batch.
+        batch = []
+
+        def submit_batch():
+            future = executor.submit(
+                helping, self._check_batch, [entry[0] for entry in batch]
+            )
+            for entry in batch:
+                entry[2] = future
+            batch.clear()
+
+        def finish():
+            if pending[0][1] is None and pending[0][2] is None:
+                # The file waits for its batch to fill up.
+                submit_batch()
+            path, findings, future, key = pending.popleft()
+            if findings is not None:
+                return path, findings
+            if not batched:
+                return path, future.result()
+            findings = future.result().get(path, [])
+            if key is not None:
+                self.result_cache.put(key, findings)
+            return path, findings
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+        try:
+            for path in paths:
+                if not batched:
+                    future = executor.submit(helping, self._check_one, path)
+                    pending.append([path, None, future, None])
+                else:
+                    key, findings = self._cache_lookup(path, {})
+                    entry = [path, findings, None, key]
+                    pending.append(entry)
+                    if findings is None:
+                        batch.append(entry)
+                        if len(batch) >= self.batch_size:
+                            submit_batch()
+                while len(pending) > max_pending:
+                    yield finish()
+            if batch:
+                submit_batch()
+            while pending:
+                yield finish()
+        finally:
+            # Do not start the remaining files after a failure or a cancel.
+            executor.shutdown(cancel_futures=True)
+
+    def check_files(self, paths):
+        """Returns {path: findings} of |paths|."""
+        return dict(self.iter_results(paths))
+
+    def _paths(self, changed_files):
+        for path in changed_files:
+            if self._changed_ranges is not None and path not in self._changed_ranges:
+                # Only lines were removed.
+                continue
+            if self.content_store.exists(path) and self.should_check(path):
+                yield path
+
+    def run(self, options, mr, changed_files):
+        self._changed_ranges = None
+        if self.wants_changed_ranges(options):
+            self._changed_ranges = parse_changed_ranges(get_changed_lines(options, mr))
+        # Spooled to a file if there are many, |changed_files| may be a
+        # stream of the whole repository.
+        findings = SpooledList()
+        try:
+            for path, file_findings in self.iter_results(self._paths(changed_files)):
+                print(f"checking {path}")
+                self.report_file(path, file_findings)
+                findings.extend(file_findings)
+            self.add_findings(self.finding_category or self.name, len(findings))
+            return self.report(findings)
+        finally:
+            findings.close()
@@ -2,12 +2,11 @@
 # Licensed under the Apache License Version 2.0 that can be found in the
 # LICENSE file in the root directory of this source tree.
 
-import checkers
 import os
 import sys
 from config import Config
 from checkers.checker import Checker
-from utils.find_classes import find_classes
+from checkers.checker_manifest import CHECKER_MANIFEST, CheckerSpec
 
 
 def is_checker(cls):
@@ -16,18 +15,22 @@ def is_checker(cls):
 
 class CheckerManager:
     def __init__(self, ignore):
-        self.checker_classes = {
-            c.name: c for c in find_classes(checkers, is_checker, recursive=False)
-        }
+        # Built-in checkers are only imported when they are about to run, see
+        # checker_manifest.py.
+        self.checker_specs = {spec.name: spec for spec in CHECKER_MANIFEST}
 
         self.load_external_checker()
         self.remove_ignore_checker(ignore)
 
+    @property
+    def checker_classes(self):
+        return {name: spec.load() for name, spec in self.checker_specs.items()}
+
     def remove_ignore_checker(self, ignore):
-        old_checker_class = self.checker_classes
-        self.checker_classes = {
-            name: cls
-            for name, cls in old_checker_class.items()
+        old_checker_specs = self.checker_specs
+        self.checker_specs = {
+            name: spec
+            for name, spec in old_checker_specs.items()
             if name not in ignore.split(",")
         }
 
@@ -41,14 +44,15 @@ class CheckerManager:
         sys.path.insert(0, abs_dir_path)
         try:
             import external_checkers
+            from utils.find_classes import find_classes
 
             classes = find_classes(external_checkers, is_checker, recursive=False)
-            for c in classes:
-                self.checker_classes[c.name] = c
+            for c in sorted(classes, key=lambda c: c.name):
+                self.checker_specs[c.name] = CheckerSpec.from_class(c)
         except Exception as e:
             print(f"Import external checker error {e}")
 
 
 if __name__ == "__main__":
     Config.init()
-    CheckerManager()
+    CheckerManager("none")
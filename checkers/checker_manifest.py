@@ -0,0 +1,158 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import fnmatch
+import importlib
+import re
+
+# Extensions formatted by clang-format, prettier or gn, see format_file_filter.py
+# and path_filter.py.
+CODING_STYLE_EXTENSIONS = (
+    ".java",
+    ".h",
+    ".hpp",
+    ".c",
+    ".cc",
+    ".cpp",
+    ".m",
+    ".mm",
+    ".ts",
+    ".tsx",
+    ".yml",
+    ".yaml",
+    ".gn",
+    ".gni",
+)
+
+
+class CheckerSpec:
+    """Describes a checker without importing the module that implements it."""
+
+    def __init__(
+        self,
+        name,
+        help,
+        module,
+        class_name,
+        extensions=None,
+        paths=None,
+        startup_cost=0.1,
+        file_cost=0.01,
+        cls=None,
+    ):
+        self.name = name
+        self.help = help
+        self.module = module
+        self.class_name = class_name
+        self.extensions = extensions
+        self.paths = paths
+        # Expected seconds to start the checker and to check one file, used
+        # to order checkers until their timings are recorded.
+        self.startup_cost = startup_cost
+        self.file_cost = file_cost
+        self._cls = cls
+        self._paths_regex = None
+
+    @classmethod
+    def from_class(cls, checker_class):
+        return cls(
+            checker_class.name,
+            checker_class.help,
+            checker_class.__module__,
+            checker_class.__name__,
+            extensions=checker_class.extensions,
+            paths=checker_class.paths,
+            cls=checker_class,
+        )
+
+    @property
+    def checks_files(self):
+        return self.extensions != ()
+
+    def handles(self, path):
+        """Returns whether the checker looks at |path|."""
+        if self.extensions is not None and not path.endswith(self.extensions):
+            return False
+        if self.paths is not None:
+            if self._paths_regex is None:
+                # One regex for all patterns, compiled on first use.
+                self._paths_regex = re.compile(
+                    "|".join("(?:%s)" % fnmatch.translate(p) for p in self.paths)
+                    or "(?!)"
+                )
+            return self._paths_regex.match(path) is not None
+        return True
+
+    def select(self, files):
+        """Returns the files of |files| that the checker looks at."""
+        return [path for path in files if self.handles(path)]
+
+    def load(self):
+        if self._cls is None:
+            module = importlib.import_module(self.module)
+            self._cls = getattr(module, self.class_name)
+        return self._cls
+
+    def create(self):
+        return self.load()()
+
+
+# Built-in checkers, in the order they are listed. They are run cheapest first,
+# see utils/checker_stats.py. Keep in sync with the name, help, extensions and
+# paths of the checker classes.
+CHECKER_MANIFEST = [
+    CheckerSpec(
+        "commit-message",
+        "Check style of commit message",
+        "checkers.commit_message_checker",
+        "CommitMessageChecker",
+        extensions=(),
+        startup_cost=0.01,
+    ),
+    CheckerSpec(
+        "file-type",
+        "Check file type",
+        "checkers.file_type_checker",
+        "FileTypeChecker",
+        startup_cost=0.05,
+        file_cost=0.001,
+    ),
+    CheckerSpec(
+        "coding-style",
+        "Check coding style",
+        "checkers.coding_style_checker",
+        "CodingStyleChecker",
+        extensions=CODING_STYLE_EXTENSIONS,
+        startup_cost=0.0,
+        file_cost=0.05,
+    ),
+    CheckerSpec(
+        "cpplint",
+        "Run cpplint",
+        "checkers.cpplint_checker",
+        "CpplintChecker",
+        extensions=(".cc", ".cpp", ".h"),
+        startup_cost=0.05,
+        file_cost=0.02,
+    ),
+    CheckerSpec(
+        "java-lint",
+        "Run java lint",
+        "checkers.java_lint_checker",
+        "CpplintChecker",
+        extensions=(".java", ".kt"),
+        # pmd starts a JVM per ruleset.
+        startup_cost=5.0,
+        file_cost=0.05,
+    ),
+    CheckerSpec(
+        "android-check-style",
+        "java and kotlin code style check",
+        "checkers.android_code_style_checker",
+        "AndroidCodeStyleChecker",
+        extensions=(".java",),
+        # checkstyle starts a JVM per file.
+        startup_cost=1.0,
+        file_cost=1.0,
+    ),
+]
@@ -0,0 +1,258 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from checkers.checker import CheckResult
+from utils import watchdog
+
+# Bytes of output a task keeps in memory before it moves it to a file, e.g.
+# the findings of a run over the whole repository.
+OUTPUT_SPOOL_SIZE = 1024 * 1024
+
+# Seconds to wait for cancelled tasks to stop before leaving them behind.
+CANCEL_GRACE = 1.0
+
+
+class _ThreadLocalStream:
+    """Redirects writes made by worker threads into per-thread buffers.
+
+    Threads that help a task, see watchdog.helping(), write to the output
+    of the task. Writes from other threads go to the wrapped stream.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def bind(self, buffer):
+        self._local.buffer = buffer
+
+    def unbind(self):
+        self._local.buffer = None
+
+    def _target(self):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = getattr(watchdog.current_task(), "output", None)
+        return buffer or self._stream
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def writelines(self, lines):
+        self._target().writelines(lines)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _TaskOutput:
+    """Collects the output of a task, or passes it through to |stream|.
+
+    Once muted, e.g. because the task was left behind after a timeout, the
+    output is dropped. Collected output is spooled to a temporary file when
+    it gets large.
+    """
+
+    def __init__(self, stream=None):
+        self._stream = stream
+        self._buffer = tempfile.SpooledTemporaryFile(
+            max_size=OUTPUT_SPOOL_SIZE, mode="w+", encoding="utf-8", errors="replace"
+        )
+        self._lock = threading.Lock()
+        self._muted = False
+
+    def write(self, s):
+        if self._muted:
+            return len(s)
+        if self._stream:
+            return self._stream.write(s)
+        # Helper threads of the task write as well.
+        with self._lock:
+            return self._buffer.write(s)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        if self._stream and not self._muted:
+            self._stream.flush()
+
+    def mute(self):
+        self._muted = True
+
+    def replay(self, stream):
+        """Writes the collected output to |stream| and drops it."""
+        with self._lock:
+            self._buffer.seek(0)
+            shutil.copyfileobj(self._buffer, stream)
+            self._buffer.close()
+            self._muted = True
+
+
+class CheckerTask:
+    def __init__(self, name, func, timeout=None, subprocess_timeout=None):
+        self.name = name
+        self.func = func
+        self.result = None
+        self.output = _TaskOutput()
+        self.done = threading.Event()
+        self.watch = watchdog.Task(name, timeout, subprocess_timeout)
+        self.watch.output = self.output
+        self.started = False
+        self._lock = threading.Lock()
+
+    def run(self):
+        self.started = True
+        try:
+            with watchdog.running(self.watch):
+                result = self.func()
+        except watchdog.Cancelled:
+            result = CheckResult.CANCELLED
+        except Exception:
+            traceback.print_exc()
+            result = CheckResult.FAILED
+        if self.watch.timed_out:
+            result = CheckResult.FAILED
+        elif self.watch.cancelled and result != CheckResult.PASSED:
+            # Failures caused by killing the subprocesses of the task.
+            result = CheckResult.CANCELLED
+        for message in self.watch.timeouts:
+            print("[%s] %s" % (self.name, message))
+        self.finish(result)
+
+    def finish(self, result):
+        """Sets the result, unless the task was already finished."""
+        with self._lock:
+            if self.done.is_set():
+                return False
+            self.result = result
+            self.done.set()
+            return True
+
+
+class CheckerScheduler:
+    """Runs checker tasks on a pool of worker threads.
+
+    With more than one job, the output of each task is buffered and replayed
+    in the order the tasks were added, so the report looks the same as a
+    sequential run. Tasks that exceed their time budget are left behind and
+    reported as failed. With |fail_fast|, the first failure cancels all
+    other tasks.
+    """
+
+    def __init__(self, jobs=1, fail_fast=False):
+        self.jobs = max(1, jobs)
+        self.fail_fast = fail_fast
+        self.tasks = []
+        self._cancel_time = None
+
+    def add(self, name, func, timeout=None, subprocess_timeout=None):
+        self.tasks.append(CheckerTask(name, func, timeout, subprocess_timeout))
+
+    def cancel(self):
+        if self._cancel_time is None:
+            self._cancel_time = time.monotonic()
+        for task in self.tasks:
+            if not task.done.is_set():
+                # Hide the errors caused by killing the subprocesses.
+                task.output.mute()
+            task.watch.cancel()
+
+    def _wait(self, task):
+        while not task.done.wait(watchdog.POLL_INTERVAL):
+            if task.watch.timed_out:
+                # The task is stuck in Python code; its subprocesses are
+                # already killed.
+                result = CheckResult.FAILED
+            elif self._cancel_time is not None and (
+                not task.started or time.monotonic() - self._cancel_time > CANCEL_GRACE
+            ):
+                result = CheckResult.CANCELLED
+            else:
+                continue
+            if task.finish(result):
+                task.output.mute()
+                return True
+        return False
+
+    def run(self):
+        stdout = _ThreadLocalStream(sys.stdout)
+        stderr = _ThreadLocalStream(sys.stderr)
+        pending = queue.Queue()
+        for task in self.tasks:
+            if self.jobs == 1:
+                task.output = _TaskOutput(sys.stdout)
+                task.watch.output = task.output
+            pending.put(task)
+
+        def worker():
+            while True:
+                try:
+                    task = pending.get_nowait()
+                except queue.Empty:
+                    return
+                if self._cancel_time is not None:
+                    task.finish(CheckResult.CANCELLED)
+                    continue
+                stdout.bind(task.output)
+                stderr.bind(task.output)
+                try:
+                    task.run()
+                finally:
+                    stdout.unbind()
+                    stderr.unbind()
+                if self.fail_fast and task.result == CheckResult.FAILED:
+                    self.cancel()
+
+        workers = []
+
+        def start_worker():
+            thread = threading.Thread(
+                target=worker, name="checker-worker-%d" % len(workers), daemon=True
+            )
+            workers.append(thread)
+            thread.start()
+
+        old_stdout, old_stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = stdout, stderr
+        try:
+            # Tasks run on worker threads even with one job, so that a task
+            # stuck past its time budget can be left behind.
+            for _ in range(min(self.jobs, len(self.tasks))):
+                start_worker()
+            for task in self.tasks:
+                left_behind = self._wait(task)
+                task.output.replay(old_stdout)
+                if left_behind and task.started:
+                    # Replace the worker that is stuck with the task.
+                    start_worker()
+                if left_behind:
+                    for message in task.watch.timeouts:
+                        old_stdout.write("[%s] %s\n" % (task.name, message))
+                if left_behind or task.result == CheckResult.CANCELLED:
+                    old_stdout.write("\n[%s] %s\n\n" % (task.name, task.result))
+                old_stdout.flush()
+        finally:
+            sys.stdout, sys.stderr = old_stdout, old_stderr
+        return self.results()
+
+    def results(self):
+        return [(task.name, task.result) for task in self.tasks]
+
+    def cancelled(self):
+        return [t.name for t in self.tasks if t.result == CheckResult.CANCELLED]
+
+    def passed(self):
+        return all(task.result == CheckResult.PASSED for task in self.tasks)
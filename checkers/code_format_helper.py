@@ -3,6 +3,7 @@
 # Licensed under the Apache License Version 2.0 that can be found in the
 # LICENSE file in the root directory of this source tree.
 
+import shlex
 import subprocess, sys, os
 from utils.merge_request import MergeRequest
 from config import Config
@@ -12,7 +13,8 @@ def runCommand(cmd):
     p = subprocess.Popen(
         cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
     )
-    return p.stdout.readlines()
+    output, _ = p.communicate()
+    return output.splitlines(keepends=True)
 
 
 _CHECK_FORMAT_COMMAND = {
@@ -45,10 +47,77 @@ def get_check_format_command(path):
     return "clang-format -style=file"
 
 
+def get_tool_version(path):
+    """Returns the version of the tool that checks the format of |path|."""
+    if check_gn_suffix(path):
+        command = "gn"
+    else:
+        command = get_check_format_command(path)
+    if "prettier@" in command:
+        # The version is pinned in the command itself.
+        return command
+    tool = command.split(" ")[0]
+    output = runCommand("{} --version".format(tool))
+    return b"".join(output).decode("utf-8", "replace")
+
+
+def find_clang_format_config(dir_path):
+    """Returns the .clang-format file that applies to files in |dir_path|."""
+    while True:
+        for name in (".clang-format", "_clang-format"):
+            config_file = os.path.join(dir_path, name)
+            if os.path.isfile(config_file):
+                return config_file
+        parent = os.path.dirname(dir_path)
+        if parent == dir_path:
+            return None
+        dir_path = parent
+
+
+# Files prettier reads its options from, nearest first in each directory.
+_PRETTIER_CONFIG_FILES = (
+    ".prettierrc",
+    ".prettierrc.json",
+    ".prettierrc.yaml",
+    ".prettierrc.yml",
+    ".prettierrc.json5",
+    ".prettierrc.js",
+    ".prettierrc.cjs",
+    ".prettierrc.mjs",
+    ".prettierrc.toml",
+    "prettier.config.js",
+    "prettier.config.cjs",
+    "prettier.config.mjs",
+    "package.json",
+)
+
+
+def find_prettier_config(dir_path):
+    """Returns the prettier config file that applies to files in |dir_path|."""
+    while True:
+        for name in _PRETTIER_CONFIG_FILES:
+            config_file = os.path.join(dir_path, name)
+            if not os.path.isfile(config_file):
+                continue
+            if name == "package.json":
+                # Only a "prettier" key makes it a config.
+                with open(config_file, encoding="utf-8", errors="replace") as f:
+                    if '"prettier"' not in f.read():
+                        continue
+            return config_file
+        parent = os.path.dirname(dir_path)
+        if parent == dir_path:
+            return None
+        dir_path = parent
+
+
 def check_end_of_newline(path):
-    cmd = "tail -c1 < {}".format(path)
-    output = runCommand(cmd)
-    return len(output) == 1 and output[0] == b"\n"
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
 
 
 def check_gn_suffix(path):
@@ -73,6 +142,36 @@ def check_format(path):
     return not lines and check_end_of_newline(path)
 
 
+def get_stdin_format_command(path):
+    """Returns the command that prints the formatted stdin as |path|."""
+    if check_gn_suffix(path):
+        return "gn format --stdin"
+    command = get_check_format_command(path)
+    if command.startswith("clang-format"):
+        return "{} --assume-filename={}".format(command, shlex.quote(path))
+    return "{} --stdin-filepath {}".format(command, shlex.quote(path))
+
+
+def check_format_content(path, content, args=(), check_newline=True):
+    """Like check_format, but checks |content| instead of the file on disk.
+
+    The content is given to the formatter on stdin and compared with its
+    output in-process, which saves the diff, wc and tail processes. |args|
+    are added to the command, e.g. to only format some lines.
+    """
+    command = get_stdin_format_command(path)
+    if args:
+        command += " " + " ".join(shlex.quote(arg) for arg in args)
+    p = subprocess.run(
+        command,
+        shell=True,
+        input=content,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    return p.stdout == content and (not check_newline or content.endswith(b"\n"))
+
+
 def cd_to_git_root_directory():
     dir_path = os.path.dirname(os.path.realpath(__file__))
     os.chdir(dir_path)
@@ -1,29 +1,102 @@
 # Copyright 2024 The Lynx Authors. All rights reserved.
 # Licensed under the Apache License Version 2.0 that can be found in the
 # LICENSE file in the root directory of this source tree.
+import os
 import sys
+import threading
 
 import checkers.code_format_helper as code_format_helper
+from checkers.code_format_helper import check_gn_suffix, get_check_format_command
 import checkers.format_file_filter as format_file_filter
-from checkers.checker import Checker, CheckResult
+from checkers.checker import CheckResult, FileChecker
+from checkers.checker_manifest import CODING_STYLE_EXTENSIONS
+from config import Config
+from utils.diff_parser import count_lines
 
 
-class CodingStyleChecker(Checker):
+class CodingStyleChecker(FileChecker):
     name = "coding-style"
     help = "Check coding style"
+    extensions = CODING_STYLE_EXTENSIONS
+    # The formatters run as subprocesses.
+    jobs = os.cpu_count() or 1
+    finding_category = "format"
+
+    def __init__(self):
+        super().__init__()
+        self._tool_versions = {}
+        # (directory, tool) => content of the config file of the formatter.
+        self._format_configs = {}
+        self._lock = threading.Lock()
+
+    def config_key(self):
+        return Config.get("npx-no-install")
+
+    def file_config_key(self, filename):
+        if check_gn_suffix(filename):
+            return None
+        if get_check_format_command(filename).startswith("clang-format"):
+            find_config = code_format_helper.find_clang_format_config
+        else:
+            find_config = code_format_helper.find_prettier_config
+        dir_path = os.path.dirname(os.path.abspath(filename))
+        key = (dir_path, find_config.__name__)
+        with self._lock:
+            if key not in self._format_configs:
+                content = None
+                config_file = find_config(dir_path)
+                if config_file:
+                    with open(config_file, encoding="utf-8", errors="replace") as f:
+                        content = f.read()
+                self._format_configs[key] = content
+            return self._format_configs[key]
+
+    def tool_version(self, filename):
+        tool = os.path.splitext(filename)[1]
+        # Ask each tool once, even when files are checked in parallel.
+        with self._lock:
+            if tool not in self._tool_versions:
+                self._tool_versions[tool] = code_format_helper.get_tool_version(
+                    filename
+                )
+            return self._tool_versions[tool]
+
+    def should_check(self, path):
+        return format_file_filter.shouldFormatFile(
+            path
+        ) and not self.content_store.is_symlink(path)
+
+    def wants_changed_ranges(self, options):
+        return options.diff_ranges and not options.all
+
+    def check_file(self, path, content, changed_ranges):
+        args = ()
+        check_newline = True
+        if changed_ranges is not None:
+            args = format_file_filter.getRangeArguments(
+                format_file_filter.getFormatTool(path), changed_ranges, content
+            )
+            if args is None:
+                args = ()
+            else:
+                # Only ask for the final newline if the last line changed.
+                check_newline = changed_ranges[-1][1] >= count_lines(content)
+        if code_format_helper.check_format_content(path, content, args, check_newline):
+            return []
+        return [path]
 
     def run(self, options, mr, changed_files):
-        failed_path = []
         print("Checking file format.")
-        for filename in changed_files:
-            if format_file_filter.shouldFormatFile(filename):
-                print(f"checking {filename}")
-                if not code_format_helper.check_format(filename):
-                    failed_path.append(filename)
-        if len(failed_path) > 0:
-            print("The following file(s) do not satisfy `clang-format` or `prettier`!")
-            for filename in failed_path:
-                print(filename)
-            return CheckResult.FAILED
-        else:
+        return super().run(options, mr, changed_files)
+
+    def report_file(self, path, findings):
+        if findings:
+            print("    does not satisfy `clang-format` or `prettier`")
+
+    def report(self, findings):
+        if not findings:
             return CheckResult.PASSED
+        print("The following file(s) do not satisfy `clang-format` or `prettier`!")
+        for filename in findings:
+            print(filename)
+        return CheckResult.FAILED
@@ -10,6 +10,7 @@ from checkers.commit_message_helper import CheckCommitMessage
 class CommitMessageChecker(Checker):
     name = "commit-message"
     help = "Check style of commit message"
+    extensions = ()
 
     def run(self, options, mr, changed_files):
         print("Checking commit message...")
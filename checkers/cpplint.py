@@ -973,6 +973,11 @@ def GetErrorStingList():
     return _cpplint_state.error_string_list
 
 
+def ResetErrorState():
+    _cpplint_state.ResetErrorCounts()
+    _cpplint_state.error_string_list = []
+
+
 def _OutputFormat():
     """Gets the module's output format."""
     return _cpplint_state.output_format
@@ -6892,7 +6897,7 @@ def ProcessConfigOverrides(filename):
     return True
 
 
-def ProcessFile(filename, vlevel, extra_check_functions=[]):
+def ProcessFile(filename, vlevel, extra_check_functions=[], content=None):
     """Does google-lint on a single file.
 
     Args:
@@ -6904,6 +6909,9 @@ def ProcessFile(filename, vlevel, extra_check_functions=[]):
       extra_check_functions: An array of additional check functions that will be
                              run on each source line. Each function takes 4
                              arguments: filename, clean_lines, line, error
+
+      content: The content of the file as bytes or str, read from |filename|
+               if None.
     """
 
     _SetVerboseLevel(vlevel)
@@ -6934,6 +6942,10 @@ def ProcessFile(filename, vlevel, extra_check_functions=[]):
                 .read()
                 .split("\n")
             )
+        elif content is not None:
+            if isinstance(content, bytes):
+                content = content.decode("utf8", "replace")
+            lines = content.split("\n")
         else:
             lines = codecs.open(filename, "r", "utf8", "replace").read().split("\n")
 
@@ -1,24 +1,126 @@
 # Copyright 2024 The Lynx Authors. All rights reserved.
 # Licensed under the Apache License Version 2.0 that can be found in the
 # LICENSE file in the root directory of this source tree.
+import hashlib
+import os
+import re
+import sys
+
 import checkers.cpplint as cpplint
 import checkers.format_file_filter as format_file_filter
 from checkers.checker import Checker, CheckResult
+from config import Config
+from utils.pipeline import SpooledList
+
+_cpplint_source_hash = None
+
+# The category at the end of an error string, e.g. "[whitespace/tab] [1]".
+_ERROR_CATEGORY = re.compile(r"\[([^\]]+)\] \[\d\]\s*$")
+
+
+def get_cpplint_source_hash():
+    global _cpplint_source_hash
+    if _cpplint_source_hash is None:
+        with open(cpplint.__file__, "rb") as f:
+            _cpplint_source_hash = hashlib.sha1(f.read()).hexdigest()
+    return _cpplint_source_hash
 
 
 class CpplintChecker(Checker):
     name = "cpplint"
     help = "Run cpplint"
+    # Extensions that are both formatted and linted by cpplint.
+    extensions = (".cc", ".cpp", ".h")
+    streams_files = True
+
+    def __init__(self):
+        super().__init__()
+        self._cfg_files = {}
+
+    def read_cfg_file(self, dir_path):
+        if dir_path not in self._cfg_files:
+            content = None
+            cfg_file = os.path.join(dir_path, "CPPLINT.cfg")
+            if os.path.isfile(cfg_file):
+                with open(cfg_file, encoding="utf-8", errors="replace") as f:
+                    content = f.read()
+            self._cfg_files[dir_path] = content
+        return self._cfg_files[dir_path]
+
+    def file_config_key(self, filename):
+        # cpplint reads every CPPLINT.cfg from the directory of the file up to
+        # the file system root.
+        cfg_files = []
+        dir_path = os.path.dirname(os.path.abspath(filename))
+        while True:
+            content = self.read_cfg_file(dir_path)
+            if content is not None:
+                cfg_files.append((dir_path, content))
+            parent = os.path.dirname(dir_path)
+            if parent == dir_path:
+                line_length = self.line_length(filename)
+                return cfg_files + [line_length] if line_length else cfg_files
+            dir_path = parent
+
+    def line_length(self, filename):
+        """Returns the line length set by .tools_shared, 0 if not set."""
+        return Config.for_path(filename)["cpplint-checker"]["linelength"]
+
+    def tool_version(self, filename):
+        return get_cpplint_source_hash()
+
+    def lint_file(self, filename):
+        first_error = len(cpplint.GetErrorStingList())
+        try:
+            content = self.content_store.text(filename)
+        except (OSError, KeyError):
+            # Let cpplint report the file it cannot read.
+            content = None
+        line_length = self.line_length(filename)
+        if line_length:
+            # CPPLINT.cfg files of the file can still override it.
+            old_line_length = cpplint._line_length
+            cpplint._line_length = line_length
+        try:
+            cpplint.ProcessFile(filename, 0, content=content)
+        finally:
+            if line_length:
+                cpplint._line_length = old_line_length
+        errors = cpplint.GetErrorStingList()[first_error:]
+        # Only keep the errors of the file, which the run spools.
+        del cpplint.GetErrorStingList()[first_error:]
+        return errors
 
     def run(self, options, mr, changed_files):
+        # cpplint keeps its errors in module state, which outlives a single
+        # run when served by `git lynx serve`.
+        cpplint.ResetErrorState()
+        # Count the errors of every category, for metrics.
+        cpplint._SetCountingStyle("detailed")
+        # Spooled to a file if there are many, e.g. with --all.
+        errors = SpooledList()
         for filename in changed_files:
             if format_file_filter.shouldFormatFile(filename):
                 print(f"checking {filename}")
-                cpplint.ProcessFile(filename, 0)
-        if (cpplint.GetErrorCount()) > 0:
-            print("Please check the following errors:\n")
-            for error in cpplint.GetErrorStingList():
-                print(("    %s" % error))
-            return CheckResult.FAILED
-        else:
-            return CheckResult.PASSED
+                cache_hits = self.cache_hits
+                findings = self.check_file_cached(filename, self.lint_file)
+                if self.cache_hits != cache_hits:
+                    sys.stderr.write("".join(findings))
+                    # Cached errors are not counted by cpplint.
+                    for error in findings:
+                        match = _ERROR_CATEGORY.search(error)
+                        if match:
+                            self.add_findings(match.group(1))
+                errors.extend(findings)
+        for category, count in cpplint._cpplint_state.errors_by_category.items():
+            self.add_findings(category, count)
+        try:
+            if len(errors) > 0:
+                print("Please check the following errors:\n")
+                for error in errors:
+                    print(("    %s" % error))
+                return CheckResult.FAILED
+            else:
+                return CheckResult.PASSED
+        finally:
+            errors.close()
@@ -8,6 +8,13 @@ checker_default_config = {
         "binary-files-allow-list": [],
     },
     "coding-style-checker": {"ignore-suffixes": [], "ignore-dirs": []},
+    # Maximum line length, 0 for the one of cpplint or CPPLINT.cfg.
+    "cpplint-checker": {"linelength": 0},
+    # Checkers that skip the files of the directory.
+    "disabled-checkers": [],
+    # Directories no checker looks at, e.g. vendored code. Files are listed
+    # without them, see path_filter.git_excludes.
+    "ignore-dirs": [],
     "header-path-checker": {
         "processed-file-dirs": [],
         "exclude-processed-file-dirs": [],
@@ -15,4 +22,13 @@ checker_default_config = {
         "header-search-paths": [],
         "first-header-search-paths": [],
     },
+    # Time budgets in seconds, 0 for no limit.
+    "timeouts": {
+        # For a whole checker.
+        "checker": 0,
+        # Per checker overrides of "checker", e.g. {"cpplint": 300}.
+        "checkers": {},
+        # For a single subprocess started by a checker, e.g. prettier.
+        "subprocess": 600,
+    },
 }
@@ -1,30 +1,22 @@
 # Copyright 2024 The Lynx Authors. All rights reserved.
 # Licensed under the Apache License Version 2.0 that can be found in the
 # LICENSE file in the root directory of this source tree.
-import re
-import os
 import subprocess
 
-from checkers.checker import Checker, CheckResult
-from config import Config
+from checkers import path_filter
+from checkers.checker import CheckResult, FileChecker
 
 
-BINARY_FILES_ALLOW_LIST = Config.value(
-    "checker-config", "file-type-checker", "binary-files-allow-list"
-)
-
-
-def is_binary(file_path):
+def is_binary(file_path, content=None):
     chars = bytearray({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7F})
-    with open(file_path, "rb") as f:
-        return bool(f.read(1024).translate(None, chars))
+    if content is None:
+        with open(file_path, "rb") as f:
+            content = f.read(1024)
+    return bool(content[:1024].translate(None, chars))
 
 
 def in_allow_list(file_path):
-    for r in BINARY_FILES_ALLOW_LIST:
-        if re.search(r, file_path):
-            return True
-    return False
+    return not path_filter.should_check("file-type", file_path)
 
 
 def is_lfs_files(file_path):
@@ -41,30 +33,43 @@ def get_lfs_files():
     return file_list
 
 
-class FileTypeChecker(Checker):
+class FileTypeChecker(FileChecker):
     name = "file-type"
     help = "Check file type"
+    # Binary files are told by their first bytes.
+    content_limit = 1024
+    finding_category = "binary"
+
+    def __init__(self):
+        super().__init__()
+        self._lfs_files = None
+
+    def should_check(self, path):
+        if in_allow_list(path):
+            return False
+        if self._lfs_files is None:
+            # List the LFS files once instead of once per file.
+            self._lfs_files = set(get_lfs_files())
+        return path not in self._lfs_files
+
+    def check_file(self, path, content, changed_ranges):
+        return [path] if is_binary(path, content) else []
 
     def run(self, options, mr, changed_files):
-        binary_files = []
-        for filename in changed_files:
-            print(f"checking {filename}")
-            if in_allow_list(filename):
-                continue
-            if os.path.isdir(filename):
-                continue
-            if is_lfs_files(filename):
-                continue
-            if is_binary(filename):
-                binary_files.append(filename)
-
-        if len(binary_files) > 0:
-            print("Please check the following errors:\n")
-            print(
-                "Binary files are not allowed to commit to the git repository. "
-                "Please use Habitat tool to manage these files:\n"
-            )
-            print("    " + "\n    ".join(binary_files))
-            return CheckResult.FAILED
-        else:
+        self._lfs_files = None
+        return super().run(options, mr, changed_files)
+
+    def report_file(self, path, findings):
+        if findings:
+            print("    binary file")
+
+    def report(self, findings):
+        if not findings:
             return CheckResult.PASSED
+        print("Please check the following errors:\n")
+        print(
+            "Binary files are not allowed to commit to the git repository. "
+            "Please use Habitat tool to manage these files:\n"
+        )
+        print("    " + "\n    ".join(findings))
+        return CheckResult.FAILED
@@ -0,0 +1,118 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Formats many files at once for `git lynx format`.
+
+Files are grouped by the tool that formats them, and each tool is given
+many files per invocation. The invocations run on a pool of worker threads,
+and the missing newlines at the end of files are added in-process.
+
+When only the changed lines are formatted, each file gets its own
+invocation, since the line ranges differ from file to file.
+"""
+
+import concurrent.futures
+import subprocess
+
+import checkers.format_file_filter as format_file_filter
+from utils.diff_parser import count_lines
+
+# Files passed to one invocation of a tool, which keeps the command line
+# short and lets the worker pool balance large groups.
+FILES_PER_COMMAND = 50
+
+
+def group_files(files, ranges=None):
+    """Returns the (tool, files, ranges) batches to format |files| with.
+
+    |ranges| maps files to the line ranges to format, None to format whole
+    files. Files that are not in |ranges| are left out.
+    """
+    groups = {}
+    batches = []
+    for path in files:
+        tool = format_file_filter.getFormatTool(path)
+        if ranges is None:
+            groups.setdefault(tool, []).append(path)
+        elif path in ranges:
+            batches.append((tool, [path], ranges[path]))
+    for tool, paths in sorted(groups.items()):
+        for i in range(0, len(paths), FILES_PER_COMMAND):
+            batches.append((tool, paths[i : i + FILES_PER_COMMAND], None))
+    return batches
+
+
+def fix_end_of_newline(path):
+    """Appends a newline to |path| if it does not end with one."""
+    with open(path, "rb+") as f:
+        f.seek(0, 2)
+        if f.tell() > 0:
+            f.seek(-1, 2)
+            if f.read(1) == b"\n":
+                return
+        f.write(b"\n")
+
+
+def _run(command, verbose):
+    if verbose:
+        print("Running " + " ".join(command))
+    p = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output = p.stdout.decode("utf-8", "replace")
+    error = p.stderr.decode("utf-8", "replace")
+    if verbose and output:
+        print(output)
+    if p.returncode != 0:
+        return False, error or "exit code %d" % p.returncode
+    # Tools also print warnings to stderr, e.g. prettier about its config.
+    if verbose and error:
+        print(error)
+    return True, error
+
+
+def format_batch(tool, paths, verbose=False, ranges=None):
+    """Formats |paths| with |tool| and returns the errors by file.
+
+    With |ranges|, only those lines of the single file in |paths| are
+    formatted, if the tool supports it.
+    """
+    command = format_file_filter.getFormatToolCommand(tool)
+    fix_newline = True
+    if ranges:
+        with open(paths[0], "rb") as f:
+            content = f.read()
+        args = format_file_filter.getRangeArguments(tool, ranges, content)
+        if args is not None:
+            command += args
+            fix_newline = ranges[-1][1] >= count_lines(content)
+    errors = {}
+    ok, error = _run(command + paths, verbose)
+    if not ok:
+        if len(paths) == 1:
+            errors[paths[0]] = error
+        else:
+            # Find the files the tool failed on, it may have stopped at the
+            # first one.
+            for path in paths:
+                ok, error = _run(command + [path], verbose)
+                if not ok:
+                    errors[path] = error
+    for path in paths:
+        if path not in errors and fix_newline:
+            fix_end_of_newline(path)
+    return errors
+
+
+def format_files(files, jobs=None, verbose=False, ranges=None):
+    """Formats |files| in place and returns the errors by file.
+
+    |ranges| maps files to the line ranges to format, see group_files.
+    """
+    errors = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(format_batch, tool, paths, verbose, file_ranges)
+            for tool, paths, file_ranges in group_files(files, ranges)
+        ]
+        for future in futures:
+            errors.update(future.result())
+    return errors
@@ -3,30 +3,16 @@
 # Licensed under the Apache License Version 2.0 that can be found in the
 # LICENSE file in the root directory of this source tree.
 
-import re
 import sys, os, subprocess
 from utils.merge_request import MergeRequest
+from checkers import path_filter
+from checkers.checker_manifest import CODING_STYLE_EXTENSIONS
 from config import Config
 
 gn_path = "gn"
 
 # Only check format for following file types.
-_FILE_EXTENSIONS = [
-    ".java",
-    ".h",
-    ".hpp",
-    ".c",
-    ".cc",
-    ".cpp",
-    ".m",
-    ".mm",
-    ".ts",
-    ".tsx",
-    ".yml",
-    ".yaml",
-    ".gn",
-    ".gni",
-]
+_FILE_EXTENSIONS = CODING_STYLE_EXTENSIONS
 # Commands should be used.
 _FORMAT_COMMAND = {
     ".yml": ["npx", "--quiet", "--yes", "prettier@2.2.1 -w"],
@@ -44,33 +30,31 @@ __FORMAT_COMMAND_NO_INSTALL = {
     ".gn": ["{} format ".format(gn_path)],
     ".gni": ["{} format ".format(gn_path)],
 }
-# Files endsWith these suffixes will not be checked.
-_FORBIDDEN_SUFFIXES = Config.value(
-    "checker-config", "coding-style-checker", "ignore-suffixes"
-)
-# Files in these directories will not be checked.
-_FORBIDDEN_DIRS = Config.value("checker-config", "coding-style-checker", "ignore-dirs")
+# Tools that format files in place, by extension, see getFormatToolCommand.
+_FORMAT_TOOLS = {
+    ".yml": "prettier",
+    ".yaml": "prettier",
+    ".ts": "prettier",
+    ".tsx": "prettier",
+    ".gn": "gn",
+    ".gni": "gn",
+}
+# Files with the "ignore-suffixes" or in the "ignore-dirs" of the
+# coding-style-checker config of their directory are not checked, see
+# path_filter.py.
+_FILE_EXTENSION_MAP = path_filter.SuffixMap(_FILE_EXTENSIONS)
 
 
 def filterFileExtension(path):
-    for ext in _FILE_EXTENSIONS:
-        if path.endswith(ext):
-            return True
-    return False
+    return _FILE_EXTENSION_MAP.match(path)
 
 
 def filterSuffix(path):
-    for suffix in _FORBIDDEN_SUFFIXES:
-        if path.endswith(suffix):
-            return False
-    return True
+    return not path_filter.for_path(path).ignore_suffixes.match(path)
 
 
 def filterPathPrefix(path):
-    for dir in _FORBIDDEN_DIRS:
-        if re.match(dir, path):
-            return False
-    return True
+    return not path_filter.for_path(path).ignore_dirs.match(path)
 
 
 def getEndWithNewlineCommand(path):
@@ -92,8 +76,57 @@ def getFormatCommand(path):
     return ["clang-format", "-i", path] + [";"] + getEndWithNewlineCommand(path)
 
 
+def getFormatTool(path):
+    for ext, tool in _FORMAT_TOOLS.items():
+        if path.endswith(ext):
+            return tool
+    # defaults to clang-format
+    return "clang-format"
+
+
+def getFormatToolCommand(tool):
+    """Returns the command of |tool|, which formats the files appended to it."""
+    if tool == "prettier":
+        install = "--no-install" if Config.get("npx-no-install") else "--yes"
+        return ["npx", "--quiet", install, "prettier@2.2.1", "-w"]
+    if tool == "gn":
+        return [gn_path, "format"]
+    return ["clang-format", "-i"]
+
+
+def _utf16Offset(content, line):
+    """Returns the offset of |line|, counted from 1, in |content|.
+
+    The offset is counted in UTF-16 code units, like JavaScript and thus
+    prettier count string lengths, so characters outside the BMP, e.g.
+    emoji, count twice.
+    """
+    end = 0
+    for _ in range(line - 1):
+        end = content.find(b"\n", end) + 1
+        if end == 0:
+            end = len(content)
+            break
+    return len(content[:end].decode("utf-8", "replace").encode("utf-16-le")) // 2
+
+
+def getRangeArguments(tool, ranges, content):
+    """Returns the arguments that limit |tool| to the line |ranges| of |content|.
+
+    Returns None if the tool can only format whole files. prettier supports a
+    single range, so it formats from the first to the last changed line.
+    """
+    if tool == "clang-format":
+        return ["--lines=%d:%d" % r for r in ranges]
+    if tool == "prettier":
+        start = _utf16Offset(content, ranges[0][0])
+        end = _utf16Offset(content, ranges[-1][1] + 1)
+        return ["--range-start=%d" % start, "--range-end=%d" % end]
+    return None
+
+
 def shouldFormatFile(path):
-    return filterFileExtension(path) and filterSuffix(path) and filterPathPrefix(path)
+    return path_filter.should_check("coding-style", path)
 
 
 if __name__ == "__main__":
@@ -146,9 +146,16 @@ def JavaLint(files):
 class CpplintChecker(Checker):
     name = "java-lint"
     help = "Run java lint"
+    extensions = (".java", ".kt")
 
     def run(self, options, mr, changed_files):
-        returncode = JavaLint(changed_files)
+        returncode = JavaLint(
+            [
+                self.content_store.path(f)
+                for f in changed_files
+                if f.endswith(self.extensions)
+            ]
+        )
         if returncode == 1:
             return CheckResult.FAILED
         else:
@@ -0,0 +1,308 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Decides which files a checker looks at, from the rules in `.tools_shared`.
+
+The rules of each checker are compiled once per config: directory prefixes
+go into a trie walked one path component at a time, suffixes into a map keyed
+by the file extension, and patterns into one combined regex where that does
+not change their meaning. Asking about a path is then a single call, no
+matter how many rules are configured.
+"""
+
+import os
+import re
+
+from checkers.checker_manifest import CODING_STYLE_EXTENSIONS
+from config import Config
+
+# Characters that make an `ignore-dirs` entry a regex rather than a plain
+# directory prefix.
+_REGEX_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+
+class PatternSet:
+    """Matches a path against any of a list of regexes.
+
+    Patterns without groups are combined into one regex. Patterns with
+    groups, whose backreferences would be renumbered, and all of them if
+    the combined regex does not compile, e.g. because of an inline flag
+    like "(?i)", are tried one by one as before.
+    """
+
+    def __init__(self, patterns):
+        compiled = [re.compile(p) for p in patterns]
+        plain = [p for p, regex in zip(patterns, compiled) if not regex.groups]
+        self._regexes = [regex for regex in compiled if regex.groups]
+        if len(plain) > 1:
+            try:
+                self._regexes.insert(
+                    0, re.compile("|".join("(?:%s)" % p for p in plain))
+                )
+            except re.error:
+                self._regexes = compiled
+        elif plain:
+            self._regexes.insert(0, re.compile(plain[0]))
+
+    def match(self, path):
+        return any(regex.match(path) for regex in self._regexes)
+
+    def search(self, path):
+        return any(regex.search(path) for regex in self._regexes)
+
+
+def compile_patterns(patterns):
+    """Returns a PatternSet of |patterns|, None if there are none."""
+    if not patterns:
+        return None
+    return PatternSet(patterns)
+
+
+class PrefixTrie:
+    """Matches paths against directory prefixes, as `re.match` would.
+
+    A prefix matches the path components before its last one exactly, and
+    its last component as a prefix, so "out" matches "out/a.cc" and
+    "output/a.cc", while "out/" only matches the former.
+    """
+
+    def __init__(self, prefixes=()):
+        # component => child node
+        self._children = {}
+        # Last components of the prefixes that end at this node.
+        self._tails = ()
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add(self, prefix):
+        node = self
+        *dirs, tail = prefix.split("/")
+        for name in dirs:
+            node = node._children.setdefault(name, PrefixTrie())
+        node._tails += (tail,)
+
+    def match(self, path):
+        node = self
+        for name in path.split("/"):
+            if node._tails and name.startswith(node._tails):
+                return True
+            node = node._children.get(name)
+            if node is None:
+                return False
+        return False
+
+
+class SuffixMap:
+    """Matches paths against file name suffixes, as `str.endswith` would."""
+
+    def __init__(self, suffixes=()):
+        # extension => suffixes ending with it
+        self._by_extension = {}
+        # Suffixes without a ".".
+        self._other = ()
+        for suffix in suffixes:
+            dot = suffix.rfind(".")
+            if dot == -1:
+                self._other += (suffix,)
+            else:
+                extension = suffix[dot:]
+                self._by_extension[extension] = self._by_extension.get(
+                    extension, ()
+                ) + (suffix,)
+
+    def match(self, path):
+        dot = path.rfind(".")
+        if dot != -1:
+            suffixes = self._by_extension.get(path[dot:])
+            if suffixes and path.endswith(suffixes):
+                return True
+        return bool(self._other) and path.endswith(self._other)
+
+
+class DirMatcher:
+    """Plain prefixes go into a trie, regexes into a PatternSet."""
+
+    def __init__(self, dirs):
+        self._trie = PrefixTrie(d for d in dirs if not _REGEX_CHARS.intersection(d))
+        self._regex = compile_patterns(
+            [d for d in dirs if _REGEX_CHARS.intersection(d)]
+        )
+
+    def match(self, path):
+        return self._trie.match(path) or bool(self._regex and self._regex.match(path))
+
+
+class PathRule:
+    """The files one checker looks at.
+
+    |extensions| lists the suffixes a file must have, |dirs| the directory
+    prefixes it must be in, None for any. A file is left out if it ends
+    with one of |exclude_suffixes|, starts with one of |exclude_dirs|,
+    contains one of |exclude_substrings| or matches one of
+    |exclude_patterns| anywhere. Entries of |dirs| and |exclude_dirs| are
+    regexes matched at the start of the path, like `ignore-dirs` always was.
+    """
+
+    def __init__(
+        self,
+        extensions=None,
+        dirs=None,
+        exclude_suffixes=(),
+        exclude_dirs=(),
+        exclude_substrings=(),
+        exclude_patterns=(),
+    ):
+        self._extensions = None if extensions is None else SuffixMap(extensions)
+        self._dirs = None if dirs is None else DirMatcher(dirs)
+        self._exclude_suffixes = SuffixMap(exclude_suffixes or ())
+        self._exclude_dirs = DirMatcher(exclude_dirs or ())
+        self._exclude = compile_patterns(
+            [re.escape(s) for s in exclude_substrings or ()]
+            + list(exclude_patterns or ())
+        )
+
+    def matches(self, path):
+        if self._extensions is not None and not self._extensions.match(path):
+            return False
+        if self._dirs is not None and not self._dirs.match(path):
+            return False
+        if self._exclude_suffixes.match(path) or self._exclude_dirs.match(path):
+            return False
+        return self._exclude is None or not self._exclude.search(path)
+
+
+class PathFilter:
+    """The rules of every checker for the files of one directory."""
+
+    def __init__(
+        self,
+        rules,
+        disabled_checkers=(),
+        ignore_suffixes=(),
+        ignore_dirs=(),
+        ignored_by_all=(),
+    ):
+        self._rules = rules
+        self._disabled_checkers = frozenset(disabled_checkers)
+        self._ignored_by_all = DirMatcher(ignored_by_all)
+        # The files coding-style ignores, whatever their type.
+        self.ignore_suffixes = SuffixMap(ignore_suffixes)
+        self.ignore_dirs = DirMatcher(ignore_dirs)
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds the filter of |config|, a merged "checker-config"."""
+
+        def value(checker, key):
+            return (config.get(checker) or {}).get(key) or ()
+
+        ignore_suffixes = value("coding-style-checker", "ignore-suffixes")
+        ignore_dirs = value("coding-style-checker", "ignore-dirs")
+        format_rule = PathRule(
+            extensions=CODING_STYLE_EXTENSIONS,
+            exclude_suffixes=ignore_suffixes,
+            exclude_dirs=ignore_dirs,
+        )
+        return cls(
+            {
+                "coding-style": format_rule,
+                "cpplint": format_rule,
+                "file-type": PathRule(
+                    exclude_patterns=value(
+                        "file-type-checker", "binary-files-allow-list"
+                    )
+                ),
+                # See shouldProcessIncludeHeader.
+                "header-path": PathRule(
+                    extensions=(".h", ".hpp", ".c", ".cc", ".cpp", ".m", ".mm"),
+                    dirs=[
+                        d + "/"
+                        for d in value("header-path-checker", "processed-file-dirs")
+                    ],
+                    exclude_substrings=value(
+                        "header-path-checker", "exclude-processed-file-dirs"
+                    ),
+                ),
+            },
+            disabled_checkers=config.get("disabled-checkers") or (),
+            ignore_suffixes=ignore_suffixes,
+            ignore_dirs=ignore_dirs,
+            ignored_by_all=config.get("ignore-dirs") or (),
+        )
+
+    def should_check(self, checker, path):
+        """Returns whether |checker| looks at |path|.
+
+        Checkers without rules look at every file they are not disabled for.
+        """
+        if checker in self._disabled_checkers or self._ignored_by_all.match(path):
+            return False
+        rule = self._rules.get(checker)
+        return rule is None or rule.matches(path)
+
+
+# id(checker-config) => (checker-config, PathFilter), one per directory with
+# a .tools_shared.
+_path_filters = {}
+
+
+def for_path(path):
+    """Returns the filter of |path|, relative to the root.
+
+    Filters are built once per config, so directories that share their
+    config share their filter.
+    """
+    config = Config.for_path(path)
+    entry = _path_filters.get(id(config))
+    if entry is None or entry[0] is not config:
+        entry = (config, PathFilter.from_config(config))
+        _path_filters[id(config)] = entry
+    return entry[1]
+
+
+def should_check(checker, path):
+    return for_path(path).should_check(checker, path)
+
+
+# Checkers that skip the ignore-dirs and ignore-suffixes of
+# coding-style-checker.
+_CODING_STYLE_CHECKERS = frozenset(["coding-style", "cpplint"])
+
+
+def _glob_escape(text):
+    return re.sub(r"([*?[\\])", r"\\\1", text)
+
+
+def git_excludes(checkers):
+    """Returns `:(exclude)` pathspecs of files none of |checkers| look at.
+
+    They let git leave out e.g. vendored trees while listing files, instead
+    of listing them for every checker to drop. Only rules git can express
+    exactly are turned into pathspecs: plain ignore-dirs entries and
+    ignore-suffixes without "/". The checkers still apply all rules.
+    """
+    with_coding_style = bool(checkers) and set(checkers) <= _CODING_STYLE_CHECKERS
+    dirs = set()
+    pathspecs = []
+    for directory, config in sorted(Config.directories.items()):
+        dirs.update(config.get("ignore-dirs") or ())
+        if not with_coding_style:
+            continue
+        section = config.get("coding-style-checker") or {}
+        dirs.update(section.get("ignore-dirs") or ())
+        parent_suffixes = ()
+        if directory:
+            parent = Config.for_directory(os.path.dirname(directory))
+            parent_suffixes = parent["coding-style-checker"]["ignore-suffixes"]
+        prefix = _glob_escape(directory + "/") if directory else ""
+        for suffix in section.get("ignore-suffixes") or ():
+            if suffix and "/" not in suffix and suffix not in parent_suffixes:
+                pathspecs.append(
+                    ":(top,exclude,glob)" + prefix + "**/*" + _glob_escape(suffix)
+                )
+    for d in sorted(dirs):
+        if d and not _REGEX_CHARS.intersection(d):
+            # A pathspec matches the directory and its files, a subset of
+            # what re.match() matches.
+            pathspecs.append(":(top,exclude,literal)" + d)
+    return pathspecs
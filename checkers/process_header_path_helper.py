@@ -26,6 +26,7 @@ import os
 import sys
 import re
 import argparse
+from checkers import path_filter
 from config import Config
 
 # Set the directory where the header path needs to be processed.
@@ -145,16 +146,11 @@ def processIncludeHeader(
 def shouldProcessIncludeHeader(file_name, header_dirs):
     # print("checking {} include header path.".format(file_name))
 
-    if not isInSpecifiedDir(file_name, DEFAULT_NEED_PROCESSED_FILE_DIRS):
-        return False
-
-    if hasSubstring(file_name, DEFAULT_EXCLUDE_PROCESSED_FILES):
+    # The processed dirs, excluded dirs and suffixes, in one step.
+    if not path_filter.should_check("header-path", file_name):
         return False
 
     file = os.path.join(ROOT_DIR, file_name)
-    file_suffix = os.path.splitext(file)[-1]
-    if file_suffix not in DEFAULT_FILE_SUFFIX_MATCH:
-        return False
 
     should_process = False
     with open(file, "r") as context:
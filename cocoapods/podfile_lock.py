@@ -6,10 +6,9 @@
 import os.path
 import re
 
-import yaml
-
 from cocoapods.pod import Pod, SubSpec
 from cocoapods.sources import ExternalSource, GitSource
+from utils import yaml_loader
 
 NAME_VERSION_PATTERN = r"(\S+) \((.*)\)"
 
@@ -35,9 +34,8 @@ class PodfileLock:
         self.spec_names = []
         self.cache_dir = cache_dir
 
-        with open(file_path, "r") as f:
-            content = yaml.load(f, Loader=yaml.FullLoader)
-            self.contents = content
+        content = yaml_loader.load_file(file_path)
+        self.contents = content
 
         for item in content.get("PODS", []):
             name, version = re.match(
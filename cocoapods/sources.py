@@ -15,8 +15,7 @@ import string
 from abc import ABC
 import requests
 
-import yaml
-
+from utils import yaml_loader
 
 COCOAPODS_VERSION_FILE_PATH = "CocoaPods-version.yml"
 COCOAPODS_GIT_SOURCE_DEFAULT_BRANCH = "master"
@@ -101,7 +100,7 @@ class GitSource(Source):
 
         try:
             output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
-            return yaml.load(output, Loader=yaml.FullLoader)
+            return yaml_loader.load(output)
         except subprocess.CalledProcessError:
             return {}
 
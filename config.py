@@ -2,49 +2,261 @@
 # Licensed under the Apache License Version 2.0 that can be found in the
 # LICENSE file in the root directory of this source tree.
 
+import copy
+import hashlib
+import json
 import os
+import re
+import tempfile
+from utils.git_backend import get_backend
 from utils.merge_request import MergeRequest
-import subprocess
-import sys
+from utils.result_cache import default_cache_dir
+from utils import yaml_loader
 from checkers.default_config import checker_default_config
 
+CONFIG_FILE_NAME = ".tools_shared"
+# Sections of "checker-config" that a .tools_shared in a subdirectory may
+# set for the files below it. Lists add to the ones of the parent directory,
+# other values replace them.
+DIRECTORY_SECTIONS = (
+    "coding-style-checker",
+    "file-type-checker",
+    "cpplint-checker",
+    "disabled-checkers",
+    "ignore-dirs",
+)
+# Bump when the merged config changes shape, to drop cached configs.
+CONFIG_CACHE_VERSION = 1
+
 
 class Config:
     data = {}
+    path = None
+    root_dir = None
+    # Directory relative to the root => "checker-config" merged for the files
+    # below it, for the root ("") and every directory with a .tools_shared.
+    directories = {}
+    # [(config file relative to the root, mtime, size)] of the loaded files.
+    files = []
+    # Directory => "checker-config", memoized by for_directory().
+    _lookups = {}
 
     @staticmethod
     def init():
         # merge checker default config
-        Config.data["checker-config"] = checker_default_config
+        Config.data["checker-config"] = copy.deepcopy(checker_default_config)
         Config.data["external_checker_path"] = None
+        # Run prettier with `npx --no-install`, e.g. on CI without network.
+        Config.data["npx-no-install"] = False
+        Config.directories = {"": Config.data["checker-config"]}
+        Config._lookups = {}
         # merge custom config
         mr = MergeRequest()
-        root_dir = mr.GetRootDirectory()
-        config_path = os.path.join(root_dir, ".tools_shared")
-        if os.path.exists(config_path):
+        root_dir = mr.GetRootDirectory(quiet=True)
+        if root_dir is None:
+            # Not in a git repo, e.g. `git lynx bench`, use the defaults.
+            return
+        Config.root_dir = root_dir
+        config_path = os.path.join(root_dir, CONFIG_FILE_NAME)
+        Config.path = config_path
+        Config.files = Config.find_files(root_dir)
+        if not Config.files:
+            return
+        cache_path = Config.cache_path(root_dir)
+        cached = Config.read_cache(cache_path)
+        if cached is not None:
+            Config.data = cached["data"]
+            Config.directories = cached["directories"]
+            Config.directories[""] = Config.data["checker-config"]
+            return
+        for path, _, _ in Config.files:
+            # The merged config is cached instead, see write_cache().
+            source = (
+                yaml_loader.load_file(os.path.join(root_dir, path), cache=False) or {}
+            )
+            directory = os.path.dirname(path)
+            if not directory:
+                Config.data = Config.merge(Config.data, source)
+                Config.directories[""] = Config.data["checker-config"]
+                continue
+            parent = Config.for_directory(os.path.dirname(directory))
+            Config.directories[directory] = Config.merge_directory(
+                copy.deepcopy(parent), source, directory, path
+            )
+            Config._lookups = {}
+        Config.write_cache(cache_path)
+
+    @staticmethod
+    def find_files(root_dir, cached=True):
+        """Returns [(path, mtime, size)] of the config files, parents first.
+
+        Only the tracked config files of subdirectories count, which git
+        lists from the index without walking the untracked files of the
+        work tree.
+        """
+        returncode, paths, _ = get_backend(root_dir).run_z(
+            ["ls-files", "--cached", "--", ":(glob)**/" + CONFIG_FILE_NAME],
+            cached,
+        )
+        paths = set(paths if returncode == 0 else [])
+        # The root config counts even when it is ignored.
+        paths.add(CONFIG_FILE_NAME)
+        files = []
+        for path in sorted(paths, key=lambda p: (p.count("/"), p)):
             try:
-                import yaml
-            except ImportError:
-                subprocess.check_call(
-                    [sys.executable, "-m", "pip", "install", "PyYAML~=6.0"]
-                )
-                import yaml
-            with open(config_path, encoding="utf-8") as config_f:
-                Config.data = Config.merge(
-                    Config.data, yaml.load(config_f, Loader=yaml.FullLoader)
-                )
+                st = os.stat(os.path.join(root_dir, path))
+            except OSError:
+                # Deleted from the work tree but still in the index.
+                continue
+            files.append((path, st.st_mtime_ns, st.st_size))
+        return files
+
+    @staticmethod
+    def cache_path(root_dir):
+        name = hashlib.sha1(root_dir.encode()).hexdigest()[:16]
+        return os.path.join(default_cache_dir(), "config", name + ".json")
+
+    @staticmethod
+    def read_cache(cache_path):
+        """Returns the cached config if it was merged from the same files."""
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (
+            cached.get("version") != CONFIG_CACHE_VERSION
+            or cached.get("files") != [list(f) for f in Config.files]
+            or cached.get("defaults") != checker_default_config
+        ):
+            return None
+        return cached
+
+    @staticmethod
+    def write_cache(cache_path):
+        directories = {d: c for d, c in Config.directories.items() if d}
+        try:
+            content = json.dumps(
+                {
+                    "version": CONFIG_CACHE_VERSION,
+                    "files": Config.files,
+                    # New defaults are merged into the config as well.
+                    "defaults": checker_default_config,
+                    "data": Config.data,
+                    "directories": directories,
+                }
+            )
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            # Replace the file at once, so that concurrent runs do not read
+            # a partial file.
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+            with os.fdopen(fd, "w") as f:
+                f.write(content)
+            os.replace(temp_path, cache_path)
+        except (OSError, TypeError, ValueError):
+            # The config is merged again next time.
+            pass
+
+    @staticmethod
+    def stamp():
+        """Returns the config files and their modification times."""
+        if Config.root_dir is None:
+            return None
+        return Config.find_files(Config.root_dir, cached=False)
 
     @staticmethod
     def merge(target, source):
         for key, value in source.items():
             if key not in target:
                 raise KeyError(f"Key not found: {key}")
-            if isinstance(value, dict) and isinstance(target[key], dict):
+            # An empty dict in the defaults accepts any keys.
+            if (
+                isinstance(value, dict)
+                and isinstance(target[key], dict)
+                and target[key]
+            ):
                 target[key] = Config.merge(target[key], value)
             else:
                 target[key] = value
         return target
 
+    @staticmethod
+    def merge_directory(target, source, directory, path):
+        """Merges the .tools_shared |source| of |directory| into |target|.
+
+        |target| is the "checker-config" of the parent directory. Entries of
+        ignore-dirs are relative to |directory|.
+        """
+        if set(source) - {"checker-config"}:
+            raise KeyError(f"{path} can only set checker-config")
+        sections = source.get("checker-config") or {}
+        if not isinstance(sections, dict):
+            raise ValueError(f"{path}: checker-config must be a mapping")
+        for section, value in sections.items():
+            if section not in DIRECTORY_SECTIONS:
+                raise KeyError(f"{path} cannot set checker-config.{section}")
+            try:
+                Config.check_type(target[section], value, section)
+            except ValueError as e:
+                raise ValueError(f"{path}: {e}") from None
+            if section == "ignore-dirs":
+                value = [re.escape(directory) + "/" + d for d in value]
+            if section == "coding-style-checker" and value.get("ignore-dirs"):
+                value = dict(value)
+                value["ignore-dirs"] = [
+                    re.escape(directory) + "/" + d for d in value["ignore-dirs"]
+                ]
+            target[section] = Config.extend(target[section], value, section)
+        return target
+
+    @staticmethod
+    def check_type(target, value, key):
+        """Raises ValueError unless |value| may replace or extend |target|,
+        e.g. a section left empty in YAML is None instead of a mapping."""
+        if isinstance(target, dict) and not isinstance(value, dict):
+            raise ValueError(f"checker-config.{key} must be a mapping")
+        if isinstance(target, list) and not isinstance(value, list):
+            raise ValueError(f"checker-config.{key} must be a list")
+        if isinstance(target, dict):
+            for k, v in value.items():
+                if k in target:
+                    Config.check_type(target[k], v, f"{key}.{k}")
+
+    @staticmethod
+    def extend(target, value, key):
+        if isinstance(target, dict) and isinstance(value, dict):
+            for k, v in value.items():
+                if k not in target:
+                    raise KeyError(f"Key not found: {key}.{k}")
+                target[k] = Config.extend(target[k], v, k)
+            return target
+        if isinstance(target, list) and isinstance(value, list):
+            return target + [v for v in value if v not in target]
+        return value
+
+    @staticmethod
+    def for_directory(directory):
+        """Returns the "checker-config" of the files in |directory|.
+
+        |directory| is relative to the root. The nearest directory with a
+        .tools_shared is looked up once per directory.
+        """
+        config = Config._lookups.get(directory)
+        if config is None:
+            config = Config.directories.get(directory)
+            if config is None:
+                if directory:
+                    config = Config.for_directory(os.path.dirname(directory))
+                else:
+                    config = Config.data.get("checker-config", checker_default_config)
+            Config._lookups[directory] = config
+        return config
+
+    @staticmethod
+    def for_path(path):
+        """Returns the "checker-config" of |path|, relative to the root."""
+        return Config.for_directory(os.path.dirname(path))
+
     @staticmethod
     def get(key):
         return Config.data.get(key)
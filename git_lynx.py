@@ -2,19 +2,37 @@
 # Copyright 2024 The Lynx Authors. All rights reserved.
 # Licensed under the Apache License Version 2.0 that can be found in the
 # LICENSE file in the root directory of this source tree.
-import inspect
-import optparse
 import os
-import pkgutil
+import sys
+
+from utils import lynx_daemon
+
+if __name__ == "__main__":
+    # Hand the command over to a running server before the imports below,
+    # which take most of the startup time of a check.
+    _exit_code = lynx_daemon.forward(sys.argv[1:])
+    if _exit_code is not None:
+        sys.exit(_exit_code)
+
+import optparse
 
-import checkers
 import subcommand
-import sys
 import subprocess
+import time
+import traceback
 
+from checkers import path_filter
 from checkers.checker import Checker, CheckResult
 from checkers.checker_manager import CheckerManager
+from checkers.checker_scheduler import CheckerScheduler
 from utils.merge_request import MergeRequest
+from utils.result_cache import ResultCache
+from utils.content_store import StagedStore, WorkingTreeStore
+from utils.checker_stats import CheckerStats
+from utils.diff_parser import parse_changed_ranges
+from utils.metrics import RunMetrics
+from utils.pipeline import Counted
+from utils import git_backend, profiler, sharding, watchdog
 from config import Config
 
 
@@ -64,14 +82,126 @@ def CMDbuild(parser, args):
         os.chdir(old_cwd)
 
 
+def parse_shard_option(parser, options):
+    try:
+        return sharding.parse_shard(options.shard)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def select_shard(mr, options, shard, files):
+    costs = None
+    if options.shard_costs:
+        costs = sharding.load_costs(options.shard_costs)
+    return sharding.select_shard(files, shard, costs, mr.GetRootDirectory())
+
+
+def stream_checker_files(mr, spec, excludes, working_tree):
+    """Yields the files of the repository that |spec| checks, while git
+    lists them."""
+    for path in mr.IterAllFiles(excludes, working_tree):
+        if spec.handles(path) and path_filter.should_check(spec.name, path):
+            yield path
+
+
+def find_idle_checkers(mr, specs, excludes, working_tree):
+    """Returns the names of |specs| that have no files to check in the
+    repository. The listing is stopped once every checker found a file."""
+    waiting = [spec for spec in specs if spec.checks_files]
+    if waiting:
+        files = mr.IterAllFiles(excludes, working_tree)
+        try:
+            for path in files:
+                waiting = [
+                    spec
+                    for spec in waiting
+                    if not (
+                        spec.handles(path) and path_filter.should_check(spec.name, path)
+                    )
+                ]
+                if not waiting:
+                    break
+        finally:
+            files.close()
+    return [spec.name for spec in waiting]
+
+
 def CMDcheck(parser, args):
     parser.add_option("--checkers", help="Checkers to run, default all", default="all")
     parser.add_option("--list", action="store_true", help="List available checkers")
     parser.add_option(
         "--all", action="store_true", help="Check all source files in the project."
     )
+    parser.add_option(
+        "--working-tree",
+        action="store_true",
+        help="With --all, check the files of the working tree, including "
+        "untracked ones, instead of HEAD",
+    )
     parser.add_option("--changed", action="store_true", help="Check all changed files")
+    parser.add_option(
+        "--staged",
+        action="store_true",
+        help="Check the staged content of staged files, e.g. in a pre-commit hook",
+    )
+    parser.add_option(
+        "--base",
+        metavar="REF",
+        help="Check the changes of all commits since the merge base with REF, "
+        "e.g. origin/main",
+    )
     parser.add_option("--verbose", action="store_true", help="Print details")
+    parser.add_option(
+        "--no-cache",
+        action="store_true",
+        help="Do not reuse or store per-file results of unchanged files",
+    )
+    parser.add_option(
+        "--shard",
+        metavar="INDEX/COUNT",
+        help="Only check the INDEX-th of COUNT balanced parts of the files, "
+        "INDEX counts from 1",
+    )
+    parser.add_option(
+        "--shard-costs",
+        metavar="FILE",
+        help="Balance shards with the file costs recorded in this result file",
+    )
+    parser.add_option(
+        "--results-file",
+        metavar="FILE",
+        help="Write the results to FILE, see `git lynx merge-results`",
+    )
+    parser.add_option(
+        "--profile",
+        metavar="FILE",
+        help="Write a Chrome trace of the run to FILE and print the slowest "
+        "files and subprocesses",
+    )
+    parser.add_option(
+        "--jobs",
+        "-j",
+        type="int",
+        default=1,
+        help="Number of checkers to run at the same time, default 1",
+    )
+    parser.add_option(
+        "--fail-fast",
+        action="store_true",
+        help="Cancel the other checkers as soon as one fails",
+    )
+    parser.add_option(
+        "--diff-ranges",
+        action="store_true",
+        help="Only check the format of the changed lines, not of whole files",
+    )
+    parser.add_option(
+        "--metrics-file",
+        metavar="FILE",
+        action="append",
+        help="Write metrics of the run to FILE in OpenMetrics text format, or "
+        "as JSON if FILE ends with .json; may be given more than once",
+    )
 
     parser.add_option(
         "--ignore", help="Ignore checkers, separated with commas", default="none"
@@ -85,23 +215,17 @@ def CMDcheck(parser, args):
         print("Available checkers:")
         print(
             "\n\n".join(
-                "  " + name + ": " + cls.help
-                for name, cls in checker_manager.checker_classes.items()
+                "  " + name + ": " + spec.help
+                for name, spec in checker_manager.checker_specs.items()
             )
         )
         return
 
-    mr = MergeRequest()
-    if options.all:
-        changed_files = mr.GetAllFiles()
-    elif options.changed:
-        changed_files = mr.GetChangedFiles()
-    else:
-        changed_files = mr.GetLastCommitFiles()
-
-    if options.verbose:
-        print("Changed files:\n  " + "\n  ".join(changed_files) + "\n")
+    if options.profile:
+        profiler.start()
 
+    metrics = RunMetrics()
+    mr = MergeRequest()
     # If a user specifies to skip certain check(s) in the commit message, skip local check(s)
     # as well.
     #
@@ -119,34 +243,235 @@ def CMDcheck(parser, args):
         print(f"{skipped_checks} has been skipped due to commit message.")
 
     # filter checkers
-    target_checkers = []
+    target_specs = []
     if options.checkers == "all":
-        target_checkers = [
-            c()
-            for c in checker_manager.checker_classes.values()
-            if c.name not in skipped_checks
+        target_specs = [
+            spec
+            for spec in checker_manager.checker_specs.values()
+            if spec.name not in skipped_checks
         ]
     else:
         checker_names = options.checkers.split(",")
         for name in checker_names:
-            if name not in checker_manager.checker_classes:
+            if name not in checker_manager.checker_specs:
                 raise Exception("Checker " + name + " not found")
-            target_checkers.append(checker_manager.checker_classes.get(name)())
+            target_specs.append(checker_manager.checker_specs[name])
+
+    # With --all, the files stream from git through the checkers instead of
+    # being listed first, so that the memory does not grow with the size of
+    # the repository. Shards and results files need the whole list, and
+    # staged content is read for a list of files.
+    streaming = (
+        options.all
+        and not options.shard
+        and not options.results_file
+        and not options.staged
+    )
+    with profiler.span("collect files", "phase"), metrics.phase("collect files"):
+        if streaming:
+            # Listed by every checker when it runs.
+            changed_files = []
+        elif options.all:
+            # Let git leave out the files none of the checkers look at.
+            excludes = path_filter.git_excludes([spec.name for spec in target_specs])
+            if options.working_tree:
+                changed_files = mr.GetWorkingTreeFiles(excludes)
+            else:
+                changed_files = mr.GetAllFiles(excludes)
+        elif options.staged:
+            changed_files = mr.GetStagedFiles()
+        elif options.base:
+            changed_files = mr.GetBranchFiles(options.base)
+            if changed_files is None:
+                sys.exit(1)
+        elif options.changed:
+            changed_files = mr.GetChangedFiles()
+        else:
+            changed_files = mr.GetLastCommitFiles()
+
+    shard = None
+    if options.shard:
+        shard = parse_shard_option(parser, options)
+        changed_files = select_shard(mr, options, shard, changed_files)
+
+    if options.verbose and not streaming:
+        print("Changed files:\n  " + "\n  ".join(changed_files) + "\n")
+
+    # Only give checkers the files they look at, and do not even load the
+    # checkers that have nothing to check.
+    # A .tools_shared may disable checkers or ignore files below its directory.
+    if streaming:
+        # Each checker lists the files again rather than sharing one listing,
+        # checkers that run one after the other cannot share a bounded one.
+        excludes = path_filter.git_excludes([spec.name for spec in target_specs])
+        checker_files = {
+            spec.name: Counted(
+                stream_checker_files(mr, spec, excludes, options.working_tree)
+            )
+            for spec in target_specs
+        }
+        idle_checkers = find_idle_checkers(
+            mr, target_specs, excludes, options.working_tree
+        )
+    else:
+        checker_files = {
+            spec.name: [
+                path
+                for path in spec.select(changed_files)
+                if path_filter.should_check(spec.name, path)
+            ]
+            for spec in target_specs
+        }
+        idle_checkers = [
+            spec.name
+            for spec in target_specs
+            if spec.checks_files and not checker_files[spec.name]
+        ]
+    if idle_checkers:
+        print("No files to check for: " + ", ".join(idle_checkers))
+        target_specs = [spec for spec in target_specs if spec.name not in idle_checkers]
+
+    metrics.files = len(changed_files)
+    metrics.checker_counts = {
+        "available": len(checker_manager.checker_specs),
+        "selected": len(target_specs),
+        "skipped": len(skipped_checks) + len(idle_checkers),
+    }
+
+    # Run the cheapest checkers first, so that failures show up early.
+    stats = CheckerStats(mr.GetRootDirectory())
+    target_specs = stats.order(target_specs, None if streaming else changed_files)
+    with metrics.phase("load checkers"):
+        target_checkers = [spec.create() for spec in target_specs]
+    if streaming:
+        for c in target_checkers:
+            # Only the totals per file type, for the stats.
+            c.type_times = {}
+
+    # Shared by all checkers, so that every file is read once.
+    content_store = WorkingTreeStore()
+    if options.staged:
+        with profiler.span("read staged files", "phase"), metrics.phase(
+            "read staged files"
+        ):
+            content_store = StagedStore(changed_files, cwd=mr.GetRootDirectory())
+
+    result_cache = None
+    if not options.no_cache:
+        result_cache = ResultCache(mr=mr)
+
+    wall_times = {}
+    cpu_times = {}
+
+    def run_checker(c):
+        print_cutting_line(c.name)
+        c.result_cache = result_cache
+        c.content_store = content_store
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        files = checker_files[c.name]
+        if streaming and not c.streams_files:
+            # E.g. external checkers, which may take len() of the files.
+            files = list(files)
+        with profiler.span(c.name, "checker") as span_args:
+            res = c.run(options, mr, files)
+            span_args["passed"] = res == CheckResult.PASSED
+        wall_times[c.name] = time.perf_counter() - start
+        cpu_times[c.name] = time.thread_time() - cpu_start
+        if c.cache_hits or c.cache_misses:
+            print(
+                "\n[%s] result cache: %d hits, %d misses"
+                % (c.name, c.cache_hits, c.cache_misses)
+            )
+        print("\n[%s] %s" % (c.name, res))
+        print_cutting_line()
+        print("")
+        return res
+
+    timeouts = Config.value("checker-config", "timeouts")
+    scheduler = CheckerScheduler(options.jobs, fail_fast=options.fail_fast)
+    for c in target_checkers:
+        scheduler.add(
+            c.name,
+            lambda c=c: run_checker(c),
+            timeout=timeouts["checkers"].get(c.name, timeouts["checker"]),
+            subprocess_timeout=timeouts["subprocess"],
+        )
+
     old_cwd = os.getcwd()
     os.chdir(mr.GetRootDirectory())
+    watchdog.install(timeouts["subprocess"])
     try:
-        for c in target_checkers:
-            if options.checkers != "all" and c.name not in options.checkers.split(","):
-                continue
-            print_cutting_line(c.name)
-            res = c.run(options, mr, changed_files)
-            print("\n[%s] %s" % (c.name, res))
-            print_cutting_line()
-            print("")
-            if res != CheckResult.PASSED:
-                sys.exit(1)
+        with metrics.phase("run checkers"):
+            scheduler.run()
     finally:
+        # Do not leave subprocesses of timed out or cancelled checkers behind.
+        watchdog.uninstall()
         os.chdir(old_cwd)
+        if result_cache:
+            result_cache.close()
+        content_store.close()
+        if options.profile:
+            trace = profiler.stop()
+            trace.write(options.profile)
+            trace.print_summary()
+            print("Trace written to %s" % options.profile)
+
+    for spec, c in zip(target_specs, target_checkers):
+        # Checkers that timed out or were cancelled have no wall time.
+        if streaming and not c.type_times:
+            # The files are unknown, the time would count as startup.
+            continue
+        if c.cache_hits and not (c.file_times or c.type_times):
+            # Every file was cached, which says nothing about their cost.
+            continue
+        if c.name in wall_times:
+            stats.record(
+                spec, wall_times[c.name], changed_files, c.file_times, c.type_times
+            )
+    stats.save()
+
+    if options.metrics_file:
+        if streaming:
+            # The files of the checker that looked at the most of them.
+            metrics.files = max(
+                (files.count for files in checker_files.values()), default=0
+            )
+        for c, task in zip(target_checkers, scheduler.tasks):
+            files = checker_files[c.name]
+            metrics.record_checker(
+                c,
+                files.count if streaming else len(files),
+                task.result,
+                wall_times.get(c.name),
+                cpu_times.get(c.name),
+                task.watch.spawned,
+            )
+        metrics.passed = scheduler.passed()
+        for path in options.metrics_file:
+            metrics.write(path)
+
+    if options.results_file:
+        file_costs = {}
+        for c in target_checkers:
+            for filename, seconds in c.file_times.items():
+                file_costs[filename] = file_costs.get(filename, 0) + seconds
+        sharding.write_result_file(
+            options.results_file,
+            shard,
+            {name: res == CheckResult.PASSED for name, res in scheduler.results()},
+            len(changed_files),
+            file_costs,
+        )
+
+    if not scheduler.passed():
+        failed = [
+            name for name, res in scheduler.results() if res == CheckResult.FAILED
+        ]
+        print("Failed checkers: " + ", ".join(failed))
+        if scheduler.cancelled():
+            print("Cancelled checkers: " + ", ".join(scheduler.cancelled()))
+        sys.exit(1)
 
 
 # git lynx format: Run clang-format for lynx
@@ -154,13 +479,44 @@ def CMDformat(parser, args):
     parser.add_option(
         "--all", action="store_true", help="Format all source files in the project."
     )
+    parser.add_option(
+        "--working-tree",
+        action="store_true",
+        help="With --all, format the files of the working tree, including "
+        "untracked ones, instead of HEAD",
+    )
     parser.add_option("--changed", action="store_true", help="Format all changed files")
     parser.add_option(
         "--verbose", action="store_true", help="Verbose the process of clang-format."
     )
+    parser.add_option(
+        "--diff-ranges",
+        action="store_true",
+        help="Only format the changed lines, not whole files",
+    )
+    parser.add_option(
+        "--shard",
+        metavar="INDEX/COUNT",
+        help="Only format the INDEX-th of COUNT balanced parts of the files, "
+        "INDEX counts from 1",
+    )
+    parser.add_option(
+        "--shard-costs",
+        metavar="FILE",
+        help="Balance shards with the file costs recorded in this result file",
+    )
+    parser.add_option(
+        "--jobs",
+        "-j",
+        type="int",
+        default=os.cpu_count(),
+        help="Number of formatters to run at the same time, default one per CPU",
+    )
     options, args = parser.parse_args(args)
+    shard = parse_shard_option(parser, options) if options.shard else None
     try:
         import checkers.format_file_filter as format_file_filter
+        from checkers import format_engine
     except ImportError:
         print("Can not find format_file_filter in the project.")
         return 1
@@ -169,24 +525,262 @@ def CMDformat(parser, args):
     os.chdir(mr.GetRootDirectory())
     try:
         if options.all:
-            changed_files = mr.GetAllFiles()
+            excludes = path_filter.git_excludes(["coding-style"])
+            if options.working_tree:
+                changed_files = mr.GetWorkingTreeFiles(excludes)
+            else:
+                changed_files = mr.GetAllFiles(excludes)
         elif options.changed:
             changed_files = mr.GetChangedFiles()
         else:
             changed_files = mr.GetLastCommitFiles()
-        for filename in changed_files:
-            if format_file_filter.shouldFormatFile(filename):
-                command = format_file_filter.getFormatCommand(filename)
-                output, error = mr.RunCommand(command)
-                if error:
-                    print(("Error clang-format %s: %s" % (filename, error)))
+        if shard:
+            changed_files = select_shard(mr, options, shard, changed_files)
+        files = [f for f in changed_files if format_file_filter.shouldFormatFile(f)]
+        ranges = None
+        if options.diff_ranges and not options.all:
+            if options.changed:
+                diff = mr.GetChangedLines(stream=True)
+            else:
+                diff = mr.GetLastCommitLines(stream=True)
+            ranges = parse_changed_ranges(diff)
+        errors = format_engine.format_files(
+            files, jobs=max(1, options.jobs), verbose=options.verbose, ranges=ranges
+        )
+        for filename, error in sorted(errors.items()):
+            print(("Error formatting %s: %s" % (filename, error)))
+    finally:
+        os.chdir(old_cwd)
+
+
+# git lynx watch: Check files again whenever they are saved.
+def CMDwatch(parser, args):
+    parser.add_option("--checkers", help="Checkers to run, default all", default="all")
+    parser.add_option(
+        "--ignore", help="Ignore checkers, separated with commas", default="none"
+    )
+    parser.add_option(
+        "--no-cache",
+        action="store_true",
+        help="Do not reuse or store per-file results of unchanged files",
+    )
+    parser.add_option(
+        "--poll",
+        action="store_true",
+        help="Poll for changes instead of using inotify",
+    )
+    parser.add_option("--verbose", action="store_true", help="Print details")
+    options, args = parser.parse_args(args)
+
+    import checkers.format_file_filter as format_file_filter
+    from utils import file_watcher
+
+    checker_manager = CheckerManager(options.ignore)
+    if options.checkers == "all":
+        specs = list(checker_manager.checker_specs.values())
+    else:
+        specs = []
+        for name in options.checkers.split(","):
+            if name not in checker_manager.checker_specs:
+                raise Exception("Checker " + name + " not found")
+            specs.append(checker_manager.checker_specs[name])
+    # The commit message does not change when files are saved.
+    specs = [spec for spec in specs if spec.checks_files]
+
+    mr = MergeRequest()
+    root_dir = mr.GetRootDirectory()
+    watcher = file_watcher.create_watcher(root_dir, poll=options.poll)
+    # Checkers are created when a file they check is saved for the first
+    # time, and kept warm for the following saves.
+    checkers = {}
+    check_options = optparse.Values(
+        {
+            "all": True,
+            "staged": False,
+            "base": None,
+            "changed": False,
+            "diff_ranges": False,
+            "verbose": options.verbose,
+        }
+    )
+
+    old_cwd = os.getcwd()
+    os.chdir(root_dir)
+    print("Watching %s, press Ctrl-C to stop." % root_dir)
+    try:
+        while True:
+            changed_files = [
+                f
+                for f in watcher.wait()
+                if format_file_filter.filterSuffix(f)
+                and format_file_filter.filterPathPrefix(f)
+            ]
+            if not changed_files:
+                continue
+            print("\nChanged: " + ", ".join(changed_files))
+            # Queries about the work tree are out of date after the saves.
+            git_backend.reset()
+            result_cache = None if options.no_cache else ResultCache()
+            # Read the saved files again.
+            content_store = WorkingTreeStore()
+            failed = []
+            for spec in specs:
+                files = spec.select(changed_files)
+                if not files:
                     continue
-                if options.verbose:
-                    print(("Formatting %s: %s" % (filename, output)))
+                if spec.name not in checkers:
+                    checkers[spec.name] = spec.create()
+                c = checkers[spec.name]
+                c.result_cache = result_cache
+                c.content_store = content_store
+                print_cutting_line(c.name)
+                try:
+                    res = c.run(check_options, mr, files)
+                except Exception:
+                    traceback.print_exc()
+                    res = CheckResult.FAILED
+                print("\n[%s] %s" % (c.name, res))
+                print_cutting_line()
+                if res != CheckResult.PASSED:
+                    failed.append(c.name)
+            if result_cache:
+                result_cache.close()
+            if failed:
+                print("Failed checkers: " + ", ".join(failed))
+    except KeyboardInterrupt:
+        return 0
     finally:
+        watcher.close()
         os.chdir(old_cwd)
 
 
+# git lynx serve: Keep a warm server for `git lynx check` in the background.
+def CMDserve(parser, args):
+    parser.add_option(
+        "--background", action="store_true", help="Detach and run in the background."
+    )
+    parser.add_option("--stop", action="store_true", help="Stop the running server.")
+    parser.add_option(
+        "--status", action="store_true", help="Show whether a server is running."
+    )
+    options, args = parser.parse_args(args)
+    root_directory = MergeRequest().GetRootDirectory()
+    if not root_directory:
+        return 1
+
+    if options.stop or options.status:
+        command = "stop" if options.stop else "status"
+        reply = lynx_daemon.request(root_directory, {"command": command})
+        if reply is None:
+            print("No git lynx server is running for %s" % root_directory)
+            return 1
+        if options.status:
+            print(
+                "git lynx server (pid %s) is serving %s" % (reply["pid"], reply["root"])
+            )
+        return 0
+
+    sources = lynx_daemon.SourceFiles(os.path.dirname(os.path.realpath(__file__)))
+    # Restart when the config or the code of git lynx changes.
+    server = lynx_daemon.LynxServer(
+        root_directory,
+        main,
+        stamp=lambda: (Config.stamp(), sources.changed()),
+    )
+    if server.is_running():
+        print("git lynx server is already running for %s" % root_directory)
+        return 1
+    if options.background:
+        log_path = os.path.splitext(server.path)[0] + ".log"
+        os.makedirs(os.path.dirname(log_path), mode=0o700, exist_ok=True)
+        with open(log_path, "a") as log:
+            subprocess.Popen(
+                [sys.executable, os.path.realpath(__file__), "serve"],
+                cwd=root_directory,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+                start_new_session=True,
+            )
+        print("git lynx server started, log: %s" % log_path)
+        return 0
+
+    # Import all checkers up front so that requests find them warm.
+    for spec in CheckerManager("none").checker_specs.values():
+        spec.load()
+    print("git lynx server is serving %s on %s" % (root_directory, server.path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# git lynx bench: Benchmark check and format on a generated repository.
+def CMDbench(parser, args):
+    parser.add_option(
+        "--checkers", help="Checkers to benchmark, default all", default="all"
+    )
+    parser.add_option(
+        "--files", type="int", default=200, help="Number of generated files"
+    )
+    parser.add_option(
+        "--commits", type="int", default=5, help="Number of generated commits"
+    )
+    parser.add_option(
+        "--lines", type="int", default=200, help="Average number of lines per file"
+    )
+    parser.add_option("--seed", type="int", default=0, help="Random seed")
+    parser.add_option(
+        "--repeat", type="int", default=3, help="Number of runs per benchmark"
+    )
+    parser.add_option("--output", help="Write the results to this JSON file")
+    parser.add_option("--baseline", help="Compare with the results in this file")
+    parser.add_option(
+        "--threshold",
+        type="float",
+        default=0.2,
+        help="Relative slowdown reported as a regression, default 0.2",
+    )
+    parser.add_option(
+        "--keep", action="store_true", help="Keep the generated repository"
+    )
+    options, args = parser.parse_args(args)
+    from utils import bench
+
+    if options.checkers == "all":
+        checker_names = list(CheckerManager("none").checker_specs)
+    else:
+        checker_names = options.checkers.split(",")
+    return bench.main(options, checker_names)
+
+
+# git lynx merge-results: Combine the result files of sharded checks.
+@subcommand.usage("<result file>...")
+def CMDmerge_results(parser, args):
+    parser.add_option("--output", help="Write the merged results to this file")
+    options, args = parser.parse_args(args)
+    if not args:
+        parser.error("At least one result file is required")
+    merged, problems = sharding.merge_result_files(args)
+    for name, checker in sorted(merged["checkers"].items()):
+        res = CheckResult.PASSED if checker["passed"] else CheckResult.FAILED
+        print("[%s] %s" % (name, res))
+    print("%d files checked in %d result files" % (merged["files"], len(args)))
+    for problem in problems:
+        print("Error: " + problem)
+    if options.output:
+        sharding.write_result_file(
+            options.output,
+            None,
+            {name: c["passed"] for name, c in merged["checkers"].items()},
+            merged["files"],
+            merged["file_costs"],
+        )
+    passed = all(c["passed"] for c in merged["checkers"].values())
+    return 0 if passed and not problems else 1
+
+
 # git lynx commit:  The encapsulation of [git commit -t (template-file) ],
 # the commit message template used is located in /git_templates/normal.
 # When editing the commit message, [label], summary, and issue fields are automatically generated .
@@ -228,7 +822,7 @@ def main(argv):
     usage = "git lynx subcommand"
     dispatcher = subcommand.CommandDispatcher(__name__)
 
-    dispatcher.execute(OptionParser(), argv)
+    return dispatcher.execute(OptionParser(), argv)
 
 
 if __name__ == "__main__":
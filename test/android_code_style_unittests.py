@@ -0,0 +1,47 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import contextlib
+import io
+import optparse
+import unittest
+from unittest import mock
+
+from checkers.android_code_style_checker import AndroidCodeStyleChecker
+from checkers.checker import CheckResult
+
+
+class AndroidCodeStyleCheckerTest(unittest.TestCase):
+    def run_all(self, outputs):
+        checker = AndroidCodeStyleChecker()
+        options = optparse.Values({"all": True})
+        # A stream, as `check --all` passes the files of the repository.
+        files = iter(["a/A.java", "a/b.cc", "a/B.java"])
+        output = io.StringIO()
+        with mock.patch.object(
+            checker, "check_resourece", return_value=(True, None)
+        ), mock.patch.object(
+            checker, "run_check_style", side_effect=outputs
+        ) as run_check_style, contextlib.redirect_stdout(
+            output
+        ):
+            result = checker.run(options, None, files)
+        checked = [call.args[0] for call in run_check_style.call_args_list]
+        return result, checked, output.getvalue()
+
+    def test_all_files_passed(self):
+        result, checked, _ = self.run_all([(True, ""), (True, "")])
+        self.assertEqual(result, CheckResult.PASSED)
+        self.assertEqual(checked, ["a/A.java", "a/B.java"])
+
+    def test_all_files_failed(self):
+        error = "[ERROR] a/B.java:3:1: Unused import - java.util.List."
+        result, _, output = self.run_all(
+            [(True, ""), (False, "Starting audit...\n%s\n" % error)]
+        )
+        self.assertEqual(result, CheckResult.FAILED)
+        self.assertIn("android-check-style failed:\n%s\n" % error, output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import optparse
+import os
+import unittest
+from unittest import mock
+
+from utils import bench
+from utils.result_cache import default_cache_dir
+
+
+class BenchTest(unittest.TestCase):
+    def test_runs_use_a_temporary_cache_dir(self):
+        cache_dirs = []
+
+        def run(root_dir, args, cache_dir):
+            cache_dirs.append(cache_dir)
+            with open(os.path.join(cache_dir, "stats.json"), "w") as f:
+                f.write("{}")
+            return 0.1, 0
+
+        options = optparse.Values(
+            {
+                "files": 10,
+                "commits": 1,
+                "lines": 10,
+                "seed": 0,
+                "repeat": 1,
+                "keep": False,
+                "output": None,
+                "baseline": None,
+            }
+        )
+        with mock.patch.object(bench, "_run_git_lynx", side_effect=run), mock.patch(
+            "builtins.print"
+        ):
+            bench.main(options, ["default"])
+        self.assertTrue(cache_dirs)
+        self.assertEqual(len(set(cache_dirs)), 1)
+        self.assertNotEqual(cache_dirs[0], default_cache_dir())
+        self.assertFalse(os.path.exists(cache_dirs[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
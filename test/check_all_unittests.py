@@ -0,0 +1,101 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+GIT_LYNX = os.path.join(os.path.dirname(os.path.dirname(__file__)), "git_lynx.py")
+
+# An external checker that needs a list of files.
+LEN_CHECKER = """
+from checkers.checker import Checker, CheckResult
+
+
+class LenChecker(Checker):
+    name = "len-check"
+    help = "Count the files"
+    extensions = (".cc",)
+
+    def run(self, options, mr, changed_files):
+        print("files: %d" % len(changed_files))
+        print("again: %d" % len([f for f in changed_files]))
+        return CheckResult.PASSED
+"""
+
+
+class CheckAllTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.repo_dir = os.path.join(self.temp_dir, "repo")
+        os.mkdir(self.repo_dir)
+        self.git("init", "-q")
+        self.git("config", "user.email", "lynx@example.com")
+        self.git("config", "user.name", "lynx")
+        self.write("hello.cc", b"int main() { return 0; }\n")
+        self.write("a.bin", b"\0\1\2\3")
+        self.git("add", ".")
+        self.git("commit", "-q", "-m", "Add files")
+        # file-type asks git lfs for the LFS files, which may not be installed.
+        self.bin_dir = os.path.join(self.temp_dir, "bin")
+        os.mkdir(self.bin_dir)
+        git_lfs = os.path.join(self.bin_dir, "git-lfs")
+        with open(git_lfs, "w") as f:
+            f.write("#!/bin/sh\n")
+        os.chmod(git_lfs, 0o755)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, True)
+
+    def git(self, *args):
+        subprocess.check_call(["git"] + list(args), cwd=self.repo_dir)
+
+    def write(self, path, content):
+        path = os.path.join(self.repo_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+    def run_git_lynx(self, *args):
+        env = dict(
+            os.environ,
+            GIT_LYNX_NO_DAEMON="1",
+            GIT_LYNX_CACHE_DIR=os.path.join(self.temp_dir, "cache"),
+            PATH=self.bin_dir + os.pathsep + os.environ["PATH"],
+        )
+        return subprocess.run(
+            [sys.executable, GIT_LYNX] + list(args),
+            cwd=self.repo_dir,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+        )
+
+    def test_streamed_findings(self):
+        result = self.run_git_lynx("check", "--all", "--checkers", "file-type")
+        self.assertNotEqual(result.returncode, 0, result.stdout)
+        self.assertIn("checking a.bin\n    binary file\n", result.stdout)
+
+    def test_staged(self):
+        result = self.run_git_lynx(
+            "check", "--all", "--staged", "--checkers", "file-type"
+        )
+        self.assertNotEqual(result.returncode, 0, result.stdout)
+        self.assertIn("a.bin", result.stdout)
+        self.assertIn("[file-type] \x1b[31mFAILED", result.stdout)
+
+    def test_external_checker_gets_a_list(self):
+        self.write("ext/external_checkers/__init__.py", b"")
+        self.write("ext/external_checkers/len_checker.py", LEN_CHECKER.encode())
+        self.write(".tools_shared", b"external_checker_path: ext\n")
+        result = self.run_git_lynx("check", "--all", "--checkers", "len-check")
+        self.assertEqual(result.returncode, 0, result.stdout)
+        self.assertIn("files: 1\nagain: 1\n", result.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+from utils.checker_stats import CheckerStats
+
+
+def _spec(name):
+    return types.SimpleNamespace(
+        name=name,
+        startup_cost=1.0,
+        file_cost=1.0,
+        select=lambda files: [f for f in files if f.endswith(".cc")],
+        handles=lambda path: path.endswith(".cc"),
+    )
+
+
+class CheckerStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.stats = CheckerStats("/repo", os.path.join(self.temp_dir, "stats.json"))
+
+    def test_file_times(self):
+        spec = _spec("slow")
+        self.stats.record(spec, 2.5, ["a.cc", "b.cc"], {"a.cc": 1.0, "b.cc": 1.0})
+        self.assertAlmostEqual(self.stats.estimate(spec, ["c.cc", "d.cc"]), 2.5)
+
+    def test_spread_over_the_files(self):
+        spec = _spec("slow")
+        self.stats.record(spec, 2.0, ["a.cc", "b.cc", "c.h"], {})
+        self.assertAlmostEqual(self.stats.estimate(spec, ["c.cc"]), 1.0)
+
+    def test_type_times_of_streamed_runs(self):
+        fast, slow = _spec("fast"), _spec("slow")
+        self.stats.record(fast, 1.0, iter([]), {}, {".cc": [0.5, 100]})
+        self.stats.record(slow, 2.0, iter([]), {}, {".cc": [0.9, 3]})
+        # The startup plus the time per file of each file of the last run.
+        self.assertAlmostEqual(self.stats.estimate(fast, None), 1.0)
+        self.assertAlmostEqual(self.stats.estimate(slow, None), 2.0)
+        self.stats.save()
+        stats = CheckerStats("/repo", self.stats.path)
+        self.assertEqual(stats.order([slow, fast], None), [fast, slow])
+        self.assertAlmostEqual(stats.estimate(fast, ["a.cc"]), 0.5 + 0.005)
+
+
+if __name__ == "__main__":
+    unittest.main()
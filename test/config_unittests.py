@@ -0,0 +1,155 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import contextlib
+import copy
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from checkers import path_filter
+from checkers.default_config import checker_default_config
+from config import Config
+from utils import git_backend, yaml_loader
+
+
+class DirectoryConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = (Config.data, Config.directories, Config._lookups)
+        root = copy.deepcopy(checker_default_config)
+        root["coding-style-checker"]["ignore-dirs"] = ["out/"]
+        Config.data = {"checker-config": root}
+        Config.directories = {"": root}
+        Config._lookups = {}
+        for directory, source in [
+            ("sub", {"coding-style-checker": {"ignore-dirs": ["gen"]}}),
+            ("sub/deep", {"disabled-checkers": ["coding-style"]}),
+        ]:
+            parent = Config.for_directory(directory.rsplit("/", 1)[0])
+            Config.directories[directory] = Config.merge_directory(
+                copy.deepcopy(parent),
+                {"checker-config": source},
+                directory,
+                directory + "/.tools_shared",
+            )
+            Config._lookups = {}
+
+    def tearDown(self):
+        Config.data, Config.directories, Config._lookups = self.saved
+
+    def test_lookup(self):
+        self.assertIs(Config.for_path("a/b/c.cc"), Config.directories[""])
+        self.assertIs(Config.for_path("sub/x/y.cc"), Config.directories["sub"])
+        self.assertEqual(
+            Config.for_path("sub/deep/z/a.cc")["coding-style-checker"]["ignore-dirs"],
+            ["out/", "sub/gen"],
+        )
+
+    def test_should_check(self):
+        self.assertFalse(path_filter.should_check("coding-style", "out/a.cc"))
+        self.assertTrue(path_filter.should_check("coding-style", "gen/a.cc"))
+        self.assertFalse(path_filter.should_check("coding-style", "sub/gen/a.cc"))
+        self.assertTrue(path_filter.should_check("coding-style", "sub/a.cc"))
+        self.assertFalse(path_filter.should_check("coding-style", "sub/deep/a.cc"))
+        self.assertTrue(path_filter.should_check("file-type", "sub/deep/a.cc"))
+
+    def test_root_only_sections(self):
+        with self.assertRaises(KeyError):
+            Config.merge_directory(
+                copy.deepcopy(Config.directories[""]),
+                {"checker-config": {"timeouts": {"checker": 1}}},
+                "sub",
+                "sub/.tools_shared",
+            )
+
+    def test_section_types(self):
+        for source in [
+            {"coding-style-checker": None},
+            {"disabled-checkers": "cpplint"},
+            {"coding-style-checker": {"ignore-dirs": None}},
+            {"ignore-dirs": {"a": 1}},
+        ]:
+            with self.assertRaises(ValueError):
+                Config.merge_directory(
+                    copy.deepcopy(Config.directories[""]),
+                    {"checker-config": source},
+                    "sub",
+                    "sub/.tools_shared",
+                )
+
+
+class ConfigInitTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = dict(vars(Config))
+        Config.data = {}
+        self.temp_dir = tempfile.mkdtemp()
+        self.repo_dir = os.path.join(self.temp_dir, "repo")
+        os.mkdir(self.repo_dir)
+        env = mock.patch.dict(
+            os.environ, {"GIT_LYNX_CACHE_DIR": os.path.join(self.temp_dir, "cache")}
+        )
+        env.start()
+        self.addCleanup(env.stop)
+        self.old_cwd = os.getcwd()
+        os.chdir(self.repo_dir)
+        subprocess.check_call(["git", "init", "-q"])
+        with open(".gitignore", "w") as f:
+            f.write(".tools_shared\n")
+        self.write(".tools_shared", "checker-config:\n  ignore-dirs: [out]\n")
+        self.write("sub/.tools_shared", "checker-config:\n  ignore-dirs: [gen]\n")
+        subprocess.check_call(["git", "add", "-f", "sub/.tools_shared"])
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        git_backend.reset()
+        for name in ("data", "path", "root_dir", "directories", "files", "_lookups"):
+            setattr(Config, name, self.saved[name])
+        shutil.rmtree(self.temp_dir, True)
+
+    def write(self, path, content):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def init(self):
+        git_backend.reset()
+        Config.init()
+        return Config.for_path("sub/a.cc")["ignore-dirs"]
+
+    def test_init(self):
+        # Untracked config files are ignored.
+        self.write("other/.tools_shared", "checker-config:\n  ignore-dirs: [x]\n")
+        self.assertEqual(
+            [path for path, _, _ in Config.find_files(self.repo_dir)],
+            [".tools_shared", "sub/.tools_shared"],
+        )
+        self.assertEqual(self.init(), ["out", "sub/gen"])
+        self.assertTrue(os.path.exists(Config.cache_path(os.path.realpath("."))))
+        stamp = Config.stamp()
+
+        # Unchanged files are not parsed again.
+        with mock.patch.object(yaml_loader, "load_file", side_effect=AssertionError):
+            self.assertEqual(self.init(), ["out", "sub/gen"])
+
+        self.write("sub/.tools_shared", "checker-config:\n  ignore-dirs: [gen2]\n")
+        self.assertNotEqual(Config.stamp(), stamp)
+        self.assertEqual(self.init(), ["out", "sub/gen2"])
+
+    def test_outside_a_repo(self):
+        os.chdir(self.temp_dir)
+        output = io.StringIO()
+        with mock.patch.dict(
+            os.environ, {"GIT_CEILING_DIRECTORIES": self.temp_dir}
+        ), contextlib.redirect_stdout(output):
+            git_backend.reset()
+            Config.init()
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(Config.data["npx-no-install"], False)
+
+
+if __name__ == "__main__":
+    unittest.main()
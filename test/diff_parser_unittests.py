@@ -0,0 +1,83 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import unittest
+
+from utils.diff_parser import DiffIndex, FileChanges, LineIndexes, iter_hunks
+
+DIFF = """diff --git a/a.cc b/a.cc
+--- a/a.cc
++++ b/a.cc
+@@ -1,0 +2,2 @@
++++i;
++b
+@@ -5 +7 @@
+-old
++new
+@@ -9,2 +10,0 @@
+-gone
+-gone
+diff --git a/d.cc b/d.cc
+deleted file mode 100644
+--- a/d.cc
++++ /dev/null
+@@ -1 +0,0 @@
+-bye
+diff --git a/n.cc b/n.cc
+--- /dev/null
++++ b/n.cc
+@@ -0,0 +1 @@
++hi
+"""
+
+
+class DiffParserTest(unittest.TestCase):
+    def test_hunks(self):
+        self.assertEqual(
+            list(iter_hunks(DIFF.splitlines())),
+            [("a.cc", 2, ["++i;", "b"]), ("a.cc", 7, ["new"]), ("n.cc", 1, ["hi"])],
+        )
+
+    def test_odd_paths(self):
+        diff = (
+            "--- a/sp ace.h\t\n"
+            "+++ b/sp ace.h\t\n"
+            "@@ -0,0 +1 @@\n"
+            "+a\n"
+            '--- "a/t\\303\\251st.h"\n'
+            '+++ "b/t\\303\\251st.h"\n'
+            "@@ -0,0 +1 @@\n"
+            "+b\n"
+        )
+        self.assertEqual(
+            [path for path, _, _ in iter_hunks(diff.splitlines())],
+            ["sp ace.h", "t\u00e9st.h"],
+        )
+
+    def test_index(self):
+        index = DiffIndex.parse(DIFF)
+        self.assertEqual(index.ranges("a.cc"), [(2, 3), (7, 7)])
+        self.assertTrue(index.is_changed("a.cc", 3))
+        self.assertFalse(index.is_changed("a.cc", 4))
+        self.assertNotIn("d.cc", index)
+
+    def test_merge_out_of_order(self):
+        changes = FileChanges("a.cc")
+        for first, last in [(10, 12), (1, 2), (20, 30), (3, 4), (13, 19)]:
+            changes.add(first, last)
+        self.assertEqual(changes.ranges(), [(1, 4), (10, 30)])
+        self.assertEqual(len(changes), 25)
+
+    def test_line_indexes(self):
+        line_indexes = LineIndexes()
+        for path, first, added in iter_hunks(DIFF.splitlines()):
+            line_indexes.add_hunk(hash(path), path, first, len(added))
+        self.assertEqual(len(line_indexes), 4)
+        self.assertEqual(line_indexes[2], (hash("a.cc"), 7))
+        self.assertEqual(line_indexes[3], (hash("n.cc"), 1))
+        self.assertNotIn(4, line_indexes)
+        self.assertEqual(list(line_indexes.changed_lines("a.cc")), [2, 3, 7])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import contextlib
+import io
+import optparse
+import threading
+import time
+import unittest
+from unittest import mock
+
+from checkers.checker import CheckResult, FileChecker
+from checkers.checker_scheduler import CheckerScheduler
+
+
+class _Cache:
+    def __init__(self):
+        self.results = {}
+
+    def make_key(self, checker, filename, changed_ranges=None):
+        return filename
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def put(self, key, findings):
+        self.results[key] = findings
+
+
+class _Checker(FileChecker):
+    name = "test"
+    jobs = 4
+
+    def __init__(self):
+        super().__init__()
+        self.checked = []
+        self._checked_lock = threading.Lock()
+
+    def _read(self, path):
+        return path.encode()
+
+    def check_file(self, path, content, changed_ranges):
+        # Finish out of order to show that the results keep their order.
+        time.sleep(0.001 * (hash(path) % 5))
+        with self._checked_lock:
+            self.checked.append(path)
+        return [content.decode().upper()]
+
+
+class _BatchChecker(_Checker):
+    batch_size = 2
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def batch_check(self, files):
+        self.batches.append([path for path, _, _ in files])
+        return super().batch_check(files)
+
+
+class FileCheckerTest(unittest.TestCase):
+    def test_check_file_is_abstract(self):
+        class Incomplete(FileChecker):
+            name = "incomplete"
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_results_keep_the_order_of_the_files(self):
+        checker = _Checker()
+        paths = ["f%d" % i for i in range(50)]
+        results = list(checker.iter_results(iter(paths)))
+        self.assertEqual(results, [(path, [path.upper()]) for path in paths])
+        self.assertEqual(sorted(checker.file_times), sorted(paths))
+
+    def test_type_times(self):
+        checker = _Checker()
+        checker.type_times = {}
+        checker.check_files(["a.cc", "b.cc", "c.h"])
+        self.assertEqual(checker.file_times, {})
+        self.assertEqual(
+            {name: count for name, (_, count) in checker.type_times.items()},
+            {".cc": 2, ".h": 1},
+        )
+
+    def test_cached_files_are_not_checked_again(self):
+        for checker_class in (_Checker, _BatchChecker):
+            cache = _Cache()
+            paths = ["f%d" % i for i in range(20)]
+            first = checker_class()
+            first.result_cache = cache
+            first.check_files(paths)
+            self.assertEqual((first.cache_hits, first.cache_misses), (0, 20))
+
+            second = checker_class()
+            second.result_cache = cache
+            cache.results["f3"] = ["cached"]
+            results = second.check_files(paths)
+            self.assertEqual(second.checked, [])
+            self.assertEqual((second.cache_hits, second.cache_misses), (20, 0))
+            self.assertEqual(second.file_times, {})
+            self.assertEqual(results["f3"], ["cached"])
+            self.assertEqual(results["f4"], ["F4"])
+
+    def test_batches(self):
+        checker = _BatchChecker()
+        checker.result_cache = _Cache()
+        checker.result_cache.results["b"] = ["cached"]
+        results = list(checker.iter_results(iter(["a", "b", "c", "d", "e"])))
+        self.assertEqual(
+            results,
+            [("a", ["A"]), ("b", ["cached"]), ("c", ["C"]), ("d", ["D"]), ("e", ["E"])],
+        )
+        self.assertEqual(sorted(checker.batches), [["a", "c"], ["d", "e"]])
+        self.assertEqual(sorted(checker.file_times), ["a", "c", "d", "e"])
+        self.assertEqual(checker.result_cache.results["e"], ["E"])
+
+    def test_findings_are_printed_once(self):
+        checker = _Checker()
+        checker.content_store = mock.Mock()
+        options = optparse.Values({"all": True})
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            result = checker.run(options, None, iter(["a", "b"]))
+        self.assertEqual(result, CheckResult.FAILED)
+        self.assertEqual(
+            output.getvalue(),
+            "checking a\n"
+            "    1 error(s)\n"
+            "checking b\n"
+            "    1 error(s)\n"
+            "Please check the following errors:\n\n"
+            "    A\n"
+            "    B\n",
+        )
+
+    def test_helper_threads_print_to_the_task(self):
+        class Printing(_Checker):
+            def check_file(self, path, content, changed_ranges):
+                print("checked %s" % path)
+                return []
+
+        def run(checker, paths):
+            print("start %s" % checker.name)
+            checker.check_files(paths)
+            return CheckResult.PASSED
+
+        first, second = Printing(), Printing()
+        first.name, second.name = "first", "second"
+        scheduler = CheckerScheduler(jobs=2)
+        scheduler.add("first", lambda: run(first, ["a", "b"]))
+        scheduler.add("second", lambda: run(second, ["c"]))
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            scheduler.run()
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], "start first")
+        self.assertEqual(sorted(lines[1:3]), ["checked a", "checked b"])
+        self.assertEqual(lines[3:], ["start second", "checked c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from checkers import format_engine
+
+# Warns on stderr about every file and fails on the files named "bad".
+_TOOL = """
+import sys
+for path in sys.argv[1:]:
+    sys.stderr.write("warning: %s\\n" % path)
+sys.exit(any(path.endswith("bad") for path in sys.argv[1:]))
+"""
+
+
+class FormatEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        patcher = mock.patch(
+            "checkers.format_file_filter.getFormatToolCommand",
+            return_value=[sys.executable, "-c", _TOOL],
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _file(self, name):
+        path = os.path.join(self.dir, name)
+        with open(path, "w") as f:
+            f.write("int a;")
+        return path
+
+    def _content(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_warnings_do_not_fail_a_batch(self):
+        paths = [self._file("a"), self._file("b")]
+        self.assertEqual(format_engine.format_batch("clang-format", paths), {})
+        self.assertEqual([self._content(p) for p in paths], ["int a;\n"] * 2)
+
+    def test_failed_files(self):
+        good, bad = self._file("good"), self._file("bad")
+        errors = format_engine.format_batch("clang-format", [good, bad])
+        self.assertEqual(errors, {bad: "warning: %s\n" % bad})
+        self.assertEqual(self._content(good), "int a;\n")
+        self.assertEqual(self._content(bad), "int a;")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import unittest
+
+from checkers.format_file_filter import getRangeArguments
+
+
+class RangeArgumentsTest(unittest.TestCase):
+    def test_clang_format(self):
+        self.assertEqual(
+            getRangeArguments("clang-format", [(1, 2), (5, 5)], b""),
+            ["--lines=1:2", "--lines=5:5"],
+        )
+
+    def test_prettier_counts_utf16_code_units(self):
+        # The emoji is one code point, but two UTF-16 code units.
+        content = "a\n\U0001f600b\nc\n".encode("utf-8")
+        self.assertEqual(
+            getRangeArguments("prettier", [(2, 2)], content),
+            ["--range-start=2", "--range-end=6"],
+        )
+        self.assertEqual(
+            getRangeArguments("prettier", [(3, 3)], content),
+            ["--range-start=6", "--range-end=8"],
+        )
+
+    def test_prettier_only_splits_lines_at_newlines(self):
+        # Like git, unlike str.splitlines().
+        content = "a\u2028b\nc\n".encode("utf-8")
+        self.assertEqual(
+            getRangeArguments("prettier", [(2, 2)], content),
+            ["--range-start=4", "--range-end=6"],
+        )
+
+    def test_gn(self):
+        self.assertIsNone(getRangeArguments("gn", [(1, 1)], b""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from utils import lynx_daemon
+
+
+class LynxServerTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        # After the server is stopped.
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        patcher = mock.patch.dict(os.environ, {"TMPDIR": self.temp_dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.requests = []
+
+    def handler(self, argv):
+        self.requests.append((argv, os.environ.get("GIT_INDEX_FILE")))
+        print("handled")
+        return 3
+
+    def start_server(self):
+        server = lynx_daemon.LynxServer(self.temp_dir, self.handler)
+        server.listen()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(lynx_daemon.request, self.temp_dir, {"command": "stop"})
+
+    def send(self, argv):
+        output = []
+        message = {"argv": argv, "cwd": self.temp_dir, "env": {"GIT_INDEX_FILE": "x"}}
+        reply = lynx_daemon.request(
+            self.temp_dir, message, lambda stream, data: output.append(data)
+        )
+        return reply["exit"], "".join(output)
+
+    def test_runs_in_the_client_environment(self):
+        self.start_server()
+        self.assertEqual(self.send(["check"]), (3, "handled\n"))
+        self.assertEqual(self.requests, [(["check"], "x")])
+        self.assertNotIn("GIT_INDEX_FILE", os.environ)
+
+    def test_only_forwarded_commands(self):
+        self.start_server()
+        code, _ = self.send(["format", "--all"])
+        self.assertEqual(code, 2)
+        self.assertEqual(self.requests, [])
+
+    def test_runtime_dir_of_others(self):
+        runtime_dir = os.path.dirname(lynx_daemon.socket_path(self.temp_dir))
+        os.makedirs(runtime_dir, mode=0o755)
+        os.chmod(runtime_dir, 0o755)
+        server = lynx_daemon.LynxServer(self.temp_dir, self.handler)
+        with self.assertRaises(RuntimeError):
+            server.listen()
+
+
+class SourceFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        self.path = os.path.join(self.temp_dir, "lynx_daemon_probe.py")
+        with open(self.path, "w") as f:
+            f.write("VALUE = 1\n")
+        sys.path.insert(0, self.temp_dir)
+        self.addCleanup(sys.path.remove, self.temp_dir)
+        self.addCleanup(sys.modules.pop, "lynx_daemon_probe", None)
+
+    def test_changed(self):
+        sources = lynx_daemon.SourceFiles(self.temp_dir)
+        # Modules imported after the start are compared from then on.
+        importlib.import_module("lynx_daemon_probe")
+        self.assertFalse(sources.changed())
+        self.assertFalse(sources.changed())
+        st = os.stat(self.path)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertTrue(sources.changed())
+
+
+if __name__ == "__main__":
+    unittest.main()
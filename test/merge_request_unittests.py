@@ -0,0 +1,114 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import copy
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from checkers import path_filter
+from checkers.default_config import checker_default_config
+from config import Config
+from utils import git_backend
+from utils.diff_parser import parse_changed_ranges
+from utils.merge_request import MergeRequest
+
+FILES = ["a.cc", "b.h", "third_party/x.cc", "gen/a_jni.h", "src/gen/b_jni.h"]
+
+
+class MergeRequestTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = (Config.data, Config.directories, Config._lookups)
+        root = copy.deepcopy(checker_default_config)
+        root["ignore-dirs"] = ["third_party"]
+        root["coding-style-checker"]["ignore-suffixes"] = ["_jni.h"]
+        Config.data = {"checker-config": root}
+        Config.directories = {"": root}
+        Config._lookups = {}
+        self.old_cwd = os.getcwd()
+        self.repo_dir = tempfile.mkdtemp()
+        os.chdir(self.repo_dir)
+
+    def tearDown(self):
+        Config.data, Config.directories, Config._lookups = self.saved
+        os.chdir(self.old_cwd)
+        git_backend.reset()
+        shutil.rmtree(self.repo_dir, True)
+
+    def git(self, *args):
+        subprocess.check_call(["git"] + list(args))
+
+    def init(self, *args):
+        self.git("init", "-q", *args)
+        self.git("config", "user.email", "lynx@example.com")
+        self.git("config", "user.name", "lynx")
+        for path in FILES:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w") as f:
+                f.write("x\n")
+        self.git("add", ".")
+        self.git("commit", "-q", "-m", "Add files")
+        with open(".gitignore", "w") as f:
+            f.write("*.o\n")
+        with open("new.cc", "w") as f:
+            f.write("y\n")
+        with open("new.o", "w") as f:
+            f.write("z\n")
+
+    def test_git_excludes(self):
+        self.assertEqual(
+            path_filter.git_excludes(["file-type"]),
+            [":(top,exclude,literal)third_party"],
+        )
+        self.assertEqual(
+            path_filter.git_excludes(["coding-style"]),
+            [
+                ":(top,exclude,glob)**/*_jni.h",
+                ":(top,exclude,literal)third_party",
+            ],
+        )
+
+    def test_all_files(self):
+        self.init()
+        mr = MergeRequest()
+        excludes = path_filter.git_excludes(["coding-style"])
+        self.assertEqual(sorted(mr.GetAllFiles()), sorted(FILES))
+        self.assertEqual(sorted(mr.GetAllFiles(excludes)), ["a.cc", "b.h"])
+        self.assertEqual(list(mr.IterAllFiles(excludes)), ["a.cc", "b.h"])
+        os.chdir("src")
+        self.assertEqual(sorted(mr.GetAllFiles(excludes)), ["a.cc", "b.h"])
+
+    def test_working_tree_files(self):
+        self.init()
+        mr = MergeRequest()
+        excludes = path_filter.git_excludes(["file-type"])
+        self.assertEqual(
+            sorted(mr.GetWorkingTreeFiles(excludes)),
+            [".gitignore", "a.cc", "b.h", "gen/a_jni.h", "new.cc", "src/gen/b_jni.h"],
+        )
+
+    def test_changes_before_the_first_commit(self):
+        self.git("init", "-q")
+        with open("a.cc", "w") as f:
+            f.write("x\n")
+        self.git("add", "a.cc")
+        mr = MergeRequest()
+        self.assertEqual(mr.GetChangedFiles(), ["a.cc"])
+        self.assertEqual(parse_changed_ranges(mr.GetChangedLines()), {"a.cc": [(1, 1)]})
+        self.assertEqual(
+            parse_changed_ranges(mr.GetChangedLines(stream=True)), {"a.cc": [(1, 1)]}
+        )
+
+    def test_sha256_repository(self):
+        try:
+            self.init("--object-format=sha256")
+        except subprocess.CalledProcessError:
+            self.skipTest("git does not support SHA-256 repositories")
+        excludes = path_filter.git_excludes(["coding-style"])
+        self.assertEqual(sorted(MergeRequest().GetAllFiles(excludes)), ["a.cc", "b.h"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import re
+import unittest
+
+from checkers.path_filter import (
+    DirMatcher,
+    PathFilter,
+    PathRule,
+    PatternSet,
+    SuffixMap,
+)
+
+PATHS = [
+    "a.cc",
+    ".h",
+    "out/a.cc",
+    "output/a.cc",
+    "src/out/a.cc",
+    "third_party/x/y.h",
+    "src/gen/a_jni.h",
+    "src/a.pb.h",
+    "src/BUILD.gn",
+    "src/a.h.in",
+    "assets/icon.png",
+]
+DIRS = ["out/", "third_party", "src/g", "src/[ab]\\.pb"]
+SUFFIXES = ["_jni.h", ".pb.h", "BUILD.gn", ".in"]
+
+
+class PathFilterTest(unittest.TestCase):
+    def test_dirs_like_re_match(self):
+        matcher = DirMatcher(DIRS)
+        for path in PATHS:
+            expected = any(re.match(d, path) for d in DIRS)
+            self.assertEqual(matcher.match(path), expected, path)
+
+    def test_suffixes_like_endswith(self):
+        suffixes = SuffixMap(SUFFIXES)
+        for path in PATHS:
+            self.assertEqual(suffixes.match(path), path.endswith(tuple(SUFFIXES)), path)
+
+    def test_patterns_like_re_search(self):
+        patterns = [r"\.png$", r"(?i)\.JPG$", r"(a)(b)\2", r"^src/.*\.h$"]
+        pattern_set = PatternSet(patterns)
+        for path in PATHS + ["x.jpg", "abb", "aba"]:
+            expected = any(re.search(p, path) for p in patterns)
+            self.assertEqual(pattern_set.search(path), expected, path)
+
+    def test_should_check(self):
+        path_filter = PathFilter(
+            {
+                "coding-style": PathRule(
+                    extensions=(".cc", ".h"),
+                    exclude_suffixes=SUFFIXES,
+                    exclude_dirs=DIRS,
+                ),
+                "file-type": PathRule(exclude_patterns=[r"\.png$", "^x"]),
+            }
+        )
+        self.assertEqual(
+            [p for p in PATHS if path_filter.should_check("coding-style", p)],
+            ["a.cc", ".h", "output/a.cc", "src/out/a.cc"],
+        )
+        self.assertFalse(path_filter.should_check("file-type", "assets/icon.png"))
+        self.assertTrue(path_filter.should_check("file-type", "a.cc"))
+        self.assertTrue(path_filter.should_check("cpplint", "assets/icon.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
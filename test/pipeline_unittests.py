@@ -0,0 +1,62 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import io
+import unittest
+
+from checkers.checker import FileChecker
+from utils.pipeline import SpooledList, iter_lines, iter_z
+
+
+class _Checker(FileChecker):
+    name = "test"
+    jobs = 2
+
+    def __init__(self):
+        super().__init__()
+        self.pulled = 0
+
+    def _read(self, path):
+        return ""
+
+    def check_file(self, path, content, changed_ranges):
+        return [path.upper()]
+
+
+class PipelineTest(unittest.TestCase):
+    def test_spooled_list(self):
+        items = SpooledList(max_items=3)
+        items.extend([["a", 1], "b", "c", "d"])
+        items.append("e")
+        self.assertEqual(len(items), 5)
+        self.assertEqual(list(items), [["a", 1], "b", "c", "d", "e"])
+        self.assertEqual(list(items), [["a", 1], "b", "c", "d", "e"])
+        items.close()
+        self.assertEqual(list(items), [])
+
+    def test_iter_z(self):
+        stream = io.BufferedReader(io.BytesIO(b"a.cc\0b/c.h\0\0d"), buffer_size=3)
+        self.assertEqual(list(iter_z(stream)), ["a.cc", "b/c.h", "d"])
+
+    def test_iter_lines(self):
+        stream = io.BufferedReader(io.BytesIO(b"+a\r\n+\xff\nb"), buffer_size=3)
+        self.assertEqual(list(iter_lines(stream)), ["+a\r\n", "+\ufffd\n", "b"])
+
+    def test_iter_results_is_lazy(self):
+        checker = _Checker()
+
+        def paths():
+            for i in range(100):
+                checker.pulled += 1
+                yield "f%d" % i
+
+        results = checker.iter_results(paths())
+        self.assertEqual(next(results), ("f0", ["F0"]))
+        self.assertLess(checker.pulled, 10)
+        self.assertEqual(
+            [path for path, _ in results], ["f%d" % i for i in range(1, 100)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from utils.content_store import WorkingTreeStore
+from utils.result_cache import ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, True)
+
+    def test_concurrent_runs(self):
+        first = ResultCache(self.cache_dir, mr=object())
+        second = ResultCache(self.cache_dir, mr=object())
+        try:
+            first.put("a", ["finding"])
+            start = time.monotonic()
+            second.put("b", [])
+            self.assertLess(time.monotonic() - start, 0.5)
+            self.assertEqual(second.get("a"), ["finding"])
+            self.assertEqual(first.get("b"), [])
+            self.assertIsNone(first.get("c"))
+        finally:
+            first.close()
+            second.close()
+
+    def test_errors_are_misses(self):
+        cache = ResultCache(self.cache_dir, mr=object())
+        cache._db.execute("DROP TABLE results")
+        cache.put("a", [])
+        self.assertIsNone(cache.get("a"))
+        cache.close()
+
+    def test_blob_sha_reads_through_the_store(self):
+        path = os.path.join(self.cache_dir, "a.txt")
+        with open(path, "wb") as f:
+            f.write(b"hello\n")
+        mr = mock.Mock()
+        mr.GetCleanBlobShas.return_value = {}
+        cache = ResultCache(self.cache_dir, mr=mr)
+        store = WorkingTreeStore()
+        with mock.patch.object(store, "read", wraps=store.read) as read:
+            sha = cache.blob_sha(path, store)
+        cache.close()
+        # As `git hash-object` computes it.
+        self.assertEqual(sha, "ce013625030ba8dba906f756967f9e9ca394464a")
+        read.assert_called_once_with(path)
+
+    def test_blob_sha_of_staged_content(self):
+        cache = ResultCache(self.cache_dir, mr=object())
+        store = mock.Mock(blob_shas={"a.cc": "1234"})
+        self.assertEqual(cache.blob_sha("a.cc", store), "1234")
+        self.assertIsNone(cache.blob_sha("b.cc", store))
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
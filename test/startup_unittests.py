@@ -0,0 +1,129 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from checkers.checker_manifest import CHECKER_MANIFEST
+from utils import lynx_daemon
+
+GIT_LYNX = os.path.join(os.path.dirname(os.path.dirname(__file__)), "git_lynx.py")
+
+# Wall time allowed for `git lynx check --list`, in seconds.
+LIST_TIME_BUDGET = 1.0
+
+# Modules that must not be imported unless their checker runs.
+HEAVY_MODULES = [
+    "checkers.cpplint",
+    "checkers.java_lint_checker",
+    "checkers.android_code_style_checker",
+    "checkers.format_file_filter",
+]
+
+
+# Runs git_lynx.py like the command line does and dumps the names of all
+# imported modules to the file given as first argument.
+PROBE = """
+import atexit, json, os, runpy, sys
+output, argv = sys.argv[1], sys.argv[2:]
+atexit.register(lambda: open(output, "w").write(json.dumps(sorted(sys.modules))))
+sys.path.insert(0, os.path.dirname(argv[0]))
+sys.argv = argv
+runpy.run_path(argv[0], run_name="__main__")
+"""
+
+
+class StartupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_dir = tempfile.mkdtemp()
+        self.git("init", "-q")
+        self.git("config", "user.email", "lynx@example.com")
+        self.git("config", "user.name", "lynx")
+        with open(os.path.join(self.repo_dir, "hello.cc"), "w") as f:
+            f.write("int main() { return 0; }\n")
+        self.git("add", ".")
+        self.git("commit", "-q", "-m", "[feature] Add hello\n\nHello.\n\nissue: #1")
+
+    def tearDown(self):
+        shutil.rmtree(self.repo_dir, True)
+
+    def git(self, *args):
+        subprocess.check_call(["git"] + list(args), cwd=self.repo_dir)
+
+    def run_git_lynx(self, *args, env=None):
+        env = env or dict(os.environ, GIT_LYNX_NO_DAEMON="1")
+        modules_file = os.path.join(self.repo_dir, ".git", "modules.json")
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE, modules_file, GIT_LYNX] + list(args),
+            cwd=self.repo_dir,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+        )
+        with open(modules_file) as f:
+            result.modules = set(json.load(f))
+        return result
+
+    def test_manifest_matches_checker_classes(self):
+        for spec in CHECKER_MANIFEST:
+            cls = spec.load()
+            self.assertEqual(spec.name, cls.name)
+            self.assertEqual(spec.help, cls.help)
+            self.assertEqual(spec.extensions, cls.extensions)
+            self.assertEqual(spec.paths, cls.paths)
+
+    def test_list_does_not_import_checkers(self):
+        start = time.monotonic()
+        result = self.run_git_lynx("check", "--list")
+        elapsed = time.monotonic() - start
+        self.assertEqual(result.returncode, 0, result.stdout)
+        for spec in CHECKER_MANIFEST:
+            self.assertIn(spec.name, result.stdout)
+            self.assertNotIn(spec.module, result.modules)
+        self.assertLess(elapsed, LIST_TIME_BUDGET)
+
+    def test_commit_message_does_not_import_cpplint(self):
+        result = self.run_git_lynx("check", "--checkers", "commit-message")
+        self.assertEqual(result.returncode, 0, result.stdout)
+        self.assertIn("checkers.commit_message_checker", result.modules)
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, result.modules)
+
+    def test_checkers_without_files_are_not_imported(self):
+        result = self.run_git_lynx(
+            "check", "--all", "--checkers", "java-lint,android-check-style"
+        )
+        self.assertEqual(result.returncode, 0, result.stdout)
+        self.assertIn("No files to check for", result.stdout)
+        self.assertNotIn("checkers.java_lint_checker", result.modules)
+        self.assertNotIn("checkers.android_code_style_checker", result.modules)
+
+    def test_forward_before_imports(self):
+        env = dict(os.environ, TMPDIR=self.repo_dir)
+        env.pop("GIT_LYNX_NO_DAEMON", None)
+        with mock.patch.dict(os.environ, {"TMPDIR": self.repo_dir}):
+            server = lynx_daemon.LynxServer(self.repo_dir, lambda argv: 0)
+            server.listen()
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                result = self.run_git_lynx("check", env=env)
+            finally:
+                lynx_daemon.request(self.repo_dir, {"command": "stop"})
+                thread.join()
+        self.assertEqual(result.returncode, 0, result.stdout)
+        for module in ["config", "checkers.checker", "utils.result_cache"]:
+            self.assertNotIn(module, result.modules)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import os
+import pickle
+import shutil
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+import yaml
+
+from utils import yaml_loader
+
+
+class YamlLoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.cache_dir = os.path.join(self.dir, "cache")
+        patcher = mock.patch.dict(os.environ, {"GIT_LYNX_CACHE_DIR": self.cache_dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.path = os.path.join(self.dir, "Podfile.lock")
+
+    def _write(self, content, mtime_ns=None):
+        with open(self.path, "w") as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def _cache_files(self):
+        cache_dir = os.path.join(self.cache_dir, yaml_loader.CACHE_SUBDIR)
+        return os.listdir(cache_dir) if os.path.isdir(cache_dir) else []
+
+    def test_unchanged_files_are_not_parsed_again(self):
+        self._write("a: 1\n", mtime_ns=10**18)
+        self.assertEqual(yaml_loader.load_file(self.path), {"a": 1})
+        with mock.patch.object(yaml_loader, "load", side_effect=AssertionError):
+            self.assertEqual(yaml_loader.load_file(self.path), {"a": 1})
+
+    def test_changed_files_are_parsed_again(self):
+        self._write("a: 1\n", mtime_ns=10**18)
+        yaml_loader.load_file(self.path)
+        # The same size and a new modification time.
+        self._write("a: 2\n", mtime_ns=2 * 10**18)
+        self.assertEqual(yaml_loader.load_file(self.path), {"a": 2})
+        # The same modification time and a new size.
+        self._write("a: 33\n", mtime_ns=2 * 10**18)
+        self.assertEqual(yaml_loader.load_file(self.path), {"a": 33})
+        self.assertEqual(len(self._cache_files()), 1)
+
+    def test_without_cache(self):
+        self._write("a: 1\n")
+        self.assertEqual(yaml_loader.load_file(self.path, cache=False), {"a": 1})
+        self.assertEqual(self._cache_files(), [])
+
+    def test_failed_cache_writes_leave_no_files(self):
+        self._write("a: 1\n")
+        with mock.patch.object(pickle, "dump", side_effect=pickle.PicklingError):
+            self.assertEqual(yaml_loader.load_file(self.path), {"a": 1})
+        self.assertEqual(self._cache_files(), [])
+
+    def test_safe_loader_without_libyaml(self):
+        pure_yaml = types.SimpleNamespace(load=yaml.load, SafeLoader=yaml.SafeLoader)
+        with mock.patch.object(yaml_loader, "_yaml", pure_yaml):
+            self.assertIs(yaml_loader.get_loader(), yaml.SafeLoader)
+            self.assertEqual(yaml_loader.load("a: [1, b]\n"), {"a": [1, "b"]})
+            with self.assertRaises(yaml.constructor.ConstructorError):
+                yaml_loader.load("a: !!python/name:os.system\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,346 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Benchmarks `git lynx check` and `git lynx format` on synthetic repositories.
+
+The repositories are generated locally from a seed, so two runs with the same
+parameters measure the same work and their results can be compared.
+"""
+
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+GIT_LYNX = os.path.join(os.path.dirname(os.path.dirname(__file__)), "git_lynx.py")
+
+# Relative weight of each kind of file in a generated repository.
+FILE_KINDS = [
+    ("cc", 30),
+    ("h", 25),
+    ("mm", 8),
+    ("java", 12),
+    ("yml", 5),
+    ("gn", 5),
+    ("ts", 5),
+    ("png", 2),
+]
+
+COMMIT_MESSAGE = "[bench] Update {index}\n\nGenerated change.\n\nissue: #1\n"
+
+CHECK_MODES = [("all", ["--all"]), ("changed", ["--changed"]), ("last-commit", [])]
+
+
+def _cc_source(rng, name, lines):
+    body = [
+        "// Copyright 2024 The Lynx Authors. All rights reserved.",
+        "",
+        '#include "%s.h"' % name,
+        "",
+        "namespace bench {",
+        "",
+    ]
+    while len(body) < lines:
+        index = len(body)
+        body += [
+            "int Function%d(int value) {" % index,
+            "  int result = value * %d;" % rng.randint(1, 100),
+            "  if (result > %d) {" % rng.randint(1, 1000),
+            "    result -= %d;" % rng.randint(1, 10),
+            "  }",
+            "  return result;" + (" " if rng.random() < 0.05 else ""),
+            "}",
+            "",
+        ]
+    body += ["}  // namespace bench", ""]
+    return "\n".join(body)
+
+
+def _header_source(rng, name, lines):
+    guard = "BENCH_%s_H_" % name.upper().replace("/", "_")
+    body = [
+        "// Copyright 2024 The Lynx Authors. All rights reserved.",
+        "",
+        "#ifndef " + guard,
+        "#define " + guard,
+        "",
+        "namespace bench {",
+        "",
+    ]
+    while len(body) < lines:
+        body.append("int Function%d(int value);" % len(body))
+    body += ["", "}  // namespace bench", "", "#endif  // " + guard, ""]
+    return "\n".join(body)
+
+
+def _objc_source(rng, name, lines):
+    body = ["// Copyright 2024 The Lynx Authors. All rights reserved.", ""]
+    body += ["@implementation Bench%d" % rng.randint(0, 10000), ""]
+    while len(body) < lines:
+        body += ["- (int)value%d {" % len(body), "  return %d;" % len(body), "}", ""]
+    body += ["@end", ""]
+    return "\n".join(body)
+
+
+def _java_source(rng, name, lines):
+    class_name = os.path.basename(name).capitalize()
+    body = [
+        "// Copyright 2024 The Lynx Authors. All rights reserved.",
+        "package com.lynx.bench;",
+        "",
+        "import java.util.List;",
+        "",
+        "public class %s {" % class_name,
+    ]
+    while len(body) < lines:
+        body += [
+            "  public int value%d(int input) {" % len(body),
+            "    return input + %d;" % rng.randint(0, 100),
+            "  }",
+        ]
+    body += ["}", ""]
+    return "\n".join(body)
+
+
+def _yaml_source(rng, name, lines):
+    body = ["name: %s" % os.path.basename(name), "items:"]
+    while len(body) < lines:
+        body.append("  - key%d: %d" % (len(body), rng.randint(0, 1000)))
+    return "\n".join(body) + "\n"
+
+
+def _gn_source(rng, name, lines):
+    body = []
+    while len(body) < lines:
+        body += [
+            'source_set("target%d") {' % len(body),
+            '  sources = [ "file%d.cc" ]' % rng.randint(0, 1000),
+            "}",
+            "",
+        ]
+    return "\n".join(body)
+
+
+def _ts_source(rng, name, lines):
+    body = []
+    while len(body) < lines:
+        body.append("export const value%d = %d;" % (len(body), rng.randint(0, 1000)))
+    return "\n".join(body) + "\n"
+
+
+_GENERATORS = {
+    "cc": _cc_source,
+    "h": _header_source,
+    "mm": _objc_source,
+    "java": _java_source,
+    "yml": _yaml_source,
+    "gn": _gn_source,
+    "ts": _ts_source,
+}
+
+
+def _write_file(rng, root_dir, path, kind, lines):
+    full_path = os.path.join(root_dir, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    if kind == "png":
+        with open(full_path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + rng.randbytes(lines * 16))
+        return
+    name = os.path.splitext(path)[0]
+    with open(full_path, "w") as f:
+        f.write(_GENERATORS[kind](rng, name, lines))
+
+
+def _git(root_dir, *args):
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME="bench",
+        GIT_AUTHOR_EMAIL="bench@lynx",
+        GIT_AUTHOR_DATE="2024-01-01T00:00:00",
+        GIT_COMMITTER_NAME="bench",
+        GIT_COMMITTER_EMAIL="bench@lynx",
+        GIT_COMMITTER_DATE="2024-01-01T00:00:00",
+    )
+    subprocess.check_call(
+        ["git"] + list(args), cwd=root_dir, env=env, stdout=subprocess.DEVNULL
+    )
+
+
+def create_repository(root_dir, files=200, commits=5, lines=200, seed=0):
+    """Generates a git repository with |files| files and |commits| commits.
+
+    The last commit and the working tree both modify about a tenth of the
+    files, so that the last-commit and --changed modes have work to do.
+    """
+    rng = random.Random(seed)
+    kinds = [kind for kind, _ in FILE_KINDS]
+    weights = [weight for _, weight in FILE_KINDS]
+    paths = []
+    for i in range(files):
+        kind = rng.choices(kinds, weights)[0]
+        directory = "src/module%d/sub%d" % (rng.randint(0, 9), rng.randint(0, 4))
+        if kind == "gn":
+            paths.append(("%s/target%d/BUILD.gn" % (directory, i), kind))
+        else:
+            paths.append(("%s/file%d.%s" % (directory, i, kind), kind))
+
+    os.makedirs(root_dir, exist_ok=True)
+    _git(root_dir, "init", "-q")
+    for path, kind in paths:
+        _write_file(rng, root_dir, path, kind, rng.randint(lines // 2, lines * 2))
+    _git(root_dir, "add", "-A")
+    _git(root_dir, "commit", "-q", "-m", COMMIT_MESSAGE.format(index=0))
+
+    changes = max(1, files // 10)
+    for index in range(1, commits):
+        for path, kind in rng.sample(paths, changes):
+            _write_file(rng, root_dir, path, kind, rng.randint(lines // 2, lines * 2))
+        _git(root_dir, "add", "-A")
+        _git(root_dir, "commit", "-q", "-m", COMMIT_MESSAGE.format(index=index))
+
+    for path, kind in rng.sample(paths, changes):
+        _write_file(rng, root_dir, path, kind, rng.randint(lines // 2, lines * 2))
+    return paths
+
+
+def _run_git_lynx(root_dir, args, cache_dir):
+    # Keep the stats, result cache and config cache of the generated
+    # repository out of the user's cache directory.
+    env = dict(os.environ, GIT_LYNX_NO_DAEMON="1", GIT_LYNX_CACHE_DIR=cache_dir)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, GIT_LYNX] + args,
+        cwd=root_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start, result.returncode
+
+
+def _save_working_tree(root_dir):
+    _git(root_dir, "stash", "-q")
+    _git(root_dir, "stash", "apply", "-q")
+
+
+def _restore_working_tree(root_dir):
+    # Undo the changes of `git lynx format` and bring back the generated
+    # uncommitted changes.
+    _git(root_dir, "checkout", "-q", "--", ".")
+    _git(root_dir, "stash", "apply", "-q")
+
+
+def benchmarks(checker_names):
+    """Returns the (name, argv) of every benchmark."""
+    result = []
+    for name in checker_names:
+        for mode, args in CHECK_MODES:
+            result.append(
+                (
+                    "check %s %s" % (mode, name),
+                    ["check", "--no-cache", "--checkers", name] + args,
+                )
+            )
+    for mode, args in CHECK_MODES:
+        result.append(("format %s" % mode, ["format"] + args))
+    return result
+
+
+def run_benchmarks(root_dir, checker_names, cache_dir, repeat=3, verbose=False):
+    _save_working_tree(root_dir)
+    results = {}
+    for name, args in benchmarks(checker_names):
+        times = []
+        for _ in range(repeat):
+            elapsed, returncode = _run_git_lynx(root_dir, args, cache_dir)
+            times.append(elapsed)
+            if args[0] == "format":
+                _restore_working_tree(root_dir)
+        results[name] = {
+            "times": times,
+            "min": min(times),
+            "median": statistics.median(times),
+            "exit_code": returncode,
+        }
+        if verbose:
+            print("  %-40s %8.3f s" % (name, results[name]["median"]))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns the benchmarks whose median got slower than |threshold|."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if not base or not base["median"]:
+            continue
+        ratio = result["median"] / base["median"]
+        if ratio > 1 + threshold:
+            regressions.append((name, base["median"], result["median"], ratio))
+    return regressions
+
+
+def main(options, checker_names):
+    root_dir = tempfile.mkdtemp(prefix="git-lynx-bench-")
+    cache_dir = tempfile.mkdtemp(prefix="git-lynx-bench-cache-")
+    try:
+        print("Generating repository in %s" % root_dir)
+        create_repository(
+            root_dir,
+            files=options.files,
+            commits=options.commits,
+            lines=options.lines,
+            seed=options.seed,
+        )
+        print("Running benchmarks:")
+        results = run_benchmarks(
+            root_dir, checker_names, cache_dir, repeat=options.repeat, verbose=True
+        )
+    finally:
+        shutil.rmtree(cache_dir, True)
+        if options.keep:
+            print("Keeping repository %s" % root_dir)
+        else:
+            shutil.rmtree(root_dir, True)
+
+    report = {
+        "parameters": {
+            "files": options.files,
+            "commits": options.commits,
+            "lines": options.lines,
+            "seed": options.seed,
+            "repeat": options.repeat,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print("Results written to %s" % options.output)
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("parameters") != report["parameters"]:
+            print("Warning: the baseline was measured with other parameters.")
+        regressions = compare(results, baseline["results"], options.threshold)
+        if regressions:
+            print("Regressions over %d%%:" % (options.threshold * 100))
+            for name, before, after, ratio in regressions:
+                print(
+                    "  %-40s %8.3f s -> %8.3f s (x%.2f)" % (name, before, after, ratio)
+                )
+            return 1
+        print("No regressions over %d%%." % (options.threshold * 100))
+    return 0
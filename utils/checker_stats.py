@@ -0,0 +1,137 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Records how long checkers take, so that the cheapest ones run first.
+
+For every repository, the stats file keeps a moving average of the startup
+time of each checker and of its time per file, per file extension. Every
+run weighs ALPHA, so older runs fade out as the code base changes. Stats
+that were not updated for MAX_AGE_SECONDS are dropped.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from utils.result_cache import default_cache_dir
+
+STATS_FILE = "checker_stats.json"
+ALPHA = 0.3
+MAX_AGE_SECONDS = 90 * 24 * 3600
+
+
+def file_type(path):
+    """Returns the extension of |path|, or its name if it has none."""
+    return os.path.splitext(path)[1] or os.path.basename(path)
+
+
+def _average(old, sample):
+    if old is None:
+        return sample
+    return old * (1 - ALPHA) + sample * ALPHA
+
+
+def _type_times(file_times):
+    """Returns {file type: [seconds, files]} of Checker.file_times."""
+    types = {}
+    for path, seconds in file_times.items():
+        totals = types.setdefault(file_type(path), [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+    return types
+
+
+class CheckerStats:
+    def __init__(self, root_dir, path=None):
+        self.path = path or os.path.join(default_cache_dir(), STATS_FILE)
+        try:
+            with open(self.path) as f:
+                self._data = json.load(f)
+        except (OSError, ValueError):
+            self._data = {}
+        self._repo = self._data.setdefault(root_dir, {})
+
+    def estimate(self, spec, files):
+        """Returns the expected seconds |spec| takes to check |files|.
+
+        Checkers without stats are estimated from their manifest costs.
+        |files| None stands for all files of the repository, as many as the
+        last run over all of them checked, leaving out cached results.
+        """
+        stats = self._repo.get(spec.name, {})
+        file_costs = stats.get("files", {})
+        cost = stats.get("startup", spec.startup_cost)
+        if files is None:
+            for name, count in stats.get("all-files", {}).items():
+                cost += file_costs.get(name, spec.file_cost) * count
+            return cost
+        for path in files:
+            if spec.handles(path):
+                cost += file_costs.get(file_type(path), spec.file_cost)
+        return cost
+
+    def order(self, specs, files):
+        """Returns |specs| sorted cheapest first, see estimate()."""
+        return sorted(specs, key=lambda spec: self.estimate(spec, files))
+
+    def record(self, spec, seconds, files, file_times, type_times=None):
+        """Adds a run of |spec| that took |seconds| to check |files|.
+
+        |file_times| has the seconds spent on each file, if the checker
+        measures them, without the files whose results were cached.
+        Otherwise the time is spread over the files. Runs that stream
+        through the whole repository give |type_times|, the [seconds, files]
+        per file type, instead of |files| and |file_times|.
+        """
+        if type_times is None:
+            files = spec.select(files)
+            samples = _type_times(file_times) if file_times else {}
+        else:
+            samples = type_times
+        if samples:
+            total = sum(type_seconds for type_seconds, _ in samples.values())
+            startup = max(0.0, seconds - total)
+        elif files:
+            startup = 0.0
+            for path in files:
+                totals = samples.setdefault(file_type(path), [0.0, 0])
+                totals[0] += seconds / len(files)
+                totals[1] += 1
+        else:
+            startup = seconds
+
+        stats = self._repo.setdefault(spec.name, {"files": {}})
+        if type_times is not None:
+            # The files of a run over the whole repository, to estimate the
+            # next one.
+            stats["all-files"] = {
+                name: count for name, (_, count) in type_times.items()
+            }
+        stats["startup"] = _average(stats.get("startup"), startup)
+        for name, (type_seconds, count) in samples.items():
+            stats["files"][name] = _average(
+                stats["files"].get(name), type_seconds / count
+            )
+        stats["updated"] = time.time()
+
+    def save(self):
+        oldest = time.time() - MAX_AGE_SECONDS
+        for root_dir in list(self._data):
+            checkers = self._data[root_dir]
+            for name in list(checkers):
+                if checkers[name].get("updated", 0) < oldest:
+                    del checkers[name]
+            if not checkers:
+                del self._data[root_dir]
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Replace the file at once, so that concurrent runs do not read
+            # a partial file.
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._data, f, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError:
+            # The stats only affect the order of checkers.
+            pass
@@ -0,0 +1,195 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Gives checkers the content of the files they check.
+
+WorkingTreeStore reads files from disk. StagedStore serves the content that
+is staged for the next commit, read for all files through the same
+`git cat-file --batch` process, so that a pre-commit check neither sees
+unstaged edits nor spawns a process per file.
+
+One store is shared by all checkers of a run, so every file is read once.
+The content, and the text decoded from it, are kept in memory up to
+MAX_CACHED_BYTES, dropping the least recently used files first.
+"""
+
+import collections
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from utils.git_backend import get_backend
+
+_SYMLINK_MODE = "120000"
+_GITLINK_MODE = "160000"
+
+
+# Memory for file contents and texts of a run, in bytes.
+MAX_CACHED_BYTES = 256 * 1024 * 1024
+
+
+class _LruCache:
+    """Keeps values up to a total size, dropping the least recently used."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._values = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def peek(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+            return entry[0] if entry else None
+
+    def get(self, key, compute):
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                return self._values[key][0]
+        # Compute outside the lock, so that threads read different files at
+        # the same time.
+        value = compute()
+        size = len(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = (value, size)
+                self._size += size
+                while self._size > self.max_bytes:
+                    _, (_, dropped) = self._values.popitem(last=False)
+                    self._size -= dropped
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._size = 0
+
+
+class _CachedContent:
+    def __init__(self, max_bytes=MAX_CACHED_BYTES):
+        self._cache = _LruCache(max_bytes)
+
+    def text(self, path):
+        """Returns the content of |path| decoded as UTF-8."""
+        return self._cache.get(
+            ("text", path), lambda: self.read(path).decode("utf-8", "replace")
+        )
+
+
+class WorkingTreeStore(_CachedContent):
+    staged = False
+    # Known git blob SHAs of the files, None to hash the content instead.
+    blob_shas = None
+
+    def read(self, path):
+        return self._cache.get(("bytes", path), lambda: _read_file(path))
+
+    def read_head(self, path, size):
+        """Returns up to |size| bytes from the start of |path|.
+
+        Only reads the start of files that were not read yet, e.g. to tell
+        a large binary file by its first bytes.
+        """
+        content = self._cache.peek(("bytes", path))
+        if content is not None:
+            return content[:size]
+        with open(path, "rb") as f:
+            return f.read(size)
+
+    def path(self, path):
+        """Returns a file on disk with the content of |path|."""
+        return path
+
+    def exists(self, path):
+        return os.path.isfile(path)
+
+    def is_symlink(self, path):
+        return os.path.islink(path)
+
+    def close(self):
+        self._cache.clear()
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def read_staged_entries(paths, cwd=None):
+    """Returns {path: (mode, blob sha)} of the staged |paths|."""
+    wanted = set(paths)
+    returncode, output, error = get_backend(cwd).run_z(["ls-files", "--stage"])
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, "git ls-files", stderr=error)
+    entries = {}
+    for entry in output:
+        info, path = entry.split("\t", 1)
+        mode, sha, stage = info.split(" ")
+        if path in wanted and stage == "0" and mode != _GITLINK_MODE:
+            entries[path] = (mode, sha)
+    return entries
+
+
+def read_blobs(shas, cwd=None):
+    """Returns {sha: content} of the blobs |shas|.
+
+    The blobs are read through the persistent `git cat-file --batch` process
+    of the git backend.
+    """
+    return get_backend(cwd).read_blobs(sorted(set(shas)))
+
+
+class StagedStore(_CachedContent):
+    staged = True
+
+    def __init__(self, paths, cwd=None):
+        super().__init__()
+        entries = read_staged_entries(paths, cwd)
+        self._modes = {path: mode for path, (mode, _) in entries.items()}
+        self.blob_shas = {path: sha for path, (_, sha) in entries.items()}
+        self._blobs = read_blobs(self.blob_shas.values(), cwd)
+        self._temp_dir = None
+        self._lock = threading.Lock()
+
+    def read(self, path):
+        """Returns the staged content of |path|.
+
+        Raises KeyError if |path| is not staged.
+        """
+        return self._blobs[self.blob_shas[path]]
+
+    def read_head(self, path, size):
+        return self.read(path)[:size]
+
+    def path(self, path):
+        """Writes the staged content of |path| to a temporary file.
+
+        The file keeps the relative path, so tools that report it stay
+        readable. Used for tools that cannot read the content from stdin.
+        """
+        with self._lock:
+            if self._temp_dir is None:
+                self._temp_dir = tempfile.mkdtemp(prefix="git-lynx-staged-")
+            temp_path = os.path.join(self._temp_dir, path)
+            if not os.path.exists(temp_path):
+                os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+                with open(temp_path, "wb") as f:
+                    f.write(self.read(path))
+        return temp_path
+
+    def exists(self, path):
+        return path in self.blob_shas
+
+    def is_symlink(self, path):
+        return self._modes.get(path) == _SYMLINK_MODE
+
+    def close(self):
+        self._cache.clear()
+        if self._temp_dir:
+            shutil.rmtree(self._temp_dir, True)
+            self._temp_dir = None
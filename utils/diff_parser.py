@@ -0,0 +1,223 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Parses unified diffs with no context lines, e.g. `git diff -U0`.
+
+The diff is read line by line. The changed lines of each file are kept as
+sorted intervals in arrays, so that even the diff of a large generated file
+takes little memory, and whether a line changed is a binary search.
+"""
+
+import array
+import bisect
+import codecs
+import io
+import re
+from collections.abc import Mapping
+
+_HUNK_HEADER = re.compile(r"@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def _new_path(line):
+    """Returns the path of a "+++ " line, or None for /dev/null."""
+    name = line[4:]
+    # git ends the name with a tab if it has a space, see `git diff` in
+    # git-apply(1), and quotes names with special characters C-style.
+    if name.endswith("\t"):
+        name = name[:-1]
+    if name.startswith('"') and name.endswith('"'):
+        name = codecs.escape_decode(name[1:-1])[0].decode("utf-8", "replace")
+    return name[2:] if name.startswith("b/") else None
+
+
+def iter_hunks(lines):
+    """Yields (path, first line, added lines) for each hunk of a diff.
+
+    |lines| is a diff string or an iterable of diff lines, with or without
+    line endings.
+    Line numbers count from 1 and refer to the new version of the file.
+    Hunks of deleted files are left out.
+    """
+    path = None
+    old_left = new_left = 0
+    first = 0
+    added = []
+    for line in _lines(lines):
+        if line.endswith("\n"):
+            line = line[:-1]
+        if old_left or new_left:
+            # Hunk bodies are counted, so that an added line starting with
+            # "++" is not taken for a file header.
+            if line.startswith("-"):
+                old_left -= 1
+                continue
+            if line.startswith("+"):
+                new_left -= 1
+                added.append(line[1:])
+                if not new_left and added:
+                    yield path, first, added
+                    added = []
+                continue
+            if line.startswith("\\"):
+                # "\ No newline at end of file"
+                continue
+            # The hunk is shorter than its header says.
+            old_left = new_left = 0
+            if added:
+                yield path, first, added
+                added = []
+        if line.startswith("+++ "):
+            path = _new_path(line)
+        elif line.startswith("@@"):
+            match = _HUNK_HEADER.match(line)
+            if not match:
+                continue
+            old_left = 1 if match.group(1) is None else int(match.group(1))
+            first = int(match.group(2))
+            new_left = 1 if match.group(3) is None else int(match.group(3))
+            if path is None:
+                new_left = 0
+            added = []
+    if added and path is not None:
+        yield path, first, added
+
+
+def _lines(diff):
+    if isinstance(diff, str):
+        return io.StringIO(diff)
+    return diff
+
+
+class FileChanges:
+    """The changed lines of a file, as sorted and disjoint intervals."""
+
+    __slots__ = ("path", "_firsts", "_lasts")
+
+    def __init__(self, path):
+        self.path = path
+        self._firsts = array.array("l")
+        self._lasts = array.array("l")
+
+    def add(self, first, last):
+        """Adds the lines |first| to |last|, both included."""
+        firsts, lasts = self._firsts, self._lasts
+        if not firsts or first > lasts[-1] + 1:
+            # Hunks of a diff come in order, so this is the common case.
+            firsts.append(first)
+            lasts.append(last)
+            return
+        # Merge with every interval that overlaps or touches the new one.
+        i = bisect.bisect_left(lasts, first - 1)
+        j = bisect.bisect_right(firsts, last + 1)
+        if i < j:
+            first = min(first, firsts[i])
+            last = max(last, lasts[j - 1])
+        firsts[i:j] = array.array("l", [first])
+        lasts[i:j] = array.array("l", [last])
+
+    def is_changed(self, line):
+        i = bisect.bisect_right(self._firsts, line) - 1
+        return i >= 0 and line <= self._lasts[i]
+
+    def ranges(self):
+        """Returns the changed lines as [(first, last)]."""
+        return list(zip(self._firsts, self._lasts))
+
+    def lines(self):
+        """Yields the changed line numbers in order."""
+        for first, last in zip(self._firsts, self._lasts):
+            yield from range(first, last + 1)
+
+    def __len__(self):
+        return sum(self._lasts) - sum(self._firsts) + len(self._firsts)
+
+
+class DiffIndex:
+    """The changed lines of every file in a diff."""
+
+    def __init__(self):
+        self.files = {}
+
+    def add(self, path, first, last):
+        if path not in self.files:
+            self.files[path] = FileChanges(path)
+        self.files[path].add(first, last)
+
+    def is_changed(self, path, line):
+        changes = self.files.get(path)
+        return changes is not None and changes.is_changed(line)
+
+    def ranges(self, path):
+        changes = self.files.get(path)
+        return changes.ranges() if changes else []
+
+    def __contains__(self, path):
+        return path in self.files
+
+    @classmethod
+    def parse(cls, diff):
+        """Builds the index of |diff|, a string or an iterable of lines."""
+        index = cls()
+        for path, first, added in iter_hunks(diff):
+            index.add(path, first, first + len(added) - 1)
+        return index
+
+
+class LineIndexes(Mapping):
+    """Maps the offset of an added line to (file key, line number).
+
+    This is the |line_indexes| argument of Checker.check_changed_lines. One
+    entry is stored per hunk instead of per line, and the changed lines of a
+    file can be queried with is_changed() and changed_lines().
+    """
+
+    def __init__(self):
+        # Offset of the first line of each hunk, and its file and line.
+        self._offsets = array.array("q")
+        self._keys = array.array("q")
+        self._firsts = array.array("l")
+        self._size = 0
+        self.changes = DiffIndex()
+
+    def add_hunk(self, key, path, first, count):
+        self._offsets.append(self._size)
+        self._keys.append(key)
+        self._firsts.append(first)
+        self._size += count
+        self.changes.add(path, first, first + count - 1)
+
+    def __getitem__(self, offset):
+        if not isinstance(offset, int) or not 0 <= offset < self._size:
+            raise KeyError(offset)
+        i = bisect.bisect_right(self._offsets, offset) - 1
+        return self._keys[i], self._firsts[i] + offset - self._offsets[i]
+
+    def __iter__(self):
+        return iter(range(self._size))
+
+    def __len__(self):
+        return self._size
+
+    def is_changed(self, path, line):
+        return self.changes.is_changed(path, line)
+
+    def changed_lines(self, path):
+        """Yields the changed line numbers of |path| in order."""
+        changes = self.changes.files.get(path)
+        return changes.lines() if changes else iter(())
+
+
+def parse_changed_ranges(diff):
+    """Returns {path: [(first, last)]} of the lines added by |diff|.
+
+    Adjacent ranges are merged, and files that only lose lines are left out.
+    """
+    index = DiffIndex.parse(diff)
+    return {path: changes.ranges() for path, changes in index.files.items()}
+
+
+def count_lines(content):
+    """Returns the number of lines of |content|, in bytes."""
+    if not content:
+        return 0
+    return content.count(b"\n") + (0 if content.endswith(b"\n") else 1)
@@ -0,0 +1,220 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Reports files saved in a git work tree.
+
+On Linux the work tree is watched with inotify. Elsewhere, or when inotify
+is not available, the modified and untracked files reported by git are
+polled. Both watchers collect a burst of writes, e.g. from `git checkout`,
+into a single batch.
+"""
+
+import abc
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import subprocess
+import sys
+import time
+
+# Wait this long for further writes before reporting a batch, in seconds.
+DEBOUNCE = 0.2
+# Report a batch after this long even if files keep changing, in seconds.
+MAX_DEBOUNCE = 2.0
+POLL_INTERVAL = 0.5
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _git(root_dir, args, input=None):
+    result = subprocess.run(
+        ["git"] + args,
+        cwd=root_dir,
+        input=input,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.stdout.decode("utf-8", "replace")
+
+
+def drop_ignored(root_dir, paths):
+    """Removes the paths ignored by .gitignore."""
+    paths = sorted(paths)
+    if not paths:
+        return paths
+    ignored = _git(
+        root_dir,
+        ["check-ignore", "-z", "--stdin"],
+        input="\0".join(paths).encode("utf-8") + b"\0",
+    )
+    ignored = set(ignored.split("\0"))
+    return [path for path in paths if path not in ignored]
+
+
+class _Watcher(abc.ABC):
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    @abc.abstractmethod
+    def read(self, timeout):
+        """Returns the paths changed within |timeout| seconds, may be empty."""
+
+    def wait(self, debounce=DEBOUNCE):
+        """Blocks until files are saved and returns their relative paths.
+
+        Deleted files and files ignored by git are left out.
+        """
+        while True:
+            changed = set()
+            while not changed:
+                changed = self.read(None)
+            deadline = time.monotonic() + MAX_DEBOUNCE
+            while time.monotonic() < deadline:
+                more = self.read(debounce)
+                if not more:
+                    break
+                changed |= more
+            changed = [
+                path
+                for path in changed
+                if os.path.isfile(os.path.join(self.root_dir, path))
+            ]
+            changed = drop_ignored(self.root_dir, changed)
+            if changed:
+                return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(_Watcher):
+    def __init__(self, root_dir):
+        super().__init__(root_dir)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch descriptor => directory relative to the root.
+        self._dirs = {}
+        try:
+            # Only watch the directories with tracked files, which leaves
+            # out build outputs and node_modules.
+            files = _git(root_dir, ["ls-files", "-z"]).split("\0")
+            dirs = {""}
+            for path in files:
+                path = os.path.dirname(path)
+                while path not in dirs:
+                    dirs.add(path)
+                    path = os.path.dirname(path)
+            for path in sorted(dirs):
+                self._add_watch(path)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, path):
+        full_path = os.path.join(self.root_dir, path)
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(full_path), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            if os.path.isdir(full_path):
+                # Most likely the limit of inotify watches is reached.
+                raise OSError(errno, "Cannot watch %s" % full_path)
+            return
+        self._dirs[wd] = path
+
+    def read(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        data = os.read(self._fd, 64 * 1024)
+        changed = set()
+        new_dirs = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                print("Too many changes at once, some files are not checked.")
+                continue
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if wd not in self._dirs or not name:
+                continue
+            path = os.path.join(self._dirs[wd], name)
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO) and path != ".git":
+                    new_dirs.append(path)
+            elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                changed.add(path)
+        for path in drop_ignored(self.root_dir, new_dirs):
+            self._add_watch(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher(_Watcher):
+    """Polls the modified and untracked files reported by git.
+
+    git compares the work tree with the stat data in its index, which is much
+    cheaper than stat-ing every file of a large repository ourselves.
+    """
+
+    def __init__(self, root_dir, interval=POLL_INTERVAL):
+        super().__init__(root_dir)
+        self.interval = interval
+        self._stats = self._snapshot()
+
+    def _snapshot(self):
+        output = _git(
+            self.root_dir, ["ls-files", "-z", "-m", "-o", "--exclude-standard"]
+        )
+        stats = {}
+        for path in output.split("\0"):
+            if not path:
+                continue
+            try:
+                st = os.stat(os.path.join(self.root_dir, path))
+            except OSError:
+                continue
+            stats[path] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def read(self, timeout):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        stats = self._snapshot()
+        changed = {
+            path for path, stat in stats.items() if self._stats.get(path) != stat
+        }
+        self._stats = stats
+        return changed
+
+
+def create_watcher(root_dir, poll=False):
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root_dir)
+        except (OSError, AttributeError) as e:
+            print("Cannot use inotify (%s), polling for changes instead." % e)
+    return PollingWatcher(root_dir)
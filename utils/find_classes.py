@@ -18,9 +18,7 @@ def find_classes(module, is_target=None, handle_error=None, recursive=True):
         mod = sys.modules.get(full_name)
         if not mod:
             try:
-                mod = info.find_module(full_name).load_module(full_name)
-            except AttributeError:
-                mod = info.find_spec(full_name).loader.load_module(full_name)
+                mod = importlib.import_module(full_name)
             except Exception as e:
                 print(e)
                 if handle_error:
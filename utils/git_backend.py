@@ -0,0 +1,225 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Runs git queries for a `git lynx` invocation.
+
+Commands are run from argv lists, without a shell, and their output is
+memoized per working directory, so that e.g. the root directory or the
+commit log are only asked once no matter how many callers need them. Blobs
+and object metadata are read through `git cat-file --batch` and
+`--batch-check` processes that stay alive for the whole invocation.
+
+Long running processes such as `git lynx watch` and `git lynx serve` call
+reset() before each run, since the work tree may have changed.
+"""
+
+import atexit
+import os
+import subprocess
+import tempfile
+import threading
+
+from utils import pipeline, watchdog
+
+_lock = threading.Lock()
+_backends = {}
+
+
+class GitBackend:
+    def __init__(self, cwd):
+        self.cwd = cwd
+        # argv => (returncode, stdout, stderr)
+        self._results = {}
+        self._lock = threading.Lock()
+        self._batch = None
+        self._batch_check = None
+        self._batch_lock = threading.Lock()
+
+    def run(self, args, cached=True):
+        """Runs `git |args|` and returns (returncode, stdout, stderr) as str.
+
+        The result of a command is reused by later calls with the same args
+        unless |cached| is False.
+        """
+        key = tuple(args)
+        if cached:
+            with self._lock:
+                if key in self._results:
+                    return self._results[key]
+        p = subprocess.run(
+            ["git"] + list(args),
+            cwd=self.cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        result = (
+            p.returncode,
+            p.stdout.decode("utf-8", "replace"),
+            p.stderr.decode("utf-8", "replace"),
+        )
+        if cached:
+            with self._lock:
+                self._results[key] = result
+        return result
+
+    def run_z(self, args, cached=True):
+        """Like run, but adds -z and splits the NUL-separated output.
+
+        Paths are not quoted in -z output, so odd file names survive.
+        """
+        # Right after the subcommand, so that it does not end up after "--".
+        args = list(args)
+        returncode, output, error = self.run(args[:1] + ["-z"] + args[1:], cached)
+        return returncode, [entry for entry in output.split("\0") if entry], error
+
+    def stream_z(self, args):
+        """Yields the entries of `git |args|` with -z while git lists them.
+
+        Nothing is memoized. git waits on its full stdout pipe until the
+        entries are consumed, so a long listing is never held in memory.
+        Closing the generator early stops git. Raises CalledProcessError if
+        git fails.
+        """
+        args = list(args)
+        return self._stream(args[:1] + ["-z"] + args[1:], pipeline.iter_z)
+
+    def stream_lines(self, args):
+        """Like stream_z, but yields the lines of the output, e.g. a diff."""
+        return self._stream(list(args), pipeline.iter_lines)
+
+    def _stream(self, args, split):
+        with tempfile.TemporaryFile() as stderr:
+            # Not watched, the output lasts as long as its consumer.
+            process = watchdog.unwatched_popen()(
+                ["git"] + args,
+                cwd=self.cwd,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+            )
+            try:
+                yield from split(process.stdout)
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                process.stdout.close()
+                process.wait()
+            if process.returncode != 0:
+                stderr.seek(0)
+                raise subprocess.CalledProcessError(
+                    process.returncode,
+                    ["git"] + args,
+                    stderr=stderr.read().decode("utf-8", "replace"),
+                )
+
+    def _start(self, mode):
+        # The watchdog kills processes that outlive their time budget, which
+        # these processes do on purpose.
+        return watchdog.unwatched_popen()(
+            ["git", "cat-file", mode],
+            cwd=self.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def _request(self, attr, mode, names, read_body):
+        """Sends |names| to the persistent cat-file process of |mode|.
+
+        Returns {name: (type, size, body)} of the objects that exist.
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+        with self._batch_lock:
+            process = getattr(self, attr)
+            if process is None or process.poll() is not None:
+                process = self._start(mode)
+                setattr(self, attr, process)
+
+            # Write the requests from another thread, git blocks on a full
+            # stdout pipe until the responses are read.
+            def write_requests():
+                try:
+                    process.stdin.write("".join(n + "\n" for n in names).encode())
+                    process.stdin.flush()
+                except (BrokenPipeError, ValueError):
+                    pass
+
+            writer = threading.Thread(target=write_requests, daemon=True)
+            writer.start()
+            objects = {}
+            try:
+                for name in names:
+                    header = process.stdout.readline().decode().split()
+                    if not header:
+                        raise OSError("git cat-file %s exited" % mode)
+                    if len(header) != 3:
+                        # "<name> missing"
+                        continue
+                    _, kind, size = header
+                    body = None
+                    if read_body:
+                        body = process.stdout.read(int(size))
+                        process.stdout.read(1)
+                    objects[name] = (kind, int(size), body)
+            except OSError:
+                self._stop(attr)
+                raise
+            finally:
+                writer.join()
+            return objects
+
+    def read_blobs(self, shas):
+        """Returns {sha: content} of the blobs |shas| that exist."""
+        objects = self._request("_batch", "--batch", shas, True)
+        return {sha: body for sha, (_, _, body) in objects.items()}
+
+    def read_blob(self, sha):
+        """Returns the content of blob |sha|, None if it does not exist."""
+        return self.read_blobs([sha]).get(sha)
+
+    def object_info(self, names):
+        """Returns {name: (type, size)} of the objects |names| that exist."""
+        objects = self._request("_batch_check", "--batch-check", names, False)
+        return {name: (kind, size) for name, (kind, size, _) in objects.items()}
+
+    def _stop(self, attr):
+        process = getattr(self, attr)
+        setattr(self, attr, None)
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+    def close(self):
+        with self._batch_lock:
+            self._stop("_batch")
+            self._stop("_batch_check")
+
+
+def get_backend(cwd=None):
+    """Returns the backend of |cwd|, by default the current directory."""
+    cwd = os.path.abspath(cwd or os.getcwd())
+    with _lock:
+        if cwd not in _backends:
+            _backends[cwd] = GitBackend(cwd)
+        return _backends[cwd]
+
+
+def reset():
+    """Forgets all memoized results and stops the cat-file processes."""
+    with _lock:
+        backends = list(_backends.values())
+        _backends.clear()
+    for backend in backends:
+        backend.close()
+
+
+atexit.register(reset)
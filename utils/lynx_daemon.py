@@ -0,0 +1,308 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""A warm background server for `git lynx`.
+
+`git lynx serve` keeps the imported checkers, the loaded config and the
+compiled regex caches of a repository alive in one process and listens on a
+Unix socket. When it is running, `git lynx check` sends its arguments to the
+server and only streams the output back, so it does not pay the interpreter
+and import cost again.
+
+This module is imported before anything else by the client side, keep its
+imports cheap.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import stat
+import sys
+
+# Subcommands that may be handed over to a running server.
+FORWARDED_COMMANDS = ("check",)
+# Set to disable handing requests over to the server.
+NO_DAEMON_ENV = "GIT_LYNX_NO_DAEMON"
+
+
+def find_root_directory(path):
+    path = os.path.realpath(path)
+    while True:
+        if os.path.exists(os.path.join(path, ".git")):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def socket_path(root_dir):
+    # Unix socket paths are limited to ~100 bytes, so use a short digest of
+    # the repository root in a per-user directory.
+    runtime_dir = os.path.join(
+        os.environ.get("TMPDIR", "/tmp"), "git-lynx-%d" % os.getuid()
+    )
+    digest = hashlib.sha1(os.path.realpath(root_dir).encode("utf-8")).hexdigest()
+    return os.path.join(runtime_dir, digest[:16] + ".sock")
+
+
+def check_runtime_dir(path):
+    """Raises RuntimeError unless the directory |path| belongs to this user
+    and no one else can access it, e.g. another user created it first."""
+    st = os.lstat(path)
+    if (
+        not stat.S_ISDIR(st.st_mode)
+        or st.st_uid != os.getuid()
+        or stat.S_IMODE(st.st_mode) != 0o700
+    ):
+        raise RuntimeError(
+            "%s must be a directory of user %d with mode 0700" % (path, os.getuid())
+        )
+
+
+class SourceFiles:
+    """Tells whether the imported Python files of |source_dir| changed.
+
+    Only the modules already imported are looked at, so a check costs a
+    stat() per module instead of a walk over the source tree. A module is
+    compared with its modification time when it was first seen.
+    """
+
+    def __init__(self, source_dir):
+        self.source_dir = os.path.join(os.path.realpath(source_dir), "")
+        # Path => modification time of the imported files.
+        self._mtimes = {}
+        self.changed()
+
+    def changed(self):
+        for module in list(sys.modules.values()):
+            path = getattr(module, "__file__", None)
+            if not path or not path.startswith(self.source_dir):
+                continue
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                return True
+            if self._mtimes.setdefault(path, mtime) != mtime:
+                return True
+        return False
+
+
+def _connect(path):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except OSError:
+        client.close()
+        return None
+    return client
+
+
+def _send(sock, message):
+    sock.sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+
+def _messages(sock):
+    for line in sock.makefile("r", encoding="utf-8"):
+        yield json.loads(line)
+
+
+def request(root_dir, message, on_output=None):
+    """Sends one request to the server of |root_dir|.
+
+    Returns the final message of the server, or None if no server is running
+    or it asked the client to do the work itself.
+    """
+    path = socket_path(root_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        # The request carries the environment, only send it to this user.
+        check_runtime_dir(os.path.dirname(path))
+    except (OSError, RuntimeError):
+        return None
+    sock = _connect(path)
+    if sock is None:
+        return None
+    try:
+        _send(sock, message)
+        for reply in _messages(sock):
+            if "stream" in reply:
+                if on_output:
+                    on_output(reply["stream"], reply["data"])
+                continue
+            if reply.get("restart"):
+                return None
+            return reply
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+    return None
+
+
+def forward(argv):
+    """Runs |argv| on a running server and returns its exit code.
+
+    Returns None when the command has to be run in this process.
+    """
+    if os.environ.get(NO_DAEMON_ENV) or not argv or argv[0] not in FORWARDED_COMMANDS:
+        return None
+    root_dir = find_root_directory(os.getcwd())
+    if root_dir is None:
+        return None
+
+    def on_output(stream, data):
+        target = sys.stderr if stream == "stderr" else sys.stdout
+        target.write(data)
+        target.flush()
+
+    # The environment matters too, e.g. GIT_INDEX_FILE and PATH in hooks.
+    message = {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+    reply = request(root_dir, message, on_output=on_output)
+    if reply is None:
+        return None
+    return reply.get("exit", 1)
+
+
+class _SocketStream:
+    def __init__(self, sock, stream):
+        self._sock = sock
+        self._stream = stream
+
+    def write(self, s):
+        if s:
+            _send(self._sock, {"stream": self._stream, "data": s})
+        return len(s)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class LynxServer:
+    """Serves `git lynx` requests for one repository on a Unix socket.
+
+    |handler| is called with the argv of each request and returns its exit
+    code, in the working directory and the environment of the client. Only
+    FORWARDED_COMMANDS are run. |stamp| returns a value describing the loaded
+    state; when it changes the server restarts itself so nothing stale is
+    served.
+    """
+
+    def __init__(self, root_dir, handler, stamp=None):
+        self.root_dir = root_dir
+        self.path = socket_path(root_dir)
+        self.handler = handler
+        self.stamp = stamp
+        self._initial_stamp = stamp() if stamp else None
+        self._sock = None
+
+    def is_running(self):
+        sock = _connect(self.path) if os.path.exists(self.path) else None
+        if sock is None:
+            return False
+        sock.close()
+        return True
+
+    def listen(self):
+        if self.is_running():
+            raise RuntimeError("git lynx server is already running: " + self.path)
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        check_runtime_dir(os.path.dirname(self.path))
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self.path)
+        self._sock.listen(16)
+
+    def serve_forever(self):
+        if self._sock is None:
+            self.listen()
+        try:
+            while True:
+                conn, _ = self._sock.accept()
+                with conn:
+                    try:
+                        if not self._handle(conn):
+                            break
+                    except OSError:
+                        # The client went away, keep serving the others.
+                        continue
+        finally:
+            self.close()
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def _handle(self, conn):
+        try:
+            message = next(_messages(conn), None)
+        except (OSError, ValueError):
+            return True
+        if message is None:
+            return True
+        if message.get("command") == "stop":
+            _send(conn, {"exit": 0})
+            return False
+        if message.get("command") == "status":
+            _send(conn, {"exit": 0, "pid": os.getpid(), "root": self.root_dir})
+            return True
+        argv = message.get("argv") or []
+        if not argv or argv[0] not in FORWARDED_COMMANDS:
+            _send(conn, {"stream": "stderr", "data": "Not served: %s\n" % argv[:1]})
+            _send(conn, {"exit": 2})
+            return True
+        if self.stamp and self.stamp() != self._initial_stamp:
+            # The config changed since it was loaded, let the client run the
+            # command itself while this server restarts with the new state.
+            _send(conn, {"restart": True})
+            conn.close()
+            self.close()
+            os.execv(sys.executable, [sys.executable] + sys.argv)
+        _send(conn, {"exit": self._run(conn, message)})
+        return True
+
+    def _run(self, conn, message):
+        from utils import git_backend
+
+        old_cwd = os.getcwd()
+        old_environ = dict(os.environ)
+        old_stdout, old_stderr = sys.stdout, sys.stderr
+        sys.stdout = _SocketStream(conn, "stdout")
+        sys.stderr = _SocketStream(conn, "stderr")
+        try:
+            os.chdir(message.get("cwd") or self.root_dir)
+            if message.get("env") is not None:
+                os.environ.clear()
+                os.environ.update(message["env"])
+            # The work tree may have changed since the last request, and git
+            # processes have to start in the environment of the client.
+            git_backend.reset()
+            code = self.handler(message.get("argv", []))
+        except SystemExit as e:
+            code = e.code
+        except Exception:
+            import traceback
+
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout, sys.stderr = old_stdout, old_stderr
+            os.environ.clear()
+            os.environ.update(old_environ)
+            os.chdir(old_cwd)
+        if code is None:
+            return 0
+        return code if isinstance(code, int) else 1
@@ -4,28 +4,37 @@
 # LICENSE file in the root directory of this source tree.
 import subprocess
 
+from utils.git_backend import get_backend
+
 
 class MergeRequest:
     def __init__(self):
-        pass
+        # ref => (files, lines) of the commits since the merge base with ref.
+        self._branch_changes = {}
 
+    # Run a git query given as argv, e.g. ["git", "log", "-n", "1"]. Results
+    # are memoized for the invocation, see utils/git_backend.py.
     def RunCommand(self, command):
-        p = subprocess.Popen(
-            " ".join(command),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=True,
-        )
-        result, error = p.communicate()
-        # Compatibale with Python 3.
-        # Since the return value of communicate is bytes instead of str in Python 3.
-        return result.decode("utf-8"), error.decode("utf-8")
-
-    # Get project/git root directory
-    def GetRootDirectory(self):
+        assert command[0] == "git", command
+        returncode, result, error = get_backend().run(command[1:])
+        # Warnings on stderr, e.g. about line endings, are not errors.
+        return result, error if returncode else ""
+
+    # Run a git query with -z and return its NUL-separated entries.
+    def _RunListCommand(self, command):
+        assert command[0] == "git", command
+        returncode, entries, error = get_backend().run_z(command[1:])
+        return entries, error if returncode else ""
+
+    # Get project/git root directory, None outside of a git repo. With
+    # |quiet|, e.g. for commands that also work without a repo, no error is
+    # printed.
+    def GetRootDirectory(self, quiet=False):
         command = ["git", "rev-parse", "--show-toplevel"]
         result, error = self.RunCommand(command)
         if error:
+            if quiet:
+                return None
             print(
                 (
                     "Error, can not get top directory, make sure it is a git repo: %s"
@@ -35,39 +44,73 @@ class MergeRequest:
             return None
         return result.strip()
 
-    # Get uncommitted changed files.
-    def GetChangedFiles(self):
-        file_list = []
-        # Staged files
-        command = ["git", "diff", "--cached", "--name-only", "--diff-filter=ACMRT"]
+    # Get the id of the tree without files, which depends on the object
+    # format of the repository, SHA-1 or SHA-256.
+    def GetEmptyTree(self):
+        command = ["git", "hash-object", "-t", "tree", "/dev/null"]
         result, error = self.RunCommand(command)
         if error:
-            print(
-                (
-                    "Error, can not get staged files, make sure it is a git repo: %s"
-                    % (error)
-                )
-            )
-        for filename in result.split("\n"):
-            filename = filename.strip()
-            if filename and filename != "":
-                file_list.append(filename)
-        # Unstaged files
-        command = ["git", "diff", "--name-only", "--diff-filter=ACMRT"]
-        result, error = self.RunCommand(command)
+            print("Error, can not get the empty tree: %s" % error)
+            return None
+        return result.strip()
+
+    # Get what the uncommitted changes are compared with: HEAD, or the empty
+    # tree before the first commit, e.g. in a pre-commit hook of a new repo.
+    def _HeadOrEmptyTree(self):
+        returncode, _, _ = get_backend().run(["rev-parse", "--verify", "-q", "HEAD"])
+        return "HEAD" if returncode == 0 else self.GetEmptyTree()
+
+    # Get uncommitted changed files, staged or not.
+    def GetChangedFiles(self):
+        head = self._HeadOrEmptyTree()
+        command = ["git", "diff", head, "--name-only", "--diff-filter=ACMRT"]
+        file_list, error = self._RunListCommand(command)
         if error:
             print(
                 (
-                    "Error, can not get staged files, make sure it is a git repo: %s"
+                    "Error, can not get changed files, make sure it is a git repo: %s"
                     % (error)
                 )
             )
-        for filename in result.split("\n"):
-            filename = filename.strip()
-            if filename and filename != "":
-                file_list.append(filename)
         return file_list
 
+    # Get files staged for the next commit.
+    def GetStagedFiles(self):
+        command = ["git", "diff", "--cached", "--name-only", "--diff-filter=ACMRT"]
+        file_list, error = self._RunListCommand(command)
+        if error:
+            print(("Error, can not get staged files: %s" % (error)))
+            return []
+        return file_list
+
+    def GetStagedLines(self, stream=False):
+        cmd = ["git", "diff", "--cached", "-U0"]
+        if stream:
+            return self.IterDiffLines(cmd)
+        result, error = self.RunCommand(cmd)
+        if error:
+            print(("Error, can not get staged lines: %s" % error))
+        return result
+
+    # Get uncommitted changed lines, staged or not.
+    def GetChangedLines(self, stream=False):
+        cmd = ["git", "diff", self._HeadOrEmptyTree(), "-U0"]
+        if stream:
+            return self.IterDiffLines(cmd)
+        result, error = self.RunCommand(cmd)
+        if error:
+            print(("Error, can not get changed lines: %s" % error))
+        return result
+
+    # Yield the lines of the diff |command| while git writes them, instead of
+    # keeping the whole diff, e.g. with the Get*Lines methods and |stream|.
+    def IterDiffLines(self, command):
+        assert command[0] == "git", command
+        try:
+            yield from get_backend().stream_lines(command[1:])
+        except subprocess.CalledProcessError as e:
+            print(("Error, can not get changed lines: %s" % e.stderr))
+
     # Get changed files of last commit.
     def GetLastCommitFiles(self):
         command = [
@@ -78,24 +121,78 @@ class MergeRequest:
             "--name-only",
             "--pretty=format:",
         ]
-        result, error = self.RunCommand(command)
+        file_list, error = self._RunListCommand(command)
         if error:
             print(("Error: can not get change list of last commit: %s" % (error)))
             return []
-        file_list = []
-        for filename in result.split("\n"):
-            filename = filename.strip()
-            if filename and filename != "":
-                file_list.append(filename)
         return file_list
 
-    def GetLastCommitLines(self):
+    def GetLastCommitLines(self, stream=False):
         cmd = ["git", "diff", "HEAD^", "HEAD", "-U0"]
+        if stream:
+            return self.IterDiffLines(cmd)
         result, error = self.RunCommand(cmd)
         if error:
             print(("Error, can not get changed lines of last commit: %s" % error))
         return result
 
+    # Get the merge base of HEAD and |ref|.
+    def GetMergeBase(self, ref):
+        command = ["git", "merge-base", ref, "HEAD"]
+        result, error = self.RunCommand(command)
+        if error or not result.strip():
+            print(
+                ("Error, can not get the merge base of HEAD and %s: %s" % (ref, error))
+            )
+            return None
+        return result.strip()
+
+    # Get changed files and lines of the commits since the merge base with
+    # |ref|. Both come from a single diff, which is computed once per ref.
+    def GetBranchChanges(self, ref):
+        if ref not in self._branch_changes:
+            base = self.GetMergeBase(ref)
+            if base is None:
+                return None
+            command = [
+                "git",
+                "diff",
+                "--raw",
+                "-p",
+                "-U0",
+                "-z",
+                "--diff-filter=ACMRT",
+                base,
+                "HEAD",
+            ]
+            result, error = self.RunCommand(command)
+            if error:
+                print(("Error, can not get the changes since %s: %s" % (base, error)))
+                return None
+            # With -z, the raw entries, e.g. ":100644 100644 <sha> <sha> M",
+            # and their paths are NUL-terminated fields, followed by an empty
+            # field and the patch. They also list binary files, which have
+            # no hunks.
+            fields = result.split("\0")
+            file_list = []
+            i = 0
+            while i < len(fields) and fields[i].startswith(":"):
+                status = fields[i].split(" ")[-1]
+                # Renames and copies have the old and the new path.
+                i += 3 if status[0] in "RC" else 2
+                file_list.append(fields[i - 1])
+            lines = "\0".join(fields[i + 1 :])
+            self._branch_changes[ref] = (file_list, lines)
+        return self._branch_changes[ref]
+
+    def GetBranchFiles(self, ref):
+        changes = self.GetBranchChanges(ref)
+        return changes[0] if changes else None
+
+    def GetBranchLines(self, ref):
+        changes = self.GetBranchChanges(ref)
+        return changes[1] if changes else ""
+
     # Get commit log of last commit.
     def GetCommitLog(self):
         command = ["git", "log", "--format=%B", "-n", "1"]
@@ -105,20 +202,81 @@ class MergeRequest:
             return None
         return result
 
-    # Get all file in the repo.
-    def GetAllFiles(self):
-        command = ["git", "ls-tree", "--full-tree", "-r", "--name-only", "HEAD"]
-        result, error = self.RunCommand(command)
+    # Get all file in the repo. |excludes| are pathspecs of files to leave
+    # out, see path_filter.git_excludes.
+    def GetAllFiles(self, excludes=()):
+        file_list, error = self._RunListCommand(self._AllFilesCommand(excludes))
         if error:
             print("Error: can not get all files, please check it is a git repo.")
             return None
-        file_list = []
-        for filename in result.split("\n"):
-            filename = filename.strip()
-            if filename and filename != "":
-                file_list.append(filename)
         return file_list
 
+    def _AllFilesCommand(self, excludes):
+        # ls-tree does not support exclude pathspecs, diff-tree does. HEAD is
+        # listed as the changes from the empty tree.
+        empty_tree = self.GetEmptyTree() if excludes else None
+        if empty_tree:
+            command = ["git", "diff-tree", "-r", "--name-only", "--no-renames"]
+            return command + [empty_tree, "HEAD", "--", ":(top)"] + list(excludes)
+        return ["git", "ls-tree", "--full-tree", "-r", "--name-only", "HEAD"]
+
+    # Get all files of the working tree, including untracked files that are
+    # not ignored, e.g. to check everything before committing.
+    def GetWorkingTreeFiles(self, excludes=()):
+        command = self._WorkingTreeFilesCommand(excludes)
+        file_list, error = self._RunListCommand(command)
+        if error:
+            print("Error: can not get the files of the working tree: %s" % error)
+            return None
+        return file_list
+
+    def _WorkingTreeFilesCommand(self, excludes):
+        return [
+            "git",
+            "ls-files",
+            "--cached",
+            "--others",
+            "--exclude-standard",
+            "--deduplicate",
+            "--full-name",
+            "--",
+            ":(top)",
+        ] + list(excludes)
+
+    # Yield the files of GetAllFiles, or of GetWorkingTreeFiles if
+    # |working_tree|, while git lists them, for `git lynx check --all`.
+    def IterAllFiles(self, excludes=(), working_tree=False):
+        if working_tree:
+            command = self._WorkingTreeFilesCommand(excludes)
+        else:
+            command = self._AllFilesCommand(excludes)
+        try:
+            yield from get_backend().stream_z(command[1:])
+        except subprocess.CalledProcessError as e:
+            print("Error: can not list the files: %s" % e.stderr)
+            raise
+
+    # Get blob SHAs of the files whose working tree content matches the index.
+    def GetCleanBlobShas(self):
+        command = ["git", "ls-files", "--stage", "-z"]
+        result, error = self.RunCommand(command)
+        if error:
+            print("Error: can not get the index, please check it is a git repo.")
+            return {}
+        blob_shas = {}
+        for entry in result.split("\0"):
+            if not entry:
+                continue
+            info, filename = entry.split("\t", 1)
+            mode, sha, stage = info.split(" ")
+            if stage == "0" and mode != "160000":
+                blob_shas[filename] = sha
+        command = ["git", "diff-files", "--name-only", "-z"]
+        result, error = self.RunCommand(command)
+        for filename in result.split("\0"):
+            blob_shas.pop(filename, None)
+        return blob_shas
+
 
 if __name__ == "__main__":
     mr = MergeRequest()
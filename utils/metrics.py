@@ -0,0 +1,225 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Collects the numbers of a `git lynx check` run for CI dashboards.
+
+The metrics are written in the OpenMetrics text format, which Prometheus
+and most collectors ingest, or as JSON if the file name ends with ".json".
+CPU time of a phase includes the subprocesses that finished in it. CPU time
+of a checker only counts the Python code of its thread, since subprocesses
+of checkers running at the same time cannot be told apart.
+"""
+
+import contextlib
+import json
+import os
+import time
+
+from checkers.checker import CheckResult
+
+METRICS_VERSION = 1
+PREFIX = "git_lynx_"
+
+_RESULT_NAMES = {
+    CheckResult.PASSED: "passed",
+    CheckResult.FAILED: "failed",
+    CheckResult.CANCELLED: "cancelled",
+}
+
+
+def _cpu_time():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return (
+        "{" + ",".join('%s="%s"' % (key, _escape(value)) for key, value in labels) + "}"
+    )
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(int(value))
+
+
+class RunMetrics:
+    def __init__(self):
+        self.start_time = time.time()
+        # {phase: {"wall_seconds": float, "cpu_seconds": float}}
+        self.phases = {}
+        # {checker: {"files": int, "findings": {category: int}, ...}}
+        self.checkers = {}
+        # {"available": int, "selected": int, "skipped": int}
+        self.checker_counts = {}
+        self.files = 0
+        self.passed = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Adds the wall and CPU time of the block to phase |name|."""
+        wall = time.perf_counter()
+        cpu = _cpu_time()
+        try:
+            yield
+        finally:
+            phase = self.phases.setdefault(
+                name, {"wall_seconds": 0.0, "cpu_seconds": 0.0}
+            )
+            phase["wall_seconds"] += time.perf_counter() - wall
+            phase["cpu_seconds"] += _cpu_time() - cpu
+
+    def record_checker(
+        self, checker, files, result, wall_seconds, cpu_seconds, subprocesses
+    ):
+        self.checkers[checker.name] = {
+            "result": _RESULT_NAMES.get(result),
+            "files": files,
+            "findings": dict(checker.findings),
+            "subprocesses": subprocesses,
+            "cache_hits": checker.cache_hits,
+            "cache_misses": checker.cache_misses,
+            "wall_seconds": wall_seconds,
+            "cpu_seconds": cpu_seconds,
+        }
+
+    def cache_hit_rate(self):
+        """Returns the share of cache lookups that hit, None without lookups."""
+        hits = sum(c["cache_hits"] for c in self.checkers.values())
+        lookups = hits + sum(c["cache_misses"] for c in self.checkers.values())
+        return hits / lookups if lookups else None
+
+    def to_json(self):
+        return {
+            "version": METRICS_VERSION,
+            "timestamp": self.start_time,
+            "passed": self.passed,
+            "files": self.files,
+            "checker_counts": self.checker_counts,
+            "cache_hit_rate": self.cache_hit_rate(),
+            "phases": self.phases,
+            "checkers": self.checkers,
+        }
+
+    def to_openmetrics(self):
+        lines = []
+
+        def family(name, kind, help, samples):
+            samples = [s for s in samples if s[1] is not None]
+            if not samples:
+                return
+            name = PREFIX + name
+            lines.append("# TYPE %s %s" % (name, kind))
+            lines.append("# HELP %s %s" % (name, help))
+            suffix = "_total" if kind == "counter" else ""
+            for labels, value in samples:
+                lines.append(
+                    "%s%s%s %s" % (name, suffix, _labels(labels), _number(value))
+                )
+
+        checkers = sorted(self.checkers.items())
+        family(
+            "run_passed",
+            "gauge",
+            "1 if all checkers passed.",
+            [((), self.passed)] if self.passed is not None else [],
+        )
+        family("run_files", "gauge", "Files selected for the run.", [((), self.files)])
+        family(
+            "checkers",
+            "gauge",
+            "Checkers by state.",
+            [((("state", k),), v) for k, v in sorted(self.checker_counts.items())],
+        )
+        family(
+            "phase_wall_seconds",
+            "gauge",
+            "Wall time per phase.",
+            [
+                ((("phase", k),), v["wall_seconds"])
+                for k, v in sorted(self.phases.items())
+            ],
+        )
+        family(
+            "phase_cpu_seconds",
+            "gauge",
+            "CPU time per phase, including finished subprocesses.",
+            [
+                ((("phase", k),), v["cpu_seconds"])
+                for k, v in sorted(self.phases.items())
+            ],
+        )
+        family(
+            "checker_passed",
+            "gauge",
+            "1 if the checker passed.",
+            [((("checker", k),), int(v["result"] == "passed")) for k, v in checkers],
+        )
+        family(
+            "checker_files",
+            "counter",
+            "Files given to the checker.",
+            [((("checker", k),), v["files"]) for k, v in checkers],
+        )
+        family(
+            "checker_findings",
+            "counter",
+            "Findings per category.",
+            [
+                ((("checker", k), ("category", category)), count)
+                for k, v in checkers
+                for category, count in sorted(v["findings"].items())
+            ],
+        )
+        family(
+            "checker_subprocesses",
+            "counter",
+            "Subprocesses started by the checker.",
+            [((("checker", k),), v["subprocesses"]) for k, v in checkers],
+        )
+        family(
+            "checker_cache_hits",
+            "counter",
+            "Files whose results were taken from the result cache.",
+            [((("checker", k),), v["cache_hits"]) for k, v in checkers],
+        )
+        family(
+            "checker_cache_misses",
+            "counter",
+            "Files that were checked and added to the result cache.",
+            [((("checker", k),), v["cache_misses"]) for k, v in checkers],
+        )
+        family(
+            "cache_hit_ratio",
+            "gauge",
+            "Share of result cache lookups that hit.",
+            [((), self.cache_hit_rate())],
+        )
+        family(
+            "checker_wall_seconds",
+            "gauge",
+            "Wall time of the checker.",
+            [((("checker", k),), v["wall_seconds"]) for k, v in checkers],
+        )
+        family(
+            "checker_cpu_seconds",
+            "gauge",
+            "CPU time of the checker thread, without subprocesses.",
+            [((("checker", k),), v["cpu_seconds"]) for k, v in checkers],
+        )
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        with open(path, "w") as f:
+            if path.endswith(".json"):
+                json.dump(self.to_json(), f, indent=2, sort_keys=True)
+            else:
+                f.write(self.to_openmetrics())
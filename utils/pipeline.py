@@ -0,0 +1,109 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Building blocks of the streaming `git lynx check --all` pipeline.
+
+Files are listed, filtered, read, checked and reported one after the other
+through generators, so that a run over the whole repository holds a bounded
+number of files at any time. Each stage only pulls from the one before it
+when it has room: git blocks on its full stdout pipe, and checkers keep at
+most a few files per worker in flight. What has to outlive the stream, e.g.
+findings that are reported at the end, is spooled to a temporary file once
+it gets large.
+"""
+
+import io
+import json
+import tempfile
+
+# Bytes of git output read at a time.
+READ_SIZE = 64 * 1024
+# Items a SpooledList keeps in memory before it moves them to a file.
+SPOOL_ITEMS = 10000
+
+
+class SpooledList:
+    """An append-only list that moves its items to a file when it grows.
+
+    Items must be JSON serializable. Iterating yields them in order.
+    """
+
+    def __init__(self, max_items=SPOOL_ITEMS):
+        self.max_items = max_items
+        self._items = []
+        self._file = None
+        self._len = 0
+
+    def append(self, item):
+        self._items.append(item)
+        self._len += 1
+        if len(self._items) >= self.max_items:
+            self._spill()
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def _spill(self):
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        self._file.seek(0, 2)
+        for item in self._items:
+            self._file.write(json.dumps(item) + "\n")
+        self._items = []
+
+    def __iter__(self):
+        if self._file is not None:
+            self._file.flush()
+            self._file.seek(0)
+            for line in self._file:
+                yield json.loads(line)
+        yield from list(self._items)
+
+    def __len__(self):
+        return self._len
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._items = []
+        self._len = 0
+
+
+class Counted:
+    """Passes the items of |iterable| through and counts them."""
+
+    def __init__(self, iterable):
+        self._iterable = iterable
+        self.count = 0
+
+    def __iter__(self):
+        for item in self._iterable:
+            self.count += 1
+            yield item
+
+
+def iter_z(stream):
+    """Yields the NUL-separated entries read from the binary |stream|."""
+    rest = b""
+    while True:
+        # Whatever is available, instead of waiting for a full chunk.
+        chunk = stream.read1(READ_SIZE)
+        if not chunk:
+            break
+        entries = (rest + chunk).split(b"\0")
+        rest = entries.pop()
+        for entry in entries:
+            if entry:
+                yield entry.decode("utf-8", "replace")
+    if rest:
+        yield rest.decode("utf-8", "replace")
+
+
+def iter_lines(stream):
+    """Yields the lines read from the binary |stream|, with their newline."""
+    # Only LF ends a line, a CR stays part of it as in the file.
+    yield from io.TextIOWrapper(
+        stream, encoding="utf-8", errors="replace", newline="\n"
+    )
@@ -0,0 +1,154 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Records where a `git lynx` run spends its time.
+
+Spans are written in the Chrome trace event format, which can be opened in
+chrome://tracing or https://ui.perfetto.dev. While the profiler is running,
+every subprocess started through `subprocess.Popen` is recorded as a span
+with its command line and exit code.
+"""
+
+import contextlib
+import json
+import os
+import subprocess
+import threading
+import time
+
+_profiler = None
+
+
+class _TracedPopen(subprocess.Popen):
+    def __init__(self, args, *popenargs, **kwargs):
+        self._trace_start = time.perf_counter()
+        self._trace_recorded = False
+        self._trace_tid = threading.get_ident()
+        super().__init__(args, *popenargs, **kwargs)
+
+    def _trace_end(self):
+        profiler = _profiler
+        if self.returncode is None or self._trace_recorded or profiler is None:
+            return
+        self._trace_recorded = True
+        args = self.args
+        command = args if isinstance(args, str) else " ".join(str(a) for a in args)
+        profiler.add_span(
+            command.split(" ", 1)[0],
+            "subprocess",
+            self._trace_start,
+            time.perf_counter(),
+            {"command": command, "exit_code": self.returncode},
+            tid=self._trace_tid,
+        )
+
+    def wait(self, timeout=None):
+        returncode = super().wait(timeout)
+        self._trace_end()
+        return returncode
+
+    def poll(self):
+        returncode = super().poll()
+        self._trace_end()
+        return returncode
+
+
+class Profiler:
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.events = []
+        self.thread_names = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name, category, start, end, args=None, tid=None):
+        tid = tid or threading.get_ident()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self.start_time) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": args or {},
+        }
+        with self._lock:
+            self.events.append(event)
+            if tid not in self.thread_names:
+                self.thread_names[tid] = threading.current_thread().name
+
+    @contextlib.contextmanager
+    def span(self, name, category, **args):
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add_span(name, category, start, time.perf_counter(), args)
+
+    def write(self, path):
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in self.thread_names.items()
+        ]
+        with open(path, "w") as f:
+            json.dump(
+                {"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, f
+            )
+
+    def slowest(self, category, count):
+        events = [e for e in self.events if e["cat"] == category]
+        return sorted(events, key=lambda e: e["dur"], reverse=True)[:count]
+
+    def print_summary(self, count=10):
+        files = self.slowest("file", count)
+        if files:
+            print("Slowest files:")
+            for e in files:
+                print(
+                    "  %10.1f ms  %s (%s)"
+                    % (e["dur"] / 1000, e["name"], e["args"].get("checker"))
+                )
+            print("")
+        processes = self.slowest("subprocess", count)
+        if processes:
+            print("Slowest subprocesses:")
+            for e in processes:
+                print(
+                    "  %10.1f ms  [exit %s] %s"
+                    % (e["dur"] / 1000, e["args"]["exit_code"], e["args"]["command"])
+                )
+            print("")
+
+
+def start():
+    """Starts recording spans and subprocesses."""
+    global _profiler
+    _profiler = Profiler()
+    subprocess.Popen = _TracedPopen
+    return _profiler
+
+
+def stop():
+    global _profiler
+    profiler = _profiler
+    _profiler = None
+    if subprocess.Popen is _TracedPopen:
+        subprocess.Popen = _TracedPopen.__bases__[0]
+    return profiler
+
+
+def span(name, category, **args):
+    """Returns a context manager that records a span if the profiler runs.
+
+    The context manager yields the dict of span arguments, which may be
+    updated inside the block.
+    """
+    if _profiler is None:
+        return contextlib.nullcontext(args)
+    return _profiler.span(name, category, **args)
@@ -0,0 +1,155 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.merge_request import MergeRequest
+
+# Results older than this are dropped, so the cache does not grow forever.
+MAX_AGE_SECONDS = 30 * 24 * 3600
+# Seconds to wait for a concurrent run that writes to the cache.
+LOCK_TIMEOUT_SECONDS = 1
+
+
+def default_cache_dir():
+    cache_dir = os.environ.get("GIT_LYNX_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(xdg_cache_home, "git-lynx")
+
+
+def git_blob_sha(content):
+    """Returns the SHA of |content| as `git hash-object` would compute it."""
+    sha = hashlib.sha1(b"blob %d\0" % len(content))
+    sha.update(content)
+    return sha.hexdigest()
+
+
+def hash_object(obj):
+    return hashlib.sha1(
+        json.dumps(obj, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class ResultCache:
+    """A local cache of per-file check results.
+
+    Results are keyed by the git blob SHA of the file, the checker name and
+    version, the hash of the effective config and the version of the external
+    tool, so a cached result is only reused when nothing that could change it
+    has changed.
+
+    Concurrent runs, e.g. shards or `git lynx watch` next to a hook, share
+    the database. Every result is committed on its own, so no run holds the
+    write lock for long, and a result that cannot be read or written is a
+    miss rather than a failure.
+    """
+
+    def __init__(self, cache_dir=None, mr=None):
+        cache_dir = cache_dir or default_cache_dir()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit, with readers not blocked by writers.
+        self._db = sqlite3.connect(
+            os.path.join(cache_dir, "results.sqlite"),
+            timeout=LOCK_TIMEOUT_SECONDS,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        try:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # Commits only sync the log at checkpoints in WAL mode.
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error:
+            # E.g. on file systems without shared memory, the default
+            # journal still works.
+            pass
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, passed INTEGER, findings TEXT, created REAL)"
+        )
+        self._mr = mr or MergeRequest()
+        self._clean_blob_shas = None
+
+    def blob_sha(self, filename, content_store):
+        """Returns the blob SHA of |filename| as |content_store| has it."""
+        if content_store.blob_shas is not None:
+            # E.g. the staged content.
+            return content_store.blob_shas.get(filename)
+        if not os.path.isfile(filename) or os.path.islink(filename):
+            return None
+        with self._lock:
+            if self._clean_blob_shas is None:
+                # Files that match the index do not need to be read and hashed.
+                self._clean_blob_shas = self._mr.GetCleanBlobShas()
+        sha = self._clean_blob_shas.get(filename)
+        if sha:
+            return sha
+        # Read through the store, which keeps the content for the checker.
+        return git_blob_sha(content_store.read(filename))
+
+    def make_key(self, checker, filename, extra=None):
+        """Returns the key of the findings of |checker| for |filename|.
+
+        |extra| is anything else the findings depend on, e.g. the changed
+        lines of the file.
+        """
+        blob_sha = self.blob_sha(filename, checker.content_store)
+        if blob_sha is None:
+            return None
+        parts = [
+            blob_sha,
+            filename,
+            checker.name,
+            str(checker.version),
+            checker.config_hash(),
+            hash_object(checker.file_config_key(filename)),
+            checker.tool_version(filename),
+        ]
+        if extra is not None:
+            parts.append(hash_object(extra))
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached findings of |key|, or None on a miss."""
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT passed, findings FROM results WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        return json.loads(row[1])
+
+    def put(self, key, findings):
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                    (key, int(not findings), json.dumps(findings), time.time()),
+                )
+        except sqlite3.Error:
+            # The file is checked again next time.
+            pass
+
+    def close(self):
+        with self._lock:
+            try:
+                self._db.execute(
+                    "DELETE FROM results WHERE created < ?",
+                    (time.time() - MAX_AGE_SECONDS,),
+                )
+            except sqlite3.Error:
+                # Dropped by a later run.
+                pass
+            self._db.close()
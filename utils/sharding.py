@@ -0,0 +1,135 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Splits the files of a check run into shards for several CI nodes.
+
+The split only depends on the file list and the file costs, so every node
+computes the same shards without talking to the others. Each shard writes a
+result file, and `git lynx merge-results` combines them into one verdict.
+"""
+
+import heapq
+import json
+import os
+
+RESULT_FILE_VERSION = 1
+
+# Cost of a file on top of its size, so that many small files are spread too.
+FILE_BASE_COST = 1024
+
+
+def parse_shard(value):
+    """Parses INDEX/COUNT, where INDEX counts from 1."""
+    try:
+        index, count = [int(v) for v in value.split("/")]
+    except ValueError:
+        raise ValueError("Invalid shard %r, expected INDEX/COUNT" % value)
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError("Invalid shard %r, INDEX must be in 1..COUNT" % value)
+    return index, count
+
+
+def load_costs(path):
+    """Loads per-file costs from a result file written by a previous run."""
+    with open(path) as f:
+        return json.load(f).get("file_costs", {})
+
+
+def file_cost(path, costs=None, root_dir=""):
+    if costs and path in costs:
+        return costs[path]
+    try:
+        return os.path.getsize(os.path.join(root_dir, path)) + FILE_BASE_COST
+    except OSError:
+        return FILE_BASE_COST
+
+
+def split_files(files, count, costs=None, root_dir=""):
+    """Splits |files| into |count| shards of about the same total cost.
+
+    Files measured by an earlier run are weighted by their recorded time,
+    scaled to the size based cost of the other files.
+    """
+    if costs:
+        measured = [f for f in files if f in costs]
+        if measured:
+            # Put times and sizes on the same scale.
+            time_total = sum(costs[f] for f in measured) or 1
+            size_total = sum(file_cost(f, root_dir=root_dir) for f in measured)
+            scale = size_total / time_total
+            costs = {f: costs[f] * scale for f in measured}
+    weighted = sorted(
+        ((file_cost(f, costs, root_dir), f) for f in files),
+        key=lambda x: (-x[0], x[1]),
+    )
+    shards = [[] for _ in range(count)]
+    # Longest processing time first: give the next most expensive file to
+    # the cheapest shard so far.
+    loads = [(0, i) for i in range(count)]
+    for cost, path in weighted:
+        load, i = heapq.heappop(loads)
+        shards[i].append(path)
+        heapq.heappush(loads, (load + cost, i))
+    return [sorted(shard) for shard in shards]
+
+
+def select_shard(files, shard, costs=None, root_dir=""):
+    index, count = shard
+    return split_files(files, count, costs, root_dir)[index - 1]
+
+
+def write_result_file(path, shard, checker_results, file_count, file_costs):
+    result = {
+        "version": RESULT_FILE_VERSION,
+        "shard": list(shard) if shard else [1, 1],
+        "files": file_count,
+        "checkers": {
+            name: {"passed": passed} for name, passed in checker_results.items()
+        },
+        "file_costs": file_costs,
+    }
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+
+
+def merge_result_files(paths):
+    """Merges shard result files.
+
+    Returns the merged result and a list of problems, e.g. missing shards.
+    """
+    problems = []
+    merged = {
+        "version": RESULT_FILE_VERSION,
+        "shard": [1, 1],
+        "files": 0,
+        "checkers": {},
+        "file_costs": {},
+    }
+    seen = {}
+    counts = set()
+    for path in paths:
+        with open(path) as f:
+            result = json.load(f)
+        if result.get("version") != RESULT_FILE_VERSION:
+            problems.append("%s: unsupported result file version" % path)
+            continue
+        index, count = result["shard"]
+        counts.add(count)
+        if index in seen:
+            problems.append(
+                "%s: shard %d/%d is also in %s" % (path, index, count, seen[index])
+            )
+            continue
+        seen[index] = path
+        merged["files"] += result["files"]
+        merged["file_costs"].update(result["file_costs"])
+        for name, checker in result["checkers"].items():
+            merged_checker = merged["checkers"].setdefault(name, {"passed": True})
+            merged_checker["passed"] = merged_checker["passed"] and checker["passed"]
+    if len(counts) > 1:
+        problems.append("result files disagree on the shard count: %s" % sorted(counts))
+    elif counts:
+        missing = sorted(set(range(1, counts.pop() + 1)) - set(seen))
+        if missing:
+            problems.append("missing shards: %s" % ", ".join(str(i) for i in missing))
+    return merged, problems
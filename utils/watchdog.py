@@ -0,0 +1,268 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Enforces time budgets on checkers and the subprocesses they start.
+
+While the watchdog is installed, every subprocess started through
+`subprocess.Popen` runs in its own process group and is registered with the
+task of the thread that started it. A watchdog thread kills the process
+group of subprocesses that run longer than their budget, and cancels tasks
+that run longer than theirs. Both are recorded with the tool and the file
+being checked, so that a hang is reported instead of stalling the run.
+"""
+
+import contextlib
+import os
+import signal
+import subprocess
+import threading
+import time
+
+POLL_INTERVAL = 0.2
+
+_local = threading.local()
+_lock = threading.Lock()
+_tasks = set()
+_processes = set()
+_subprocess_timeout = None
+_previous_popen = None
+_stop = None
+
+
+class Cancelled(Exception):
+    """Raised in a task that was cancelled, e.g. by --fail-fast."""
+
+
+class Task:
+    def __init__(self, name, timeout=None, subprocess_timeout=None):
+        self.name = name
+        # Seconds, None or 0 for no limit.
+        self.timeout = timeout
+        self.subprocess_timeout = subprocess_timeout
+        # The file being checked, for reports.
+        self.file = None
+        self.start_time = None
+        self.cancelled = False
+        self.timed_out = False
+        self.timeouts = []
+        # Number of subprocesses started by the task.
+        self.spawned = 0
+        # Where the threads of the task print to, set by the scheduler.
+        self.output = None
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    def add_process(self, process):
+        with self._lock:
+            if self.cancelled:
+                _kill(process)
+            self.spawned += 1
+            self._processes.add(process)
+
+    def remove_process(self, process):
+        with self._lock:
+            self._processes.discard(process)
+
+    def cancel(self):
+        """Kills the subprocesses of the task and stops it at the next file."""
+        with self._lock:
+            self.cancelled = True
+            processes = list(self._processes)
+        for process in processes:
+            _kill(process)
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise Cancelled(self.name)
+
+
+def _describe(file):
+    return " while checking %s" % file if file else ""
+
+
+def _kill(process):
+    try:
+        if process._watchdog_group:
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+
+
+def current_task():
+    return getattr(_local, "task", None)
+
+
+@contextlib.contextmanager
+def running(task):
+    """Runs the block as |task| on the current thread."""
+    _local.task = task
+    task.start_time = time.monotonic()
+    with _lock:
+        _tasks.add(task)
+    try:
+        yield task
+    finally:
+        _local.task = None
+        with _lock:
+            _tasks.discard(task)
+
+
+@contextlib.contextmanager
+def helping(task):
+    """Runs the block on the current thread as part of |task|.
+
+    Used by the threads a task starts to check files in parallel, so that
+    their subprocesses are watched and cancelled with the task, and their
+    output goes to the output of the task.
+    """
+    previous = current_task()
+    _local.task = task
+    try:
+        yield task
+    finally:
+        _local.task = previous
+
+
+@contextlib.contextmanager
+def checking_file(filename):
+    """Records that the current task checks |filename| in the block.
+
+    Raises Cancelled if the task was cancelled.
+    """
+    task = current_task()
+    if task is None:
+        yield
+        return
+    task.check_cancelled()
+    previous = task.file
+    task.file = filename
+    try:
+        yield
+    finally:
+        task.file = previous
+
+
+def _make_popen(base):
+    class _WatchedPopen(base):
+        def __init__(self, args, *popenargs, **kwargs):
+            task = current_task()
+            if task:
+                task.check_cancelled()
+            self._watchdog_task = task
+            self._watchdog_file = task.file if task else None
+            self._watchdog_timeout = (
+                task.subprocess_timeout if task else _subprocess_timeout
+            )
+            # Run the subprocess in its own process group, so that the
+            # children of shell commands are killed along with it.
+            self._watchdog_group = hasattr(os, "killpg") and not kwargs.get(
+                "start_new_session"
+            )
+            if self._watchdog_group:
+                kwargs["start_new_session"] = True
+            self._watchdog_start = time.monotonic()
+            super().__init__(args, *popenargs, **kwargs)
+            with _lock:
+                _processes.add(self)
+            if task:
+                task.add_process(self)
+
+        def _watchdog_done(self):
+            if self.returncode is None:
+                return
+            with _lock:
+                _processes.discard(self)
+            if self._watchdog_task:
+                self._watchdog_task.remove_process(self)
+
+        def wait(self, timeout=None):
+            returncode = super().wait(timeout)
+            self._watchdog_done()
+            return returncode
+
+        def poll(self):
+            returncode = super().poll()
+            self._watchdog_done()
+            return returncode
+
+    return _WatchedPopen
+
+
+def _watch(stop):
+    while not stop.wait(POLL_INTERVAL):
+        now = time.monotonic()
+        with _lock:
+            processes = list(_processes)
+            tasks = list(_tasks)
+        for process in processes:
+            timeout = process._watchdog_timeout
+            if not timeout or now - process._watchdog_start < timeout:
+                continue
+            with _lock:
+                _processes.discard(process)
+            _kill(process)
+            args = process.args
+            command = args if isinstance(args, str) else " ".join(map(str, args))
+            message = "`%s` timed out after %ds%s" % (
+                command,
+                timeout,
+                _describe(process._watchdog_file),
+            )
+            if process._watchdog_task:
+                process._watchdog_task.timeouts.append(message)
+            else:
+                print(message)
+        for task in tasks:
+            if not task.timeout or task.cancelled:
+                continue
+            if now - task.start_time < task.timeout:
+                continue
+            task.timed_out = True
+            task.timeouts.append(
+                "%s timed out after %ds%s"
+                % (task.name, task.timeout, _describe(task.file))
+            )
+            task.cancel()
+
+
+def install(subprocess_timeout=None):
+    """Starts watching subprocesses and tasks.
+
+    |subprocess_timeout| applies to subprocesses started outside of tasks.
+    """
+    global _previous_popen, _subprocess_timeout, _stop
+    if _previous_popen is not None:
+        return
+    _subprocess_timeout = subprocess_timeout
+    _previous_popen = subprocess.Popen
+    subprocess.Popen = _make_popen(_previous_popen)
+    _stop = threading.Event()
+    thread = threading.Thread(target=_watch, args=(_stop,), name="watchdog")
+    thread.daemon = True
+    thread.start()
+
+
+def uninstall():
+    """Stops watching and kills the subprocesses that are still running."""
+    global _previous_popen
+    if _previous_popen is None:
+        return
+    subprocess.Popen = _previous_popen
+    _previous_popen = None
+    _stop.set()
+    kill_all()
+
+
+def unwatched_popen():
+    """Returns the Popen class for processes that outlive the budgets."""
+    return _previous_popen or subprocess.Popen
+
+
+def kill_all():
+    with _lock:
+        processes = list(_processes)
+        _processes.clear()
+    for process in processes:
+        _kill(process)
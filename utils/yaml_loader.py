@@ -0,0 +1,103 @@
+# Copyright 2024 The Lynx Authors. All rights reserved.
+# Licensed under the Apache License Version 2.0 that can be found in the
+# LICENSE file in the root directory of this source tree.
+"""Loads YAML documents, e.g. `.tools_shared` and `Podfile.lock`.
+
+libyaml's CSafeLoader is used when PyYAML was built with it, which parses a
+large `Podfile.lock` many times faster than the pure Python loaders. The
+result of load_file() is also kept as a pickle in the cache directory, keyed
+by the path, size and modification time of the file, so that an unchanged
+file is not parsed again by the next invocation.
+"""
+
+import hashlib
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+
+from utils.result_cache import default_cache_dir
+
+CACHE_SUBDIR = "yaml"
+# Bump to drop the cached documents, e.g. when the loader changes.
+CACHE_VERSION = 1
+
+_yaml = None
+
+
+def _import_yaml():
+    global _yaml
+    if _yaml is None:
+        try:
+            import yaml
+        except ImportError:
+            subprocess.check_call(
+                [sys.executable, "-m", "pip", "install", "PyYAML~=6.0"]
+            )
+            import yaml
+        _yaml = yaml
+    return _yaml
+
+
+def get_loader():
+    """Returns CSafeLoader if PyYAML has libyaml, SafeLoader otherwise."""
+    yaml = _import_yaml()
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load(stream):
+    """Parses the YAML document in |stream|, a str, bytes or file object."""
+    return _import_yaml().load(stream, Loader=get_loader())
+
+
+def _cache_path(path):
+    name = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+    return os.path.join(default_cache_dir(), CACHE_SUBDIR, name + ".pickle")
+
+
+def load_file(path, cache=True):
+    """Returns the parsed YAML document of the file |path|.
+
+    The parsed document is reused while the size and modification time of
+    the file are unchanged, unless |cache| is False.
+    """
+    st = os.stat(path)
+    key = (CACHE_VERSION, os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    cache_path = _cache_path(path) if cache else None
+    if cache_path:
+        try:
+            with open(cache_path, "rb") as f:
+                cached_key, document = pickle.load(f)
+            if cached_key == key:
+                return document
+        except Exception:
+            # Missing, partial or written by an incompatible version.
+            pass
+
+    with open(path, "rb") as f:
+        document = load(f)
+
+    if cache_path:
+        _write_cache(cache_path, key, document)
+    return document
+
+
+def _write_cache(cache_path, key, document):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Replace the file at once, so that concurrent runs do not read a
+        # partial file.
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((key, document), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except Exception:
+        # E.g. a full disk. The file is parsed again next time.
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass